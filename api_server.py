@@ -0,0 +1,298 @@
+# api_server.py
+# python3 api_server.py --port 8080
+# python3 api_server.py --reload-interval 0   # tắt tự nạp phiên bản mô hình mới
+# RECSYS_RESULT_CACHE_DIR=models/result_cache python3 api_server.py   # giữ cache kết quả qua các lần khởi động lại
+#
+# Ví dụ:
+#   curl -X POST localhost:8080/recommend/keywords -d '{"keywords": ["áo thun", "quần jean"], "top_k": 5}'
+#   curl -X POST localhost:8080/recommend/products -d '{"product_ids": [190, 191], "backend": "ann"}'
+#   curl -X POST localhost:8080/recommend/users -d '{"user_ids": [1, 2, 3], "n": 10}'
+#   curl 'localhost:8080/search/products?q=áo%20thun&limit=10'
+#   curl -X POST localhost:8080/recommend/hybrid -d '{"user_ids": [1, 2], "n": 10, "cb_weight": 0.3}'
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from aiohttp import web
+
+from utils import metrics
+from utils.catalog import Catalog
+from utils.collaborative import get_precomputed_recommendations, get_top_n_recommendations, usable_user_topn
+from utils.content_based_top1000 import (
+    BACKENDS, get_catalog, recommend_by_product_id_top10, search_and_recommend_top10,
+)
+from utils.data_store import PRODUCT_DISPLAY_COLUMNS, read_products
+from utils.hot_reload import RELOAD_INTERVAL, HotReloader, unchanged, warm_models
+from utils.hybrid import HybridRecommender, get_hybrid_recommendations
+from utils.model_loader import (
+    CB_MODEL_NAME, CF_MODEL_NAME, INTERACTIONS_NAME, PRODUCTS_NAME, USER_TOPN_NAME,
+    load_collaborative_model, load_content_model, load_interaction_index, load_user_topn, model_versions,
+)
+from utils.product_search import MAX_SUGGESTIONS, ProductSearch
+from utils.result_cache import ResultCache
+MAX_BATCH = 256  # Số truy vấn tối đa trong một request
+MAX_TOP_K = 100
+
+_dumps = partial(json.dumps, ensure_ascii=False)
+
+
+def _records(df):
+    # Qua to_json để NaN -> null và kiểu numpy -> kiểu JSON chuẩn
+    return json.loads(df.to_json(orient="records", force_ascii=False))
+
+
+def load_state(versions=None, previous=None):
+    """
+    Nạp mô hình và dữ liệu đúng các phiên bản versions (mặc định: đang được công bố), để khóa cache
+    khớp với mô hình đang phục vụ. previous: state đang phục vụ — phần có phiên bản không đổi được dùng lại.
+    """
+    start = time.perf_counter()
+    versions = versions or model_versions()
+
+    def reuse_or_load(key, names, load):
+        return previous[key] if unchanged(previous, versions, *names) else load()
+
+    state = {"versions": versions}
+    state["cb_model"] = reuse_or_load("cb_model", [CB_MODEL_NAME],
+                                      lambda: load_content_model(versions[CB_MODEL_NAME]))
+    state["cf_model"] = reuse_or_load("cf_model", [CF_MODEL_NAME],
+                                      lambda: load_collaborative_model(versions[CF_MODEL_NAME]))
+    state["catalog"] = reuse_or_load("catalog", [PRODUCTS_NAME],
+                                     lambda: Catalog.from_df(read_products(PRODUCT_DISPLAY_COLUMNS)))
+    state["interactions"] = reuse_or_load("interactions", [INTERACTIONS_NAME],
+                                          lambda: load_interaction_index(versions[INTERACTIONS_NAME]))
+    # Bảng top-N chỉ dùng khi khớp mô hình SVD + danh mục đang phục vụ: kiểm tra lại khi một trong ba đổi
+    state["user_topn"] = reuse_or_load(
+        "user_topn", [USER_TOPN_NAME, CF_MODEL_NAME, PRODUCTS_NAME],
+        lambda: usable_user_topn(load_user_topn(), state["cf_model"], state["catalog"]),
+    )
+    state["product_search"] = reuse_or_load("product_search", [CB_MODEL_NAME],
+                                            lambda: ProductSearch(get_catalog(state["cb_model"])))
+    state["hybrid"] = reuse_or_load(
+        "hybrid", [CB_MODEL_NAME, CF_MODEL_NAME, INTERACTIONS_NAME],
+        lambda: HybridRecommender(state["cb_model"], state["cf_model"], state["interactions"]),
+    )
+    # Cache kết quả sống qua các lần đổi mô hình: tự bỏ kết quả của phiên bản cũ
+    state["result_cache"] = previous["result_cache"] if previous is not None else ResultCache()
+    state["load_seconds"] = time.perf_counter() - start
+    return state
+
+
+def _cached(state, artifacts, mode, query, k, compute):
+    """Kết quả (dạng JSON) từ cache dùng chung, khóa theo phiên bản các artifact mà chế độ này dùng."""
+    cache = state.get("result_cache")
+    if cache is None:
+        return compute()
+    version = tuple(state["versions"][name] for name in artifacts)
+    return cache.get_or_compute(version, f"api.{mode}", query, k, compute, generation=state.get("generation"))
+
+
+# ===== Xử lý từng loại truy vấn (chạy trong thread pool, không chặn event loop) =====
+def recommend_keywords(state, keywords, top_k, backend="exact"):
+    return [
+        {"keyword": kw,
+         "items": _cached(state, (CB_MODEL_NAME,), f"keywords.{backend}", kw, top_k, lambda: _records(
+             search_and_recommend_top10(state["cb_model"], kw, top_k=top_k, backend=backend)))}
+        for kw in keywords
+    ]
+
+
+def recommend_products(state, product_ids, top_k, backend="exact"):
+    results = []
+    for pid in product_ids:
+        try:
+            items = _cached(state, (CB_MODEL_NAME,), f"products.{backend}", pid, top_k, lambda: _records(
+                recommend_by_product_id_top10(state["cb_model"], pid, top_k=top_k, backend=backend)))
+            results.append({"product_id": pid, "items": items})
+        except (ValueError, TypeError) as e:
+            results.append({"product_id": pid, "error": str(e)})
+    return results
+
+
+def _user_items(state, uid, n):
+    result = get_precomputed_recommendations(uid, state["user_topn"], state["catalog"], n=n,
+                                             ratings_df=state["interactions"])
+    if result is None:
+        result = get_top_n_recommendations(uid, state["cf_model"], state["catalog"], state["interactions"], n=n)
+    return _records(result)
+
+
+def recommend_users(state, user_ids, n):
+    results = []
+    artifacts = (CF_MODEL_NAME, INTERACTIONS_NAME, USER_TOPN_NAME, PRODUCTS_NAME)
+    for uid in user_ids:
+        try:
+            items = _cached(state, artifacts, "users", uid, n, lambda: _user_items(state, uid, n))
+            results.append({"user_id": uid, "items": items})
+        except (ValueError, TypeError) as e:
+            results.append({"user_id": uid, "error": str(e)})
+    return results
+
+
+def recommend_hybrid(state, user_ids, n, cb_weight=None):
+    results = []
+    for uid in user_ids:
+        try:
+            items = _cached(state, (CB_MODEL_NAME, CF_MODEL_NAME, INTERACTIONS_NAME), "hybrid", (uid, cb_weight), n,
+                            lambda: _records(get_hybrid_recommendations(uid, state["hybrid"], n=n, cb_weight=cb_weight)))
+            results.append({"user_id": uid, "items": items})
+        except (ValueError, TypeError) as e:
+            results.append({"user_id": uid, "error": str(e)})
+    return results
+
+
+# ===== HTTP handlers =====
+async def _read_batch(request, field, size_field, default_size):
+    try:
+        body = await request.json()
+    except json.JSONDecodeError:
+        raise web.HTTPBadRequest(text="❌ Body phải là JSON")
+    if not isinstance(body, dict):
+        raise web.HTTPBadRequest(text="❌ Body phải là một JSON object")
+    values = body.get(field)
+    if not isinstance(values, list) or not values:
+        raise web.HTTPBadRequest(text=f"❌ '{field}' phải là danh sách không rỗng")
+    if len(values) > MAX_BATCH:
+        raise web.HTTPRequestEntityTooLarge(max_size=MAX_BATCH, actual_size=len(values))
+    # Id / từ khóa là một phần của khóa cache: mảng hay object lồng nhau không băm được
+    if any(isinstance(value, (list, dict)) for value in values):
+        raise web.HTTPBadRequest(text=f"❌ Mỗi phần tử của '{field}' phải là số hoặc chuỗi")
+    size = body.get(size_field, default_size)
+    # bool là lớp con của int trong Python: true không được hiểu thành 1
+    if not isinstance(size, int) or isinstance(size, bool) or not 0 < size <= MAX_TOP_K:
+        raise web.HTTPBadRequest(text=f"❌ '{size_field}' phải là số nguyên trong (0, {MAX_TOP_K}]")
+    return values, size
+
+
+async def _read_backend(request):
+    backend = (await request.json()).get("backend", "exact")
+    if backend not in BACKENDS:
+        raise web.HTTPBadRequest(text=f"❌ 'backend' phải là một trong {BACKENDS}")
+    if backend == "ann" and "ann_index" not in _state(request.app)["cb_model"]:
+        raise web.HTTPBadRequest(text="❌ Mô hình hiện tại chưa có chỉ mục ANN")
+    return backend
+
+
+async def _run(request, fn, *args):
+    app = request.app
+    loop = asyncio.get_running_loop()
+    with metrics.timer(f"http.{fn.__name__}"):
+        # Lấy state một lần cho cả request: mô hình có đổi giữa chừng thì request vẫn dùng trọn bản cũ
+        results = await loop.run_in_executor(app["executor"], fn, _state(app), *args)
+    return web.json_response({"results": results}, dumps=_dumps)
+
+
+async def handle_keywords(request):
+    keywords, top_k = await _read_batch(request, "keywords", "top_k", 10)
+    backend = await _read_backend(request)
+    return await _run(request, recommend_keywords, [str(kw) for kw in keywords], top_k, backend)
+
+
+async def handle_products(request):
+    product_ids, top_k = await _read_batch(request, "product_ids", "top_k", 10)
+    backend = await _read_backend(request)
+    return await _run(request, recommend_products, product_ids, top_k, backend)
+
+
+async def handle_users(request):
+    user_ids, n = await _read_batch(request, "user_ids", "n", 10)
+    return await _run(request, recommend_users, user_ids, n)
+
+
+async def handle_hybrid(request):
+    user_ids, n = await _read_batch(request, "user_ids", "n", 10)
+    cb_weight = (await request.json()).get("cb_weight")
+    if cb_weight is not None and (not isinstance(cb_weight, (int, float)) or isinstance(cb_weight, bool)
+                                  or not 0 <= cb_weight <= 1):
+        raise web.HTTPBadRequest(text="❌ 'cb_weight' phải là số trong [0, 1]")
+    return await _run(request, recommend_hybrid, user_ids, n, cb_weight)
+
+
+async def handle_search_products(request):
+    # Gợi ý khi gõ: chạy thẳng trên event loop vì chỉ mất vài chục micro giây
+    try:
+        limit = int(request.query.get("limit", MAX_SUGGESTIONS))
+    except ValueError:
+        raise web.HTTPBadRequest(text="❌ 'limit' phải là số nguyên")
+    if not 0 < limit <= MAX_TOP_K:
+        raise web.HTTPBadRequest(text=f"❌ 'limit' phải trong (0, {MAX_TOP_K}]")
+    with metrics.timer("http.search_products"):
+        suggestions = _state(request.app)["product_search"].suggestions(request.query.get("q", ""), limit)
+    return web.json_response({"results": [{"product_id": pid, "product_name": name} for pid, name in suggestions]},
+                             dumps=_dumps)
+
+
+async def handle_metrics(request):
+    return web.Response(text=metrics.to_prometheus(),
+                        headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"})
+
+
+async def handle_health(request):
+    state = _state(request.app)
+    reloader = request.app["ctx"].get("reloader")
+    return web.json_response({
+        "status": "ok",
+        "products": len(state["catalog"]),
+        "precomputed_users": len(state["user_topn"]) if state["user_topn"] is not None else 0,
+        "load_seconds": round(state["load_seconds"], 3),
+        "versions": state.get("versions"),
+        "reload_error": reloader.last_error if reloader is not None else None,
+        "result_cache": state["result_cache"].stats() if state.get("result_cache") is not None else None,
+    })
+
+
+def _state(app):
+    """State đang phục vụ: snapshot hiện tại của HotReloader, hoặc state truyền sẵn vào create_app."""
+    reloader = app["ctx"].get("reloader")
+    return reloader.current if reloader is not None else app["ctx"]["state"]
+
+
+def create_app(state=None, workers=None, reload_interval=RELOAD_INTERVAL):
+    """
+    Tạo ứng dụng aiohttp; truyền state có sẵn (vd. khi test) để bỏ qua bước nạp mô hình và tự nạp lại.
+    Nếu không, một thread nền kiểm tra phiên bản mô hình mỗi reload_interval giây và đổi sang phiên bản mới
+    khi đã nạp xong (reload_interval <= 0: tắt).
+    """
+    app = web.Application()
+    app["executor"] = ThreadPoolExecutor(max_workers=workers or os.cpu_count())
+    app["ctx"] = {"state": state, "reloader": None}
+
+    async def on_startup(app):
+        if app["ctx"]["state"] is None:
+            loop = asyncio.get_running_loop()
+            reloader = await loop.run_in_executor(app["executor"], partial(
+                HotReloader, load_state, warm=warm_models, interval=reload_interval, name="api"))
+            app["ctx"]["reloader"] = reloader.start()
+
+    async def on_cleanup(app):
+        if app["ctx"]["reloader"] is not None:
+            app["ctx"]["reloader"].stop()
+        app["executor"].shutdown(wait=False)
+
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
+    app.router.add_get("/health", handle_health)
+    app.router.add_get("/metrics", handle_metrics)
+    app.router.add_get("/search/products", handle_search_products)
+    app.router.add_post("/recommend/keywords", handle_keywords)
+    app.router.add_post("/recommend/products", handle_products)
+    app.router.add_post("/recommend/users", handle_users)
+    app.router.add_post("/recommend/hybrid", handle_hybrid)
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Service HTTP gợi ý sản phẩm (không cần Streamlit).")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=None, help="Số luồng xử lý truy vấn")
+    parser.add_argument("--reload-interval", type=float, default=RELOAD_INTERVAL,
+                        help="Số giây giữa hai lần kiểm tra phiên bản mô hình mới (0 = tắt)")
+    args = parser.parse_args()
+
+    web.run_app(create_app(workers=args.workers, reload_interval=args.reload_interval), host=args.host, port=args.port)
@@ -0,0 +1,225 @@
+# benchmark_recommendations.py
+# python3 benchmark_recommendations.py --scale small                        # 10k sản phẩm, 100k đánh giá
+# python3 benchmark_recommendations.py --products 200000 --ratings 2000000 --output reports/bench.json
+# python3 benchmark_recommendations.py --scale small --compare reports/benchmark_old.json
+#
+# Sinh dữ liệu giả cùng schema với hai file CSV trong một thư mục làm việc riêng, chạy hai script build,
+# rồi đo độ trễ từng hàm gợi ý. Mỗi phép đo chạy trong một tiến trình mới để peak RSS không lẫn nhau.
+
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import numpy as np
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+SCALES = {
+    "small": (10_000, 100_000),
+    "medium": (100_000, 1_000_000),
+    "large": (1_000_000, 10_000_000),
+}
+BUILD_SCRIPTS = {
+    "build_content_based_light_model": ["build_content_based_light_model.py"],
+    "build_collaborative_model": ["build_collaborative_model.py", "--full"],
+}
+
+
+def _peak_rss_mb(ru_maxrss):
+    # Linux trả về KB, macOS trả về byte
+    return ru_maxrss / (1024 ** 2 if sys.platform == "darwin" else 1024)
+
+
+def latency_stats(seconds, wall_seconds):
+    ms = np.asarray(seconds) * 1000
+    return {
+        "calls": len(ms),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "mean_ms": float(ms.mean()),
+        "max_ms": float(ms.max()),
+        "throughput_per_s": len(ms) / wall_seconds if wall_seconds > 0 else None,
+    }
+
+
+def prepare_workdir(workdir, n_products, n_ratings, seed):
+    """Sinh dữ liệu (chỉ khi chưa có cùng kích thước / seed) và xóa mô hình cũ trong thư mục làm việc."""
+    from utils.synthetic_data import write_dataset
+
+    marker = os.path.join(workdir, "dataset.json")
+    spec = {"products": n_products, "ratings": n_ratings, "seed": seed}
+    if not (os.path.exists(marker) and json.load(open(marker)) == spec):
+        shutil.rmtree(os.path.join(workdir, "data"), ignore_errors=True)
+        start = time.perf_counter()
+        write_dataset(workdir, n_products, n_ratings, seed)
+        with open(marker, "w") as f:
+            json.dump(spec, f)
+        print(f"🧪 Đã sinh dữ liệu giả trong {time.perf_counter() - start:.1f}s")
+    shutil.rmtree(os.path.join(workdir, "models"), ignore_errors=True)
+
+
+def run_build(name, workdir):
+    """Chạy một script build như tiến trình con trong workdir; đo thời gian và peak RSS của riêng nó."""
+    args = [sys.executable, os.path.join(REPO_DIR, BUILD_SCRIPTS[name][0])] + BUILD_SCRIPTS[name][1:]
+    start = time.perf_counter()
+    proc = subprocess.Popen(args, cwd=workdir, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    _, status, usage = os.wait4(proc.pid, 0)
+    wall = time.perf_counter() - start
+    stderr = proc.stderr.read().decode(errors="replace")
+    proc.stderr.close()
+    if os.waitstatus_to_exitcode(status) != 0:
+        raise RuntimeError(f"❌ {name} lỗi:\n{stderr[-2000:]}")
+    return {"wall_seconds": wall, "cpu_seconds": usage.ru_utime + usage.ru_stime,
+            "peak_rss_mb": _peak_rss_mb(usage.ru_maxrss)}
+
+
+# ===== Phần chạy trong tiến trình con (mỗi phép đo một tiến trình) =====
+def _queries(case, state, n, rng):
+    if case == "search_and_recommend_top10":
+        from utils.synthetic_data import WORDS
+        return [" ".join(rng.choice(WORDS, rng.integers(1, 4))) for _ in range(n)]
+    if case == "recommend_by_product_id_top10":
+        from utils.content_based_top1000 import _get_exclude_mask
+
+        # Sản phẩm bị bộ lọc từ khóa loại không được làm sản phẩm truy vấn (similar_rows báo lỗi)
+        model = state["cb_model"]
+        product_ids = model["product_df"]["product_id"].to_numpy()[~_get_exclude_mask(model)]
+        return rng.choice(product_ids, n).tolist()
+    user_ids = state["cf_model"].user_ids
+    return rng.choice(user_ids, n).tolist()
+
+
+def _run_case(workdir, case, n_calls, warmup, seed):
+    os.chdir(workdir)
+    from utils.catalog import Catalog
+    from utils.collaborative import get_top_n_recommendations
+    from utils.content_based_top1000 import recommend_by_product_id_top10, search_and_recommend_top10
+    from utils.data_store import PRODUCT_DISPLAY_COLUMNS, read_products
+    from utils.model_loader import load_collaborative_model, load_content_model, load_interaction_index
+
+    start = time.perf_counter()
+    if case == "get_top_n_recommendations":
+        state = {"cf_model": load_collaborative_model(),
+                 "products": Catalog.from_df(read_products(PRODUCT_DISPLAY_COLUMNS)),
+                 "interactions": load_interaction_index()}
+        fn = lambda q: get_top_n_recommendations(q, state["cf_model"], state["products"], state["interactions"], n=10)
+    else:
+        state = {"cb_model": load_content_model()}
+        recommend = search_and_recommend_top10 if case == "search_and_recommend_top10" else recommend_by_product_id_top10
+        fn = lambda q: recommend(state["cb_model"], q, top_k=10)
+    load_seconds = time.perf_counter() - start
+
+    queries = _queries(case, state, warmup + n_calls, np.random.default_rng(seed))
+    for q in queries[:warmup]:
+        fn(q)
+
+    timings = []
+    wall_start = time.perf_counter()
+    for q in queries[warmup:]:
+        t = time.perf_counter()
+        fn(q)
+        timings.append(time.perf_counter() - t)
+    wall = time.perf_counter() - wall_start
+
+    result = latency_stats(timings, wall)
+    result["load_seconds"] = load_seconds
+    result["peak_rss_mb"] = _peak_rss_mb(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+    return result
+
+
+def run_case(workdir, case, n_calls, warmup, seed):
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+        return pool.submit(_run_case, workdir, case, n_calls, warmup, seed).result()
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current, previous_path):
+    """In tỉ lệ thay đổi (mới / cũ) của các chỉ số chính so với một file kết quả trước đó."""
+    with open(previous_path) as f:
+        previous = json.load(f)
+    print(f"\n📐 So sánh với {previous_path} (commit {previous['meta'].get('commit')}):")
+    for name, result in current["results"].items():
+        old = previous["results"].get(name)
+        if old is None:
+            continue
+        parts = []
+        for key in ("p50_ms", "p95_ms", "p99_ms", "wall_seconds", "peak_rss_mb"):
+            if result.get(key) and old.get(key):
+                parts.append(f"{key} {old[key]:.2f} -> {result[key]:.2f} ({result[key] / old[key]:.2f}x)")
+        print(f"   {name}: " + ", ".join(parts))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Đo độ trễ / thông lượng / bộ nhớ của các hàm gợi ý.")
+    parser.add_argument("--scale", choices=SCALES, default="small")
+    parser.add_argument("--products", type=int, default=None, help="Ghi đè số sản phẩm của --scale")
+    parser.add_argument("--ratings", type=int, default=None, help="Ghi đè số đánh giá của --scale")
+    parser.add_argument("--calls", type=int, default=200, help="Số lần gọi mỗi hàm")
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--skip-build", action="store_true", help="Dùng mô hình đã build trong thư mục làm việc")
+    parser.add_argument("--workdir", default=None, help="Mặc định: bench_data/<số sản phẩm>x<số đánh giá>")
+    parser.add_argument("--output", default=None, help="Mặc định: reports/benchmark_<scale>.json")
+    parser.add_argument("--compare", default=None, help="File JSON kết quả trước đó để so sánh")
+    args = parser.parse_args()
+
+    n_products, n_ratings = SCALES[args.scale]
+    n_products = args.products or n_products
+    n_ratings = args.ratings or n_ratings
+    workdir = os.path.abspath(args.workdir or os.path.join(REPO_DIR, "bench_data", f"{n_products}x{n_ratings}"))
+    output = args.output or os.path.join(REPO_DIR, "reports", f"benchmark_{args.scale}.json")
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "products": n_products,
+            "ratings": n_ratings,
+            "calls": args.calls,
+            "seed": args.seed,
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "cpu_count": os.cpu_count(),
+            "machine": platform.machine(),
+        },
+        "results": {},
+    }
+
+    print(f"📦 {n_products} sản phẩm, ⭐ {n_ratings} đánh giá — thư mục làm việc {workdir}")
+    if not args.skip_build:
+        prepare_workdir(workdir, n_products, n_ratings, args.seed)
+        for name in BUILD_SCRIPTS:
+            print(f"🏗️ {name}...")
+            report["results"][name] = run_build(name, workdir)
+            print(f"   {report['results'][name]['wall_seconds']:.1f}s, "
+                  f"peak RSS {report['results'][name]['peak_rss_mb']:.0f} MB")
+
+    for case in ("search_and_recommend_top10", "recommend_by_product_id_top10", "get_top_n_recommendations"):
+        print(f"⏱️ {case}...")
+        result = run_case(workdir, case, args.calls, args.warmup, args.seed)
+        report["results"][case] = result
+        print(f"   p50 {result['p50_ms']:.2f} ms, p95 {result['p95_ms']:.2f} ms, p99 {result['p99_ms']:.2f} ms, "
+              f"{result['throughput_per_s']:.1f} truy vấn/s, peak RSS {result['peak_rss_mb']:.0f} MB")
+
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    print(f"💾 Đã lưu {output}")
+
+    if args.compare:
+        compare(report, args.compare)
@@ -1,33 +1,75 @@
 # build_collaborative_model.py
-import pandas as pd
-import joblib
+# python3 build_collaborative_model.py          # chỉ đọc phần được nối thêm vào file đánh giá, khởi tạo tiếp từ phiên bản trước
+# python3 build_collaborative_model.py --full   # luôn đọc cả file và huấn luyện lại từ đầu (surprise.SVD)
+
+import argparse
 import os
-from surprise import Dataset, Reader, SVD
 
-# ===== Bước 1: Đọc dữ liệu gốc =====
-rating_path = "data/Products_ThoiTrangNam_rating_clean.csv"
-df = pd.read_csv(rating_path, sep="\t")
-print(f"📊 Tổng số dòng dữ liệu: {len(df)}")
+from utils.collaborative import SVDScorer
+from utils.data_store import ratings_end
+from utils.interactions import INTERACTIONS_NAME, InteractionIndex
+from utils.model_loader import CF_MODEL_NAME
+from utils.model_store import latest_version_dir, version_root, write_version
+from utils.svd_training import (
+    N_EPOCHS, N_FACTORS, REG, RatingLog, appended_since, train_full, train_incremental, train_state,
+)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Huấn luyện mô hình collaborative filtering (SVD).")
+    parser.add_argument("--full", action="store_true", help="Bỏ qua mô hình trước, huấn luyện lại toàn bộ")
+    parser.add_argument("--min-ratings", type=int, default=3, help="Chỉ giữ user có ít nhất số đánh giá này")
+    parser.add_argument("--factors", type=int, default=N_FACTORS)
+    parser.add_argument("--epochs", type=int, default=N_EPOCHS, help="Số epoch khi huấn luyện toàn bộ")
+    parser.add_argument("--reg", type=float, default=REG)
+    parser.add_argument("--incremental-epochs", type=int, default=3,
+                        help="Số epoch SGD trên user/sản phẩm bị ảnh hưởng khi huấn luyện tăng dần")
+    parser.add_argument("--chunksize", type=int, default=1_000_000, help="Số dòng đánh giá đọc mỗi lần")
+    args = parser.parse_args()
 
-# ===== Bước 2: Lọc user có ít nhất 3 lượt đánh giá =====
-user_counts = df['user_id'].value_counts()
-valid_users = user_counts[user_counts >= 3].index
-filtered_df = df[df['user_id'].isin(valid_users)].copy()
-print(f"✅ Số user đủ điều kiện (≥3 đánh giá): {len(valid_users)}")
-print(f"📂 Số dòng sau khi lọc: {len(filtered_df)}")
+    # ===== Bước 1: Mô hình trước và chỉ mục đánh giá đi kèm (để chỉ đọc phần mới) =====
+    end = ratings_end()
+    previous, previous_state, previous_index = None, None, None
+    previous_dir = latest_version_dir(CF_MODEL_NAME)
+    if not args.full and previous_dir is not None:
+        previous_state = SVDScorer.load_train_state(previous_dir)
+        index_dir = os.path.join(version_root(INTERACTIONS_NAME),
+                                 (previous_state or {}).get("interactions_version") or "")
+        if not appended_since(previous_state, end):
+            print("⚠️ File đánh giá đã bị ghi lại (không chỉ nối thêm) — huấn luyện lại toàn bộ.")
+        elif not os.path.isdir(index_dir):
+            print("⚠️ Không còn chỉ mục đánh giá của phiên bản trước — huấn luyện lại toàn bộ.")
+        else:
+            previous = SVDScorer.load(previous_dir, mmap_mode=None)
+            previous_index = InteractionIndex.load(index_dir)
+            print(f"♻️ Khởi tạo từ phiên bản {previous_dir} (đã đọc tới vị trí {previous_state['position']})")
 
-# ===== Bước 3: Huấn luyện mô hình collaborative filtering với Surprise =====
-reader = Reader(rating_scale=(1, 5))
-data = Dataset.load_from_df(filtered_df[['user_id', 'product_id', 'rating']], reader)
-trainset = data.build_full_trainset()
+    # ===== Bước 2: Đọc dữ liệu đánh giá theo khối và huấn luyện =====
+    if previous is not None:
+        log = RatingLog.read(chunksize=args.chunksize, start=previous_state["position"], end=end)
+        print(f"📊 Số dòng mới: {len(log)}")
+        index = previous_index.extend(log.user_raw, log.item_raw, log.ratings)
+        print("🤖 Đang cập nhật mô hình SVD...")
+        scorer, stats = train_incremental(
+            previous, index, log, min_ratings=args.min_ratings,
+            incremental_epochs=args.incremental_epochs, reg=args.reg,
+        )
+        print(f"✅ Huấn luyện tăng dần: {stats['new_rows']} dòng mới, cập nhật {stats['updated_users']} user, "
+              f"{stats['updated_items']} sản phẩm ({stats['sgd_ratings']} đánh giá dùng cho SGD)")
+    else:
+        log = RatingLog.read(chunksize=args.chunksize, end=end)
+        print(f"📊 Tổng số dòng dữ liệu: {len(log)}")
+        index = InteractionIndex.from_arrays(log.user_raw, log.item_raw, log.ratings)
+        print("🤖 Đang huấn luyện mô hình SVD...")
+        scorer, stats = train_full(log, min_ratings=args.min_ratings, n_factors=args.factors,
+                                   n_epochs=args.epochs, reg=args.reg)
+        print(f"✅ Huấn luyện toàn bộ: {stats['updated_users']} user, {stats['updated_items']} sản phẩm")
+    print(f"📉 RMSE trên các đánh giá đã huấn luyện: {stats['train_rmse']:.4f} ({stats['seconds']:.1f}s)")
 
-model = SVD()
-print("🤖 Đang huấn luyện mô hình SVD...")
-model.fit(trainset)
-print("✅ Huấn luyện xong.")
+    # ===== Bước 3: Chỉ mục đánh giá dùng chung (toàn bộ lịch sử tới cùng vị trí, giữ khớp với mô hình) =====
+    index_dir = write_version(INTERACTIONS_NAME, index.save)
+    print(f"💾 Chỉ mục đánh giá đã lưu tại: {index_dir}")
 
-# ===== Bước 4: Lưu mô hình bằng joblib =====
-os.makedirs("models", exist_ok=True)
-model_path = "models/collaborative_model_svd.joblib"  # khuyến khích dùng .joblib
-joblib.dump(model, model_path)
-print(f"💾 Mô hình đã lưu tại: {model_path} (dùng joblib)")
\ No newline at end of file
+    # ===== Bước 4: Lưu phiên bản mới (ma trận nhân tố .npy để app mở bằng mmap) =====
+    state = train_state(end, os.path.basename(index_dir))
+    version_dir = write_version(CF_MODEL_NAME, lambda tmp_dir: scorer.save(tmp_dir, train_state=state))
+    print(f"💾 Mô hình đã lưu tại: {version_dir}")
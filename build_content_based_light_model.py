@@ -1,69 +1,224 @@
 # build_content_based_light_model.py
 # python3 build_content_based_light_model.py
+# python3 build_content_based_light_model.py --legacy-pkl   # ghi thêm file .pkl cũ (bản sao đầy đủ của mô hình)
 
+import argparse
 import pandas as pd
 import joblib
 import os
 import re
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from scipy import sparse
+from sklearn.feature_extraction.text import CountVectorizer, TfidfTransformer, TfidfVectorizer
+
+from utils.ann_index import IVFIndex, recall_at_k
+from utils.content_based_top1000 import compute_top_k_neighbors, save_model_dir
+from utils.model_loader import CB_MODEL_NAME
+from utils.model_store import write_version
+from utils.data_store import iter_products, PRODUCT_DISPLAY_COLUMNS, PRODUCT_MODEL_COLUMNS
+from utils.keyword_filter import FEMALE_KEYWORDS, KeywordFilter
 
 # ========== Cài đặt ==========
-input_file = "data/Products_ThoiTrangNam_clean.csv"
 output_pkl = "models/content_based_model_top1000.pkl"
-NUM_PRODUCTS = 1000  # Giới hạn số sản phẩm để giảm dung lượng .pkl
+NUM_PRODUCTS = None  # None = toàn bộ sản phẩm (mô hình chỉ lưu top-K láng giềng nên không cần giới hạn)
+TOP_K_NEIGHBORS = 50  # Số láng giềng lưu cho mỗi sản phẩm (>= top_k * 5 khi gợi ý)
+CHUNK_CELLS = 50_000_000  # Số ô tối đa của một khối similarity (chunk x N) trong bộ nhớ
+CHUNK_ROWS = 20_000  # Số dòng sản phẩm đọc và xử lý mỗi khối
+WORKERS = None  # Số tiến trình tiền xử lý (None = số CPU)
+# Sản phẩm chứa các từ khóa này (trong tên) vẫn nằm trong mô hình nhưng bị đánh dấu trong exclude_mask
+# và không bao giờ được gợi ý. Đổi luật không cần build lại: python3 update_content_filter.py
+EXCLUDE_KEYWORDS = FEMALE_KEYWORDS
+EXCLUDE_COLUMNS = ("product_name",)
+BUILD_ANN = True  # Xây thêm chỉ mục ANN (IVF) cho backend="ann"
+ANN_COMPONENTS = 128  # Số chiều sau TruncatedSVD
+ANN_N_PROBES = (1, 2, 4, 8, 16, 32)  # Các giá trị n_probe được thử khi đo recall
+ANN_RERANK_FACTORS = (5, 10, 20, 40)  # Số ứng viên (x k) được chấm lại chính xác trên TF-IDF
+ANN_TARGET_RECALL = 0.9  # Chọn cấu hình rẻ nhất đạt recall@10 này
 
 # ========== Hàm tiền xử lý ==========
+# Biên dịch regex một lần. URL và chữ số đều bị xóa nên gộp thành một lượt quét
+# (cho kết quả giống hệt xóa URL -> thay dấu câu -> xóa số như trước).
+DROP_RE = re.compile(r'https?://\S+|www\.\S+|\d+')
+PUNCT_RE = re.compile(r'[^\w\s]')
+
+
 def preprocess_text(text):
-    text = str(text).lower()
-    text = re.sub(r'https?://\S+|www\.\S+', '', text)
-    text = re.sub(r'[^\w\s]', ' ', text)
-    text = re.sub(r'\d+', '', text)
-    return text
+    return PUNCT_RE.sub(' ', DROP_RE.sub('', str(text).lower()))
+
+
+def preprocess_series(texts):
+    """preprocess_text cho cả một cột (chạy trong tiến trình con trên từng khối)."""
+    return texts.str.lower().str.replace(DROP_RE, '', regex=True).str.replace(PUNCT_RE, ' ', regex=True)
+
+
+def make_count_vectorizer():
+    # Cùng bộ tách từ với TfidfVectorizer dùng lúc truy vấn
+    return CountVectorizer(stop_words="english", dtype=np.int32)
+
+
+def prepare_chunk(chunk, keyword_filter):
+    """
+    Xử lý một khối sản phẩm trong tiến trình con: làm sạch văn bản, lọc sản phẩm không hợp lệ,
+    đánh dấu sản phẩm bị loại theo keyword_filter, đếm từ bằng từ điển riêng của khối.
+    Trả về (bảng hiển thị, mask loại trừ, ma trận đếm CSR, danh sách từ của khối).
+    """
+    combined_text = preprocess_series(chunk["product_name"].fillna("") + " " + chunk["clean_description"].fillna(""))
+    keep = (combined_text.notnull() & (chunk["price"] > 0)).to_numpy()
+
+    products = chunk.loc[keep, PRODUCT_DISPLAY_COLUMNS].reset_index(drop=True)
+    exclude_mask = keyword_filter.mask(products)
+    vectorizer = make_count_vectorizer()
+    try:
+        counts = vectorizer.fit_transform(combined_text[keep])
+        terms = vectorizer.get_feature_names_out().tolist()
+    except ValueError:
+        # Khối không còn từ nào (rỗng hoặc toàn stop word)
+        counts, terms = sparse.csr_matrix((int(keep.sum()), 0), dtype=np.int32), []
+    return products, exclude_mask, counts.tocsr(), terms
+
+
+def imap_bounded(pool, fn, iterable, max_pending):
+    """Như pool.map nhưng chỉ giữ tối đa max_pending khối đang chờ, để không đọc cả file vào bộ nhớ."""
+    pending = deque()
+    for item in iterable:
+        pending.append(pool.submit(fn, item))
+        if len(pending) >= max_pending:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def stream_counts(chunks, keyword_filter, workers=WORKERS):
+    """
+    Tiền xử lý song song các khối và gộp ma trận đếm từ với một từ điển chung.
+    Trả về (bảng sản phẩm, mask loại trừ, ma trận đếm CSR, từ điển {từ: cột}).
+    """
+    workers = workers or os.cpu_count() or 1
+    vocabulary = {}
+    frames, masks, blocks = [], [], []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        max_pending = 2 * workers
+        prepare = partial(prepare_chunk, keyword_filter=keyword_filter)
+        for products, exclude_mask, counts, terms in imap_bounded(pool, prepare, chunks, max_pending):
+            # Ánh xạ cột của từ điển khối sang cột của từ điển chung
+            columns = np.fromiter((vocabulary.setdefault(t, len(vocabulary)) for t in terms),
+                                  dtype=np.int64, count=len(terms))
+            blocks.append((counts.data, columns[counts.indices], counts.indptr))
+            frames.append(products)
+            masks.append(exclude_mask)
+            print(f"   ... {sum(len(f) for f in frames)} sản phẩm hợp lệ, {len(vocabulary)} từ")
+
+    n_terms = len(vocabulary)
+    counts = sparse.vstack([
+        sparse.csr_matrix((data, indices, indptr), shape=(len(indptr) - 1, n_terms))
+        for data, indices, indptr in blocks
+    ], format="csr") if blocks else sparse.csr_matrix((0, n_terms), dtype=np.int32)
+    products = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=PRODUCT_DISPLAY_COLUMNS)
+    exclude_mask = np.concatenate(masks) if masks else np.zeros(0, dtype=bool)
+    return products, exclude_mask, counts, vocabulary
+
+
+def fit_tfidf(counts, vocabulary):
+    """
+    TF-IDF từ ma trận đếm (giống TfidfVectorizer.fit_transform trên toàn bộ văn bản),
+    kèm một TfidfVectorizer với từ điển và idf cố định để vector hóa từ khóa lúc truy vấn.
+    """
+    # Bỏ từ không còn xuất hiện (vd. sau khi lấy mẫu) và sắp theo thứ tự chữ cái như TfidfVectorizer
+    used = np.flatnonzero(counts.getnnz(axis=0))
+    terms = np.array(list(vocabulary), dtype=object)[used]
+    order = np.argsort(terms.astype(str), kind="stable")
+    counts = counts[:, used[order]]
+    terms = terms[order].tolist()
+
+    transformer = TfidfTransformer()
+    tfidf_matrix = transformer.fit_transform(counts).astype(np.float32)
+    vectorizer = TfidfVectorizer(stop_words="english", dtype=np.float32, vocabulary=terms)
+    vectorizer.idf_ = transformer.idf_
+    return vectorizer, tfidf_matrix.tocsr()
 
-female_keywords = [
-    "nữ", "croptop", "váy", "đầm", "áo dây", "baby doll",
-    "đồ bộ nữ", "xinh", "dễ thương", "form rộng", "áo đôi", "cặp đôi"
-]
 
-def is_suspect(text):
-    text = str(text).lower()
-    return any(word in text for word in female_keywords)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Xây mô hình content-based (TF-IDF + top-K láng giềng).")
+    parser.add_argument("--legacy-pkl", action="store_true",
+                        help=f"Ghi thêm {output_pkl} cho công cụ cũ (app chỉ cần thư mục phiên bản)")
+    args = parser.parse_args()
 
-# ========== Đọc & lọc dữ liệu ==========
-print("📦 Đang load dữ liệu...")
-df = pd.read_csv(input_file)
+    # ========== Đọc, làm sạch & đếm từ theo từng khối ==========
+    print(f"📦 Đang đọc và tiền xử lý dữ liệu theo khối {CHUNK_ROWS} dòng...")
+    keyword_filter = KeywordFilter(EXCLUDE_KEYWORDS, columns=EXCLUDE_COLUMNS)
+    df_sample, exclude_mask, counts, vocabulary = stream_counts(
+        iter_products(PRODUCT_MODEL_COLUMNS, chunksize=CHUNK_ROWS), keyword_filter)
 
-# Xử lý mô tả
-df["combined_text"] = (df["product_name"].fillna("") + " " + df["clean_description"].fillna("")).apply(preprocess_text)
+    # Lọc ngẫu nhiên NUM_PRODUCTS sản phẩm nếu có giới hạn (đảm bảo reproducibility)
+    if NUM_PRODUCTS is not None and NUM_PRODUCTS < len(df_sample):
+        rows = np.sort(np.random.default_rng(42).choice(len(df_sample), size=NUM_PRODUCTS, replace=False))
+        df_sample = df_sample.iloc[rows].reset_index(drop=True)
+        counts = counts[rows]
+        exclude_mask = exclude_mask[rows]
 
-# Gắn nhãn sản phẩm nghi ngờ là nữ
-df["possibly_female"] = df["product_name"].apply(is_suspect)
+    print(f"✅ Đã chọn {df_sample.shape[0]} sản phẩm hợp lệ cho mô hình "
+          f"({int(exclude_mask.sum())} sản phẩm bị loại khỏi gợi ý theo {keyword_filter}).")
 
-# Loại bỏ sản phẩm không hợp lệ
-df = df[df["combined_text"].notnull() & (df["price"] > 0) & (~df["possibly_female"])]
+    # ========== Xây dựng mô hình TF-IDF ==========
+    print("🔍 Đang tính TF-IDF...")
+    vectorizer, tfidf_matrix = fit_tfidf(counts, vocabulary)
+    del counts
 
-# Lọc ngẫu nhiên 1000 sản phẩm (đảm bảo reproducibility)
-df_sample = df.sample(n=min(NUM_PRODUCTS, len(df)), random_state=42).reset_index(drop=True)
+    print(f"📊 Đang tính top-{TOP_K_NEIGHBORS} sản phẩm tương đồng theo từng khối...")
+    # Sản phẩm bị loại không chiếm chỗ trong top-K láng giềng của sản phẩm khác
+    neighbor_indices, neighbor_scores = compute_top_k_neighbors(
+        tfidf_matrix, TOP_K_NEIGHBORS, chunk_cells=CHUNK_CELLS, exclude_mask=exclude_mask)
 
-print(f"✅ Đã chọn {df_sample.shape[0]} sản phẩm hợp lệ cho mô hình.")
+    ann_index = None
+    ann_recall = None
+    if BUILD_ANN and tfidf_matrix.shape[0] > 1:
+        print(f"🧭 Đang xây chỉ mục ANN (SVD {ANN_COMPONENTS} chiều + IVF)...")
+        ann_index = IVFIndex.build(tfidf_matrix, n_components=ANN_COMPONENTS)
 
-# ========== Xây dựng mô hình TF-IDF ==========
-print("🔍 Đang vector hóa TF-IDF...")
-vectorizer = TfidfVectorizer(stop_words="english")
-tfidf_matrix = vectorizer.fit_transform(df_sample["combined_text"])
+        # Đo recall@10 so với cosine chính xác cho từng cấu hình, từ rẻ đến đắt (đánh đổi tốc độ / chất lượng)
+        n_lists = len(ann_index.centroids)
+        configs = sorted(
+            ((p, r) for p in ANN_N_PROBES if p <= n_lists for r in ANN_RERANK_FACTORS),
+            key=lambda c: c[0] * tfidf_matrix.shape[0] / n_lists + 10 * c[1],
+        )
+        best = None
+        for n_probe, rerank_factor in configs:
+            recall, ms_per_query = recall_at_k(ann_index, tfidf_matrix, k=10,
+                                               n_probe=n_probe, rerank_factor=rerank_factor)
+            print(f"   n_probe={n_probe:>3}, rerank={rerank_factor:>3}: "
+                  f"recall@10 = {recall:.3f}, {ms_per_query:.2f} ms/truy vấn")
+            if best is None or recall > best[2]:
+                best = (n_probe, rerank_factor, recall)
+            if recall >= ANN_TARGET_RECALL:
+                break
+        ann_index.n_probe, ann_index.rerank_factor, ann_recall = best
+        print(f"✅ Chọn n_probe={ann_index.n_probe}, rerank={ann_index.rerank_factor} (recall@10 = {ann_recall:.3f})")
 
-print("📊 Đang tính toán ma trận cosine similarity...")
-cosine_sim = cosine_similarity(tfidf_matrix, tfidf_matrix)
+    # ========== Lưu mô hình ==========
+    print("💾 Đang lưu mô hình...")
+    model = {
+        "product_df": df_sample,
+        "tfidf_vectorizer": vectorizer,
+        "tfidf_matrix": tfidf_matrix.tocsr(),
+        "neighbor_indices": neighbor_indices,
+        "neighbor_scores": neighbor_scores,
+        "exclude_mask": exclude_mask,
+        "exclude_keywords": keyword_filter.keywords,
+        "exclude_columns": keyword_filter.columns,
+    }
+    if ann_index is not None:
+        model["ann_index"] = ann_index
+        model["ann_recall_at_10"] = ann_recall
 
-# ========== Lưu mô hình ==========
-print("💾 Đang lưu mô hình .pkl ...")
-model = {
-    "product_df": df_sample,
-    "tfidf_vectorizer": vectorizer,
-    "cosine_similarity": cosine_sim
-}
+    # Thư mục phiên bản: mảng lớn dạng .npy để app mở bằng mmap, dùng chung giữa các worker
+    version_dir = write_version(CB_MODEL_NAME, lambda tmp_dir: save_model_dir(model, tmp_dir))
+    print(f"🎉 Phiên bản mmap đã lưu vào {version_dir}")
 
-joblib.dump(model, output_pkl)
-print(f"🎉 Mô hình đã lưu vào {output_pkl}")
\ No newline at end of file
+    # File .pkl cũ là bản sao thứ hai của toàn bộ mô hình: chỉ ghi khi được yêu cầu
+    if args.legacy_pkl:
+        os.makedirs(os.path.dirname(output_pkl), exist_ok=True)
+        joblib.dump(model, output_pkl)
+        print(f"🎉 Mô hình .pkl đã lưu vào {output_pkl}")
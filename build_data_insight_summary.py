@@ -0,0 +1,20 @@
+# build_data_insight_summary.py
+# python3 build_data_insight_summary.py
+
+import os
+import time
+
+import joblib
+
+from utils.data_insight_summary import SUMMARY_PATH, build_summary
+
+if __name__ == "__main__":
+    print("📊 Đang tổng hợp số liệu cho trang Khám phá dữ liệu...")
+    start = time.perf_counter()
+    summary = build_summary()
+
+    os.makedirs(os.path.dirname(SUMMARY_PATH), exist_ok=True)
+    joblib.dump(summary, SUMMARY_PATH)
+    size_kb = os.path.getsize(SUMMARY_PATH) / 1024
+    print(f"💾 Đã lưu {SUMMARY_PATH} ({size_kb:.0f} KB, fingerprint {summary['fingerprint']}) "
+          f"trong {time.perf_counter() - start:.1f}s")
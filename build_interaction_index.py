@@ -0,0 +1,23 @@
+# build_interaction_index.py
+# python3 build_interaction_index.py
+
+import argparse
+import time
+
+from utils.interactions import INTERACTIONS_NAME, InteractionIndex
+from utils.model_store import write_version
+from utils.svd_training import RatingLog
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Dựng chỉ mục đánh giá user <-> sản phẩm (CSR hai chiều).")
+    parser.add_argument("--chunksize", type=int, default=1_000_000, help="Số dòng đánh giá đọc mỗi lần")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    log = RatingLog.read(chunksize=args.chunksize)
+    index = InteractionIndex.from_arrays(log.user_raw, log.item_raw, log.ratings)
+    print(f"📊 {len(index)} đánh giá, 👥 {index.n_users} user, 📦 {index.n_items} sản phẩm "
+          f"({time.perf_counter() - start:.1f}s)")
+
+    version_dir = write_version(INTERACTIONS_NAME, index.save)
+    print(f"💾 Chỉ mục đã lưu tại: {version_dir}")
@@ -0,0 +1,21 @@
+# build_thumbnails.py
+# python3 build_thumbnails.py
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.thumbnails import MAX_CACHE_BYTES, NO_IMAGE, PRODUCT_IMAGE_DIR, get_thumbnail, trim_cache
+
+if __name__ == "__main__":
+    product_ids = [name[:-len(".jpeg")] for name in os.listdir(PRODUCT_IMAGE_DIR) if name.endswith(".jpeg")]
+    print(f"🖼️ Đang tạo thumbnail cho {len(product_ids)} ảnh sản phẩm...")
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as pool:
+        results = list(pool.map(get_thumbnail, product_ids))
+
+    failed = sum(path == NO_IMAGE for path in results)
+    total = trim_cache(MAX_CACHE_BYTES)
+    print(f"✅ Xong trong {time.perf_counter() - start:.1f}s — lỗi: {failed}, "
+          f"dung lượng cache: {total / 1024 ** 2:.1f} MB")
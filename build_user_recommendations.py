@@ -0,0 +1,161 @@
+# build_user_recommendations.py
+# python3 build_user_recommendations.py              # tính lại toàn bộ
+# python3 build_user_recommendations.py --incremental  # chỉ tính lại user có đánh giá thay đổi
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from utils.collaborative import UserTopNTable, catalog_item_ids, get_svd_scorer, model_fingerprint
+from utils.data_store import read_products
+from utils.model_loader import load_collaborative_model, load_interaction_index
+
+OUTPUT_PATH = "models/user_topn_recommendations.npz"
+TOP_N = 50  # Lưu dư để trang vẫn đủ gợi ý sau khi lọc sản phẩm không hợp lệ
+MIN_RATINGS = 3  # Giống điều kiện lọc user khi huấn luyện
+CHUNK_CELLS = 10_000_000  # Số ô tối đa (user x sản phẩm) của một khối điểm trong mỗi tiến trình
+
+
+def user_fingerprints(index):
+    """
+    Dấu vân tay (uint64) cho tập đánh giá của mỗi user, không phụ thuộc thứ tự dòng.
+    Trả về mảng theo thứ tự index.user_ids (InteractionIndex).
+    """
+    rows = pd.DataFrame({"product_id": index.item_ids[index.user_items], "rating": index.user_ratings})
+    row_hash = pd.util.hash_pandas_object(rows, index=False).to_numpy()
+    degree = index.user_degree()
+    fp = np.zeros(index.n_users, dtype=np.uint64)
+    # Mỗi user là một đoạn liên tiếp của CSR: cộng dồn theo đoạn (user trong chỉ mục luôn có >= 1 đánh giá)
+    if len(row_hash):
+        fp[:] = np.add.reduceat(row_hash, index.user_indptr[:-1])
+    fp ^= degree.astype(np.uint64) * np.uint64(0x9E3779B97F4A7C15)
+    return fp
+
+
+# ===== Phần chạy trong tiến trình con =====
+_worker = {}
+
+
+def _init_worker(scorer, item_inner, rated_matrix, top_n):
+    _worker.update(scorer=scorer, item_inner=item_inner, rated_matrix=rated_matrix, top_n=top_n)
+
+
+def _score_chunk(task):
+    """Chấm điểm một khối user với toàn bộ sản phẩm, loại sản phẩm đã đánh giá, lấy top-N mỗi dòng."""
+    rows, user_inner = task
+    scorer, item_inner = _worker["scorer"], _worker["item_inner"]
+    scores = scorer.score_matrix(user_inner, item_inner)
+
+    rated = _worker["rated_matrix"][rows]
+    r, c = rated.nonzero()
+    scores[r, c] = -np.inf
+
+    k = min(_worker["top_n"], scores.shape[1])
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    top_scores = np.take_along_axis(scores, top, axis=1)
+    order = np.argsort(-top_scores, axis=1, kind="stable")
+    top = np.take_along_axis(top, order, axis=1)
+    top_scores = np.take_along_axis(top_scores, order, axis=1)
+    top[~np.isfinite(top_scores)] = -1
+    return rows, top, top_scores.astype(np.float32)
+
+
+def score_users(scorer, user_ids, item_ids, index, top_n=TOP_N, workers=None):
+    """
+    Tính top-N cho các user trong user_ids bằng các phép nhân ma trận theo khối,
+    chia khối cho nhiều tiến trình. Trả về (top product_ids, top scores) theo thứ tự user_ids.
+    """
+    item_ids = np.asarray(item_ids)
+    item_inner = scorer.inner_item_ids(item_ids)
+    user_inner = scorer.user_index.get_many(user_ids)
+
+    # Ma trận thưa user x sản phẩm đánh dấu các sản phẩm đã đánh giá (để loại khỏi gợi ý):
+    # lấy các dòng CSR của user trong InteractionIndex, đổi cột sang vị trí trong item_ids
+    rated = index.user_item_matrix()[index.user_index.get_many(user_ids)]
+    cols = pd.Index(item_ids).get_indexer(index.item_ids)[rated.indices]
+    rows = np.repeat(np.arange(len(user_ids)), np.diff(rated.indptr))
+    keep = cols >= 0
+    rated_matrix = sparse.csr_matrix(
+        (np.ones(keep.sum(), dtype=np.int8), (rows[keep], cols[keep])),
+        shape=(len(user_ids), len(item_ids)),
+    )
+
+    chunk_size = max(1, CHUNK_CELLS // max(len(item_ids), 1))
+    tasks = [
+        (np.arange(start, min(start + chunk_size, len(user_ids))), user_inner[start:start + chunk_size])
+        for start in range(0, len(user_ids), chunk_size)
+    ]
+
+    k = min(top_n, len(item_ids))
+    top_ids = np.full((len(user_ids), k), -1, dtype=np.int64)
+    top_scores = np.zeros((len(user_ids), k), dtype=np.float32)
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(scorer, item_inner, rated_matrix, top_n)) as pool:
+        for done, (rows, top, scores) in enumerate(pool.map(_score_chunk, tasks), start=1):
+            top_ids[rows] = np.where(top >= 0, item_ids[np.maximum(top, 0)], -1)
+            top_scores[rows] = scores
+            if done % 10 == 0 or done == len(tasks):
+                print(f"   ... {min(done * chunk_size, len(user_ids))}/{len(user_ids)} user")
+
+    return top_ids, top_scores
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tính sẵn top-N gợi ý cho toàn bộ user.")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Chỉ tính lại user có đánh giá thay đổi kể từ lần chạy trước")
+    parser.add_argument("--top-n", type=int, default=TOP_N)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--output", default=OUTPUT_PATH)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    scorer = get_svd_scorer(load_collaborative_model())
+    index = load_interaction_index()
+    item_ids = catalog_item_ids(read_products(["product_id"])["product_id"])
+
+    # User đủ điều kiện: có ít nhất MIN_RATINGS lượt đánh giá (bậc của user trong chỉ mục, đã sắp theo user_id)
+    eligible = index.user_degree() >= MIN_RATINGS
+    fingerprints = user_fingerprints(index)[eligible]
+    user_ids = index.user_ids[eligible]
+    model_fp = model_fingerprint(scorer, item_ids)
+    print(f"👥 {len(user_ids)} user đủ điều kiện, 📦 {len(item_ids)} sản phẩm")
+
+    previous = None
+    if args.incremental and os.path.exists(args.output):
+        previous = UserTopNTable.load(args.output)
+        if previous.model_fingerprint != model_fp or previous.top_ids.shape[1] != min(args.top_n, len(item_ids)):
+            print("♻️ Mô hình hoặc danh mục sản phẩm đã đổi — tính lại toàn bộ.")
+            previous = None
+
+    top_ids = np.full((len(user_ids), min(args.top_n, len(item_ids))), -1, dtype=np.int64)
+    top_scores = np.zeros(top_ids.shape, dtype=np.float32)
+    todo = np.ones(len(user_ids), dtype=bool)
+
+    if previous is not None:
+        # Giữ lại kết quả của user có dấu vân tay đánh giá không đổi
+        prev_rows = pd.Index(previous.user_ids).get_indexer(user_ids)
+        found = prev_rows >= 0
+        unchanged = found.copy()
+        unchanged[found] = previous.user_fingerprints[prev_rows[found]] == fingerprints[found]
+        top_ids[unchanged] = previous.top_ids[prev_rows[unchanged]]
+        top_scores[unchanged] = previous.top_scores[prev_rows[unchanged]]
+        todo = ~unchanged
+
+    print(f"🤖 Đang chấm điểm {todo.sum()} user...")
+    if todo.any():
+        top_ids[todo], top_scores[todo] = score_users(
+            scorer, user_ids[todo], item_ids, index, top_n=args.top_n, workers=args.workers
+        )
+
+    table = UserTopNTable(user_ids, top_ids, top_scores, fingerprints, model_fp)
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    table.save(args.output)
+    size_mb = os.path.getsize(args.output) / 1024 ** 2
+    print(f"💾 Đã lưu {args.output} ({size_mb:.1f} MB) trong {time.perf_counter() - start:.1f}s")
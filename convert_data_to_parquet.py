@@ -0,0 +1,37 @@
+# convert_data_to_parquet.py
+# python3 convert_data_to_parquet.py
+
+import os
+import time
+
+import pandas as pd
+
+from utils.data_store import (
+    PRODUCTS_CSV, RATINGS_CSV, PRODUCTS_PARQUET, RATINGS_PARQUET,
+    type_products, type_ratings,
+)
+
+
+def convert(csv_path, parquet_path, typer, **read_kwargs):
+    start = time.perf_counter()
+    df = typer(pd.read_csv(csv_path, **read_kwargs))
+    os.makedirs(os.path.dirname(parquet_path), exist_ok=True)
+
+    # Ghi ra file tạm rồi đổi tên để loader không bao giờ đọc phải file ghi dở
+    tmp_path = parquet_path + ".tmp"
+    df.to_parquet(tmp_path, index=False, compression="zstd")
+    os.replace(tmp_path, parquet_path)
+
+    csv_mb = os.path.getsize(csv_path) / 1024 ** 2
+    parquet_mb = os.path.getsize(parquet_path) / 1024 ** 2
+    print(f"✅ {csv_path} ({csv_mb:.1f} MB) -> {parquet_path} ({parquet_mb:.1f} MB), "
+          f"{len(df)} dòng, {time.perf_counter() - start:.1f}s")
+    print(df.dtypes.to_string())
+
+
+if __name__ == "__main__":
+    print("📦 Đang chuyển dữ liệu sản phẩm sang Parquet...")
+    convert(PRODUCTS_CSV, PRODUCTS_PARQUET, type_products)
+
+    print("📦 Đang chuyển dữ liệu đánh giá sang Parquet...")
+    convert(RATINGS_CSV, RATINGS_PARQUET, type_ratings, sep="\t")
@@ -1,21 +1,184 @@
-import pandas as pd
+# download_product_images.py
+# python3 download_product_images.py --workers 16
+
+import argparse
+import json
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from utils.data_store import read_products
+
+OUTPUT_DIR = "images/products"
+MANIFEST_NAME = "manifest.json"
+
+
+def make_session(workers, retries=3, backoff=0.5):
+    """Session dùng chung với connection pool đủ cho số luồng và retry có backoff."""
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=["GET"],
+    )
+    adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def collect_tasks(df):
+    """
+    Danh sách (product_id, url ảnh đầu tiên) của các sản phẩm có link ảnh hợp lệ.
+    Mỗi product_id chỉ một tác vụ (dòng đầu tiên có link hợp lệ): các dòng trùng mã cùng ghi
+    một file <product_id>.jpeg và một mục manifest nên không được tải song song.
+    """
+    tasks = {}
+    for product_id, image in zip(df["product_id"], df["image"]):
+        product_id = str(product_id)
+        if product_id in tasks:
+            continue
+        image_links = str(image if image is not None else "").split()
+        if image_links and image_links[0].startswith("http"):
+            tasks[product_id] = image_links[0]
+    return list(tasks.items())
+
+
+def load_manifest(output_dir):
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    return {}
+
+
+def save_manifest(output_dir, manifest):
+    # Ghi file tạm rồi đổi tên để manifest không bị hỏng nếu tiến trình dừng giữa chừng
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def image_path(output_dir, product_id):
+    return os.path.join(output_dir, f"{product_id}.jpeg")
+
 
-df = pd.read_csv("data/Products_ThoiTrangNam_clean.csv")
-output_dir = "images/products"
-os.makedirs(output_dir, exist_ok=True)
+def fetch_one(session, product_id, url, output_dir, entry=None, revalidate=False, timeout=10):
+    """
+    Tải một ảnh. Trả về (trạng thái, entry manifest mới, số byte).
+    Trạng thái: "skipped" (đã có, không kiểm tra lại), "not_modified" (server trả 304), "downloaded".
+    """
+    path = image_path(output_dir, product_id)
+    have_file = entry is not None and entry.get("url") == url and os.path.exists(path)
+    if have_file and not revalidate:
+        return "skipped", entry, 0
 
-for _, row in df.iterrows():
-    product_id = row['product_id']
-    image_links = str(row.get("image", "")).split()
-    if image_links:
-        first_img = image_links[0]
-        if first_img.startswith("http"):
+    headers = {}
+    if have_file:
+        # Hỏi lại server có điều kiện: chỉ tải nếu ảnh đã thay đổi
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+    response = session.get(url, timeout=timeout, headers=headers)
+    if response.status_code == 304 and have_file:
+        return "not_modified", entry, 0
+    response.raise_for_status()
+    content = response.content
+    if not content:
+        raise ValueError("ảnh rỗng")
+
+    tmp_path = path + ".part"
+    with open(tmp_path, "wb") as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+    new_entry = {
+        "url": url,
+        "size": len(content),
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+    }
+    return "downloaded", new_entry, len(content)
+
+
+def download_images(tasks, output_dir=OUTPUT_DIR, workers=16, revalidate=False,
+                    timeout=10, session=None, checkpoint_every=500):
+    """
+    Tải song song các ảnh theo danh sách (product_id, url), bỏ qua ảnh đã có trong manifest.
+    Trả về dict thống kê (số ảnh theo trạng thái, lỗi, thời gian, throughput).
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = load_manifest(output_dir)
+    session = session or make_session(workers)
+
+    stats = {"downloaded": 0, "skipped": 0, "not_modified": 0, "failed": 0, "bytes": 0}
+    failures = []
+    start = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(fetch_one, session, pid, url, output_dir,
+                        manifest.get(pid), revalidate, timeout): (pid, url)
+            for pid, url in tasks
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            pid, url = futures[future]
             try:
-                img_data = requests.get(first_img, timeout=5).content
-                with open(f"{output_dir}/{product_id}.jpeg", "wb") as f:
-                    f.write(img_data)
-                print(f"✅ {product_id}")
-            except:
-                print(f"❌ {product_id} - lỗi tải ảnh")
\ No newline at end of file
+                status, entry, size = future.result()
+            except Exception as e:
+                stats["failed"] += 1
+                failures.append((pid, url, f"{type(e).__name__}: {e}"))
+                continue
+
+            stats[status] += 1
+            stats["bytes"] += size
+            manifest[pid] = entry
+            if done % checkpoint_every == 0:
+                save_manifest(output_dir, manifest)
+
+    save_manifest(output_dir, manifest)
+    elapsed = time.perf_counter() - start
+    stats.update({
+        "total": len(tasks),
+        "elapsed_s": elapsed,
+        "images_per_s": len(tasks) / elapsed if elapsed > 0 else 0.0,
+        "mb_per_s": stats["bytes"] / 1024 ** 2 / elapsed if elapsed > 0 else 0.0,
+        "failures": failures,
+    })
+    return stats
+
+
+def print_report(stats, max_failures=20):
+    print(f"✅ Tải mới: {stats['downloaded']}  ⏭️ Bỏ qua: {stats['skipped']}  "
+          f"♻️ Không đổi: {stats['not_modified']}  ❌ Lỗi: {stats['failed']}  (tổng {stats['total']})")
+    print(f"⏱️ {stats['elapsed_s']:.1f}s — {stats['images_per_s']:.1f} ảnh/s, {stats['mb_per_s']:.2f} MB/s")
+    for pid, url, error in stats["failures"][:max_failures]:
+        print(f"❌ {pid} - {url} - {error}")
+    if len(stats["failures"]) > max_failures:
+        print(f"... và {len(stats['failures']) - max_failures} lỗi khác")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tải ảnh sản phẩm song song, có thể chạy lại.")
+    parser.add_argument("--output-dir", default=OUTPUT_DIR)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--timeout", type=float, default=10)
+    parser.add_argument("--revalidate", action="store_true",
+                        help="Hỏi lại server (ETag/Last-Modified) với các ảnh đã tải để lấy bản mới nếu có")
+    args = parser.parse_args()
+
+    df = read_products(["product_id", "image"])
+    tasks = collect_tasks(df)
+    print(f"📦 {len(tasks)} sản phẩm có link ảnh")
+    stats = download_images(tasks, args.output_dir, workers=args.workers,
+                            revalidate=args.revalidate, timeout=args.timeout)
+    print_report(stats)
@@ -0,0 +1,66 @@
+# evaluate_collaborative_model.py
+# python3 evaluate_collaborative_model.py                                  # grid search, 5-fold
+# python3 evaluate_collaborative_model.py --random 20 --max-rmse 1.0      # random search, chọn mô hình rẻ nhất đạt RMSE <= 1.0
+
+import argparse
+import os
+import time
+
+import numpy as np
+
+from utils.svd_evaluation import cheapest_meeting, cross_validate, grid_configs, random_configs
+from utils.svd_training import RatingLog, encode
+
+OUTPUT_PATH = "reports/svd_search_results.csv"
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="So sánh các cấu hình SVD bằng k-fold cross-validation.")
+    parser.add_argument("--factors", type=int, nargs="+", default=[20, 50, 100])
+    parser.add_argument("--epochs", type=int, nargs="+", default=[10, 20])
+    parser.add_argument("--reg", type=float, nargs="+", default=[0.02, 0.05, 0.1])
+    parser.add_argument("--random", type=int, default=0,
+                        help="Số cấu hình random search trong khoảng [min, max] của từng tham số (0 = grid search)")
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--k", type=int, default=10, help="k của precision@k / recall@k")
+    parser.add_argument("--min-ratings", type=int, default=3)
+    parser.add_argument("--sample", type=int, default=None, help="Chỉ dùng ngẫu nhiên số đánh giá này (chạy thử nhanh)")
+    parser.add_argument("--max-rmse", type=float, default=None, help="Ngưỡng RMSE để chọn mô hình")
+    parser.add_argument("--min-precision", type=float, default=None, help="Ngưỡng precision@k để chọn mô hình")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=OUTPUT_PATH)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    user_ids, item_ids, u, i, r, _ = encode(RatingLog.read(), args.min_ratings)
+    if args.sample is not None and args.sample < len(r):
+        keep = np.random.default_rng(args.seed).choice(len(r), size=args.sample, replace=False)
+        u, i, r = u[keep], i[keep], r[keep]
+    print(f"📊 {len(r)} đánh giá, 👥 {len(user_ids)} user, 📦 {len(item_ids)} sản phẩm")
+
+    if args.random:
+        configs = random_configs(args.factors, args.epochs, args.reg, args.random, seed=args.seed)
+    else:
+        configs = grid_configs(args.factors, args.epochs, args.reg)
+    print(f"🔬 {len(configs)} cấu hình x {args.folds} fold...")
+
+    per_fold, summary = cross_validate(u, i, r, configs, n_folds=args.folds, k=args.k,
+                                       workers=args.workers, seed=args.seed)
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    summary.to_csv(args.output, index_label="config_id")
+    per_fold.to_csv(args.output.replace(".csv", "_folds.csv"), index=False)
+
+    columns = ["n_factors", "n_epochs", "reg", "rmse", "mae", f"precision@{args.k}", f"recall@{args.k}",
+               "fit_seconds", "peak_mb"]
+    print(summary.sort_values("rmse")[columns].to_string(float_format=lambda x: f"{x:.4f}"))
+    print(f"💾 Đã lưu {args.output} ({time.perf_counter() - start:.1f}s)")
+
+    if args.max_rmse is not None or args.min_precision is not None:
+        best = cheapest_meeting(summary, args.max_rmse, args.min_precision, k=args.k)
+        if best is None:
+            print("❌ Không cấu hình nào đạt ngưỡng chất lượng.")
+        else:
+            print(f"✅ Cấu hình rẻ nhất đạt ngưỡng: n_factors={int(best['n_factors'])}, "
+                  f"n_epochs={int(best['n_epochs'])}, reg={best['reg']:.4g} "
+                  f"(RMSE {best['rmse']:.4f}, {best['fit_seconds']:.1f}s, {best['peak_mb']:.0f} MB)")
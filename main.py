@@ -43,6 +43,7 @@ def main():
         "📊 Giới thiệu chung": ("general_content", "general_content"),
         "📈 Khám phá dữ liệu": ("data_insight", "data_insight"),
         "🎯 Gợi ý sản phẩm": ("recommendation", "product_recommendation"),
+        "🛠️ Theo dõi hiệu năng": ("metrics_admin", "metrics_admin"),
     }
 
     st.sidebar.title("📌 Chức năng")
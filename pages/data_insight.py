@@ -1,91 +1,40 @@
+import io
+
 import streamlit as st
-import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
-import pandas as pd
 import warnings
 warnings.filterwarnings("ignore")
 import plotly.graph_objs as go
 
+from utils.data_insight_summary import dataset_fingerprint, load_summary
 
-# Trang phân cụm khách hàng
-def data_insight():
-    st.image("images/insight.jpeg", width=1000)
-    st.title("Một số thông tin về dữ liệu")
-    
-    # Tải lên file dữ liệu
-    products_clean = pd.read_csv("data/Products_ThoiTrangNam_clean.csv")
-    rating_clean = pd.read_csv("data/Products_ThoiTrangNam_rating_clean.csv",  sep='\t')
 
-    st.markdown("### 🛍️ Dữ liệu sản phẩm")
-    st.dataframe(products_clean.head(10))
-    st.markdown("### ⭐ Dữ liệu đánh giá sản phẩm")
-    st.dataframe(rating_clean.head(10))
-
-    
-    # Tính các chỉ số
-    num_products = products_clean['product_id'].nunique()
-    num_users = rating_clean['user_id'].nunique()
-    num_ratings = rating_clean.shape[0]
-    
-    # Merge để lấy thông tin price và product_name
-    eda_merged = rating_clean.merge(products_clean[['product_id', 'price', 'product_name']], on='product_id', how='left')
-
-    # User đánh giá nhiều nhất
-    top_reviewer = rating_clean['user_id'].value_counts().idxmax()
-    top_reviewer_count = rating_clean['user_id'].value_counts().max()
-
-    # User chi tiêu nhiều nhất
-    user_spend = eda_merged.groupby('user_id')['price'].sum()
-    top_spender = user_spend.idxmax()
-    top_spend_amount = user_spend.max()
-
-    # User rating 5 sao nhiều nhất
-    one_star_users = rating_clean[rating_clean['rating'] == 5]['user_id'].value_counts()
-    top_one_star_user = one_star_users.idxmax()
-    top_one_star_count = one_star_users.max()
-
-    # Sản phẩm bán chạy nhất (nhiều đánh giá nhất)
-    top_product_id = rating_clean['product_id'].value_counts().idxmax()
-    top_product_name = products_clean.loc[products_clean['product_id'] == top_product_id, 'product_name'].values[0]
-
-    # Sản phẩm bán ít nhất (ít đánh giá nhất)
-    least_product_id = rating_clean['product_id'].value_counts().idxmin()
-    least_product_name = products_clean.loc[products_clean['product_id'] == least_product_id, 'product_name'].values[0]
+# ====== Số liệu tổng hợp (tính sẵn bởi build_data_insight_summary.py) ======
+@st.cache_data
+def load_insight_summary(fingerprint):
+    return load_summary()
 
-    col1, col2, col3 = st.columns(3)
-
-    # ---------- CỘT 1: THỐNG KÊ CHUNG ----------
-    with col1:
-        st.markdown("### 📊 Thống kê tổng quan")
-        st.markdown(f"🛍️ **Số sản phẩm:**<br><span style='font-size:16px'>{num_products}</span>", unsafe_allow_html=True)
-        st.markdown(f"👤 **Số người dùng:**<br><span style='font-size:16px'>{num_users}</span>", unsafe_allow_html=True)
-        st.markdown(f"⭐ **Số lượt đánh giá:**<br><span style='font-size:16px'>{num_ratings}</span>", unsafe_allow_html=True)
-
-    # ---------- CỘT 2: USER ----------
-    with col2:
-        st.markdown("### 🙋‍♂️ Người dùng nổi bật")
-        st.markdown(f"✍️ **Review nhiều nhất:**<br><span style='font-size:15px'>{top_reviewer} ({top_reviewer_count} lần)</span>", unsafe_allow_html=True)
-        st.markdown(f"💰 **Chi tiêu nhiều nhất:**<br><span style='font-size:15px'>{top_spender} ({top_spend_amount:,.0f} VNĐ)</span>", unsafe_allow_html=True)
-        st.markdown(f"😍 **Rating 5⭐ nhiều nhất:**<br><span style='font-size:15px'>{top_one_star_user} ({top_one_star_count} lần)</span>", unsafe_allow_html=True)
 
-    # ---------- CỘT 3: SẢN PHẨM ----------
-    with col3:
-        st.markdown("### 📦 Sản phẩm nổi bật")
-        st.markdown(f"🔥 **Nhiều đánh giá nhất:**<br><span style='font-size:15px'>{top_product_name[:30]}...</span>", unsafe_allow_html=True)
-        st.markdown(f"🥶 **Ít đánh giá nhất:**<br><span style='font-size:15px'>{least_product_name[:30]}...</span>", unsafe_allow_html=True)
+# ====== Biểu đồ: vẽ một lần cho mỗi phiên bản dữ liệu ======
+def _to_png(fig):
+    """Ảnh PNG của figure rồi đóng figure: cache giữ bytes bất biến, không giữ Figure sống dùng chung giữa các phiên."""
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", dpi=100, bbox_inches="tight")
+    plt.close(fig)
+    return buf.getvalue()
 
 
-    # Tính top nhóm hàng phổ biến
-    top_subcat = products_clean['sub_category'].value_counts().head(10)
-    # Tiêu đề
-    st.subheader("📦 Top 10 Nhóm Hàng Phổ Biến Nhất")
+@st.cache_data(max_entries=1)
+def build_figures(fingerprint, _summary):
+    s = _summary
+    figs = {}
 
-    # Vẽ biểu đồ
+    # Top nhóm hàng phổ biến
     fig, ax = plt.subplots(figsize=(10, 5))
     sns.barplot(
-        x=top_subcat.values,
-        y=top_subcat.index,
+        x=s["top_subcat"].values,
+        y=s["top_subcat"].index.astype(str),
         palette="Blues_d",
         ax=ax
     )
@@ -93,21 +42,13 @@ def data_insight():
     ax.set_xlabel("Số lượng sản phẩm")
     ax.set_ylabel("Nhóm hàng")
     plt.tight_layout()
+    figs["top_subcat"] = _to_png(fig)
 
-    # Hiển thị trong Streamlit
-    st.pyplot(fig)
-    
-    # Tính top 20 tên sản phẩm lặp lại nhiều nhất
-    top_names = products_clean['product_name'].value_counts().head(20)
-
-    # Hiển thị tiêu đề
-    st.subheader("🛍️ Top 20 Tên Sản Phẩm Phổ Biến Nhất")
-
-    # Vẽ biểu đồ với màu
+    # Top 20 tên sản phẩm lặp lại nhiều nhất
     fig, ax = plt.subplots(figsize=(10, 6))
     sns.barplot(
-        x=top_names.values,
-        y=top_names.index,
+        x=s["top_names"].values,
+        y=s["top_names"].index,
         palette="viridis",
         ax=ax
     )
@@ -115,61 +56,42 @@ def data_insight():
     ax.set_xlabel("Số lần xuất hiện")
     ax.set_ylabel("Tên sản phẩm")
     plt.tight_layout()
+    figs["top_names"] = _to_png(fig)
 
-    # Hiển thị biểu đồ trong Streamlit
-    st.pyplot(fig)
-    
-    st.subheader("🎻 Phân bố giá theo nhóm sản phẩm")
-
-    # Vẽ biểu đồ violin
+    # Violin plot giá theo nhóm (trên mẫu phân tầng)
     fig, ax = plt.subplots(figsize=(12, 6))
     sns.violinplot(
-        data=products_clean,
+        data=s["price_rating_sample"],
         x='sub_category',
         y='price',
         inner='quartile',
         palette='pastel',
         ax=ax
     )
-
-    # Tùy chỉnh trục
     ax.set_title("Phân bố giá theo nhóm sản phẩm (Violin Plot)")
     ax.set_xlabel("Nhóm sản phẩm")
     ax.set_ylabel("Giá (VNĐ)")
     plt.xticks(rotation=45, ha='right')
     plt.tight_layout()
+    figs["price_violin"] = _to_png(fig)
 
-    # Hiển thị trong Streamlit
-    st.pyplot(fig)
-    
-    st.subheader("📦 Phân bố Rating theo Nhóm Sản Phẩm")
-
-    # Vẽ biểu đồ boxplot
+    # Boxplot rating theo nhóm (từ thống kê tính sẵn)
     fig, ax = plt.subplots(figsize=(12, 6))
-    sns.boxplot(
-        data=products_clean,
-        x='sub_category',
-        y='rating',
-        palette='Set3',
-        ax=ax
-    )
-
-    # Tùy chỉnh trục
+    box_stats = [dict(stats, label=cat) for cat, stats in s["rating_box_stats"].items()]
+    boxes = ax.bxp(box_stats, showfliers=False, patch_artist=True)
+    for patch, color in zip(boxes["boxes"], sns.color_palette("Set3", len(box_stats))):
+        patch.set_facecolor(color)
     ax.set_title("Phân bố rating theo từng nhóm sản phẩm")
     ax.set_xlabel("Nhóm sản phẩm")
     ax.set_ylabel("Rating")
     plt.xticks(rotation=45, ha='right')
     plt.tight_layout()
+    figs["rating_box"] = _to_png(fig)
 
-    # Hiển thị trong Streamlit
-    st.pyplot(fig)
-    
-    st.subheader("📈 Tương Quan giữa Giá và Rating theo Nhóm Sản Phẩm")
-
-    # Vẽ biểu đồ scatter plot
+    # Scatter giá - rating (trên mẫu phân tầng)
     fig, ax = plt.subplots(figsize=(10, 6))
     sns.scatterplot(
-        data=products_clean,
+        data=s["price_rating_sample"],
         x='rating',
         y='price',
         hue='sub_category',
@@ -177,28 +99,18 @@ def data_insight():
         palette='tab10',
         ax=ax
     )
-
-    # Tùy chỉnh biểu đồ
     ax.set_title("Tương quan giữa giá và rating theo nhóm sản phẩm")
     ax.set_xlabel("Rating")
     ax.set_ylabel("Giá sản phẩm (VNĐ)")
     ax.legend(title='Nhóm sản phẩm', bbox_to_anchor=(1.05, 1), loc='upper left')
     plt.tight_layout()
+    figs["price_rating_scatter"] = _to_png(fig)
 
-    # Hiển thị biểu đồ trong Streamlit
-    st.pyplot(fig)
-    
-    # Tính giá trung bình theo nhóm sản phẩm
-    avg_price = products_clean.groupby('sub_category')['price'].mean().sort_values()
-
-    # Tiêu đề
-    st.subheader("💰 Giá Trung Bình Theo Nhóm Sản Phẩm")
-
-    # Vẽ biểu đồ
+    # Giá trung bình theo nhóm
     fig, ax = plt.subplots(figsize=(10, 5))
     sns.barplot(
-        x=avg_price.values,
-        y=avg_price.index,
+        x=s["avg_price"].values,
+        y=s["avg_price"].index.astype(str),
         palette='viridis',
         ax=ax
     )
@@ -206,198 +118,154 @@ def data_insight():
     ax.set_xlabel("Giá trung bình (VNĐ)")
     ax.set_ylabel("Nhóm sản phẩm")
     plt.tight_layout()
+    figs["avg_price"] = _to_png(fig)
 
-    # Hiển thị trong Streamlit
-    st.pyplot(fig)
-    
-    # Tính rating trung bình theo nhóm sản phẩm
-    avg_rating = products_clean.groupby('sub_category')['rating'].mean().sort_values()
-
-    # Tiêu đề
-    st.subheader("⭐ Rating Trung Bình Theo Nhóm Sản Phẩm")
-
-    # Vẽ biểu đồ barplot
+    # Rating trung bình theo nhóm
     fig, ax = plt.subplots(figsize=(10, 5))
     sns.barplot(
-        x=avg_rating.values,
-        y=avg_rating.index,
+        x=s["avg_rating"].values,
+        y=s["avg_rating"].index.astype(str),
         palette='magma',
         ax=ax
     )
-
-    # Tùy chỉnh tiêu đề và nhãn
     ax.set_title("Rating trung bình theo nhóm sản phẩm")
     ax.set_xlabel("Rating trung bình")
     ax.set_ylabel("Nhóm sản phẩm")
     plt.tight_layout()
+    figs["avg_rating"] = _to_png(fig)
 
-    # Hiển thị trong Streamlit
-    st.pyplot(fig)
-
-        
-    # Tính toán tỷ lệ đánh giá
-    values = rating_clean.rating.value_counts()
-    labels = values.index
-    colors = ['red', 'blue', 'green', 'yellow', 'black']
-
-    # Tạo pie chart
+    # Pie chart tỷ lệ đánh giá
+    values = s["rating_counts"]
     trace = go.Pie(
-        labels=labels,
+        labels=values.index,
         values=values,
-        marker=dict(colors=colors)
+        marker=dict(colors=['red', 'blue', 'green', 'yellow', 'black'])
     )
-
-    # Tạo layout cho pie chart
     layout = go.Layout(
         title='Biểu đồ Ratings theo phần trăm'
     )
+    figs["rating_pie"] = go.Figure(data=trace, layout=layout)
+
+    # Top sản phẩm / nhóm nhận nhiều đánh giá 5 sao, 1 sao
+    for key, y_col, xlabel, ylabel, title in [
+        ("top_five_star_products", "product_name", 'Count of 5-Star Ratings', 'Product Name', 'Product with the Most 5-Star Ratings'),
+        ("top_five_star_subcats", "sub_category", 'Count of 5-Star Ratings', 'Sub Category', 'Sub Category with the Most 5-Star Ratings'),
+        ("top_one_star_products", "product_name", 'Count of 1-Star Ratings', 'Product Name', 'Product with the Most 1-Star Ratings'),
+    ]:
+        fig, ax = plt.subplots(figsize=(15, 10))
+        sns.barplot(
+            data=s[key],
+            x='count',
+            y=y_col,
+            palette='viridis',
+            ax=ax
+        )
+        ax.set_xlabel(xlabel)
+        ax.set_ylabel(ylabel)
+        ax.set_title(title)
+        plt.tight_layout()
+        figs[key] = _to_png(fig)
+
+    # Heatmap ma trận tương quan
+    fig, ax = plt.subplots(figsize=(6, 4))
+    sns.heatmap(
+        s["corr"],
+        annot=True,
+        cmap='coolwarm',
+        fmt=".2f",
+        ax=ax
+    )
+    ax.set_title("Ma trận tương quan giữa các đặc trưng")
+    plt.tight_layout()
+    figs["corr"] = _to_png(fig)
 
-    # Tạo figure và vẽ biểu đồ
-    fig = go.Figure(data=trace, layout=layout)
-
-    # Hiển thị biểu đồ trong Streamlit
-    st.plotly_chart(fig)
-    
-    # Lọc các sản phẩm có rating = 5
-    five_star_ratings = rating_clean[rating_clean['rating'] == 5]
-    
-    five_star_ratings = five_star_ratings.merge(products_clean[['product_id', 'product_name', 'sub_category']], on='product_id', how='left')
-
-    # Nhóm sản phẩm và đếm số lần đánh giá 5 sao
-    top_product = five_star_ratings['product_name'].value_counts().reset_index()
-    top_product.columns = ['product_name', 'count']
+    # Histogram độ dài mô tả (từ histogram tính sẵn)
+    counts, edges = s["desc_len_hist"]
+    fig, ax = plt.subplots(figsize=(8, 4))
+    ax.stairs(counts, edges, fill=True, alpha=0.6)
+    ax.set_title("Phân bố độ dài mô tả sản phẩm")
+    ax.set_xlabel("Số từ")
+    ax.set_ylabel("Số sản phẩm")
+    plt.tight_layout()
+    figs["desc_len_hist"] = _to_png(fig)
 
-    # Sắp xếp sản phẩm theo số lượng rating 5 sao giảm dần
-    top_product = top_product.sort_values(by='count', ascending=False)
+    return figs
 
-    # Chọn top N sản phẩm có số lượng rating 5 sao nhiều nhất (ví dụ top 10)
-    top_N_product = top_product.head(10)
 
-    # Tiêu đề cho phần trong Streamlit
-    st.subheader("⭐ Top Sản Phẩm Nhận Được Nhiều Đánh Giá 5 Sao")
+# Trang phân cụm khách hàng
+def data_insight():
+    st.image("images/insight.jpeg", width=1000)
+    st.title("Một số thông tin về dữ liệu")
 
-    # Vẽ biểu đồ barplot
-    fig, ax = plt.subplots(figsize=(15, 10))
-    sns.barplot(
-        data=top_N_product,
-        x='count',
-        y='product_name',
-        palette='viridis',
-        ax=ax
-    )
+    # Chỉ đọc bản tổng hợp nhỏ, không quét lại dữ liệu gốc mỗi lần rerun
+    fingerprint = dataset_fingerprint()
+    summary = load_insight_summary(fingerprint)
+    figs = build_figures(fingerprint, summary)
 
-    # Tùy chỉnh biểu đồ
-    ax.set_xlabel('Count of 5-Star Ratings')
-    ax.set_ylabel('Product Name')
-    ax.set_title('Product with the Most 5-Star Ratings')
+    st.markdown("### 🛍️ Dữ liệu sản phẩm")
+    st.dataframe(summary["products_head"])
+    st.markdown("### ⭐ Dữ liệu đánh giá sản phẩm")
+    st.dataframe(summary["ratings_head"])
 
-    # Hiển thị biểu đồ trong Streamlit
-    plt.tight_layout()
-    st.pyplot(fig)
-    
-    # Nhóm theo sub_category và đếm số lần đánh giá 5 sao
-    top_sub_category = five_star_ratings['sub_category'].value_counts().reset_index()
-    top_sub_category.columns = ['sub_category', 'count']
+    col1, col2, col3 = st.columns(3)
 
-    # Sắp xếp các nhóm sản phẩm theo số lượng rating 5 sao giảm dần
-    top_sub_category = top_sub_category.sort_values(by='count', ascending=False)
+    # ---------- CỘT 1: THỐNG KÊ CHUNG ----------
+    with col1:
+        st.markdown("### 📊 Thống kê tổng quan")
+        st.markdown(f"🛍️ **Số sản phẩm:**<br><span style='font-size:16px'>{summary['num_products']}</span>", unsafe_allow_html=True)
+        st.markdown(f"👤 **Số người dùng:**<br><span style='font-size:16px'>{summary['num_users']}</span>", unsafe_allow_html=True)
+        st.markdown(f"⭐ **Số lượt đánh giá:**<br><span style='font-size:16px'>{summary['num_ratings']}</span>", unsafe_allow_html=True)
 
-    # Chọn top N nhóm sản phẩm có số lượng rating 5 sao nhiều nhất (ví dụ top 10)
-    top_N_sub_category = top_sub_category.head(10)
+    # ---------- CỘT 2: USER ----------
+    with col2:
+        st.markdown("### 🙋‍♂️ Người dùng nổi bật")
+        st.markdown(f"✍️ **Review nhiều nhất:**<br><span style='font-size:15px'>{summary['top_reviewer']} ({summary['top_reviewer_count']} lần)</span>", unsafe_allow_html=True)
+        st.markdown(f"💰 **Chi tiêu nhiều nhất:**<br><span style='font-size:15px'>{summary['top_spender']} ({summary['top_spend_amount']:,.0f} VNĐ)</span>", unsafe_allow_html=True)
+        st.markdown(f"😍 **Rating 5⭐ nhiều nhất:**<br><span style='font-size:15px'>{summary['top_five_star_user']} ({summary['top_five_star_count']} lần)</span>", unsafe_allow_html=True)
 
-    # Tiêu đề cho phần trong Streamlit
-    st.subheader("⭐ Top Nhóm Sản Phẩm Nhận Được Nhiều Đánh Giá 5 Sao")
+    # ---------- CỘT 3: SẢN PHẨM ----------
+    with col3:
+        st.markdown("### 📦 Sản phẩm nổi bật")
+        st.markdown(f"🔥 **Nhiều đánh giá nhất:**<br><span style='font-size:15px'>{summary['top_product_name'][:30]}...</span>", unsafe_allow_html=True)
+        st.markdown(f"🥶 **Ít đánh giá nhất:**<br><span style='font-size:15px'>{summary['least_product_name'][:30]}...</span>", unsafe_allow_html=True)
 
-    # Vẽ biểu đồ barplot
-    fig, ax = plt.subplots(figsize=(15, 10))
-    sns.barplot(
-        data=top_N_sub_category,
-        x='count',
-        y='sub_category',
-        palette='viridis',
-        ax=ax
-    )
+    st.subheader("📦 Top 10 Nhóm Hàng Phổ Biến Nhất")
+    st.image(figs["top_subcat"], use_container_width=True)
 
-    # Tùy chỉnh biểu đồ
-    ax.set_xlabel('Count of 5-Star Ratings')
-    ax.set_ylabel('Sub Category')
-    ax.set_title('Sub Category with the Most 5-Star Ratings')
+    st.subheader("🛍️ Top 20 Tên Sản Phẩm Phổ Biến Nhất")
+    st.image(figs["top_names"], use_container_width=True)
 
-    # Hiển thị biểu đồ trong Streamlit
-    plt.tight_layout()
-    st.pyplot(fig)
-    
-    # Lọc các sản phẩm có rating = 1
-    one_star_ratings = rating_clean[rating_clean['rating'] == 1]
+    st.subheader("🎻 Phân bố giá theo nhóm sản phẩm")
+    st.image(figs["price_violin"], use_container_width=True)
 
-    # Kết hợp dữ liệu từ eda_df và products_clean để có được product_name
-    one_star_ratings = one_star_ratings.merge(products_clean[['product_id', 'product_name']], on='product_id', how='left')
+    st.subheader("📦 Phân bố Rating theo Nhóm Sản Phẩm")
+    st.image(figs["rating_box"], use_container_width=True)
 
-    # Nhóm sản phẩm và đếm số lần đánh giá 1 sao
-    top_product = one_star_ratings['product_name'].value_counts().reset_index()
-    top_product.columns = ['product_name', 'count']
+    st.subheader("📈 Tương Quan giữa Giá và Rating theo Nhóm Sản Phẩm")
+    st.image(figs["price_rating_scatter"], use_container_width=True)
 
-    # Sắp xếp sản phẩm theo số lượng rating 1 sao giảm dần
-    top_product = top_product.sort_values(by='count', ascending=False)
+    st.subheader("💰 Giá Trung Bình Theo Nhóm Sản Phẩm")
+    st.image(figs["avg_price"], use_container_width=True)
 
-    # Chọn top N sản phẩm có số lượng rating 1 sao nhiều nhất (ví dụ top 10)
-    top_N_product = top_product.head(10)
+    st.subheader("⭐ Rating Trung Bình Theo Nhóm Sản Phẩm")
+    st.image(figs["avg_rating"], use_container_width=True)
 
-    # Tiêu đề cho phần trong Streamlit
-    st.subheader("⚠️ Top Sản Phẩm Nhận Được Nhiều Đánh Giá 1 Sao")
+    st.plotly_chart(figs["rating_pie"])
 
-    # Vẽ biểu đồ barplot
-    fig, ax = plt.subplots(figsize=(15, 10))
-    sns.barplot(
-        data=top_N_product,
-        x='count',
-        y='product_name',
-        palette='viridis',
-        ax=ax
-    )
+    st.subheader("⭐ Top Sản Phẩm Nhận Được Nhiều Đánh Giá 5 Sao")
+    st.image(figs["top_five_star_products"], use_container_width=True)
 
-    # Tùy chỉnh biểu đồ
-    ax.set_xlabel('Count of 1-Star Ratings')
-    ax.set_ylabel('Product Name')
-    ax.set_title('Product with the Most 1-Star Ratings')
+    st.subheader("⭐ Top Nhóm Sản Phẩm Nhận Được Nhiều Đánh Giá 5 Sao")
+    st.image(figs["top_five_star_subcats"], use_container_width=True)
 
-    # Hiển thị biểu đồ trong Streamlit
-    plt.tight_layout()
-    st.pyplot(fig)
-        
-    # Tính toán ma trận tương quan giữa các đặc trưng
-    corr = products_clean[['price', 'rating', 'desc_len']].corr()
+    st.subheader("⚠️ Top Sản Phẩm Nhận Được Nhiều Đánh Giá 1 Sao")
+    st.image(figs["top_one_star_products"], use_container_width=True)
 
-    # Tiêu đề cho section trong Streamlit
     st.subheader("📊 Ma Trận Tương Quan Giữa Các Đặc Trưng")
+    st.image(figs["corr"], use_container_width=True)
 
-    # Vẽ heatmap
-    fig, ax = plt.subplots(figsize=(6, 4))
-    sns.heatmap(
-        corr,
-        annot=True,
-        cmap='coolwarm',  # Màu sắc heatmap có thể thay đổi theo ý muốn
-        fmt=".2f",
-        ax=ax
-    )
-
-    # Tùy chỉnh
-    ax.set_title("Ma trận tương quan giữa các đặc trưng")
-    plt.tight_layout()
-
-    # Hiển thị trong Streamlit
-    st.pyplot(fig)
-    
     st.subheader("📊 Phân bố độ dài mô tả sản phẩm")
+    st.image(figs["desc_len_hist"], use_container_width=True)
 
-    fig, ax = plt.subplots(figsize=(8, 4))
-    sns.histplot(products_clean['desc_len'], bins=50, kde=True, ax=ax)
-    ax.set_title("Phân bố độ dài mô tả sản phẩm")
-    ax.set_xlabel("Số từ")
-    ax.set_ylabel("Số sản phẩm")
-    plt.tight_layout()
-
-    st.pyplot(fig)
-    
     st.markdown("### ☁️ Wordcloud mô tả sản phẩm")
-    st.image("images/wordcloud.png", width=1000)
\ No newline at end of file
+    st.image("images/wordcloud.png", width=1000)
@@ -0,0 +1,76 @@
+import streamlit as st
+import pandas as pd
+import plotly.graph_objs as go
+
+from utils import metrics
+
+
+# ====== Histogram thời gian của một stage (trên ring buffer) ======
+def stage_histogram(stage):
+    ms = metrics.samples(stage) * 1000
+    fig = go.Figure(data=go.Histogram(x=ms, nbinsx=40, marker_color="#26a69a"))
+    fig.update_layout(
+        title=f"{stage} — {len(ms)} lần đo gần nhất",
+        xaxis_title="Thời gian (ms)", yaxis_title="Số lần",
+        height=350, margin=dict(l=20, r=20, t=50, b=20),
+    )
+    return fig
+
+
+def cache_table():
+    """Bảng hit/miss theo từng cache."""
+    rows = {}
+    for name, labels, value in metrics.counters():
+        if name in ("cache_hits_total", "cache_misses_total") and "cache" in labels:
+            row = rows.setdefault(labels["cache"], {"Cache": labels["cache"], "Hit": 0, "Miss": 0})
+            row["Hit" if name == "cache_hits_total" else "Miss"] += value
+    df = pd.DataFrame(list(rows.values()), columns=["Cache", "Hit", "Miss"])
+    df["Tỉ lệ hit"] = (df["Hit"] / (df["Hit"] + df["Miss"]).where(lambda x: x > 0)).round(3)
+    return df
+
+
+def render_metrics():
+    summary = pd.DataFrame(metrics.summary())
+    st.caption(f"Số liệu trong tiến trình hiện tại, thu thập trong {metrics.uptime() / 60:.1f} phút "
+               f"(giữ {metrics.RING_SIZE} lần đo gần nhất mỗi stage).")
+    if summary.empty:
+        st.info("Chưa có số liệu — hãy dùng trang Gợi ý sản phẩm trước.")
+        return
+
+    st.subheader("⏱️ Thời gian theo stage")
+    st.dataframe(
+        summary.style.format({"p50_ms": "{:.2f}", "p95_ms": "{:.2f}", "p99_ms": "{:.2f}",
+                              "max_ms": "{:.2f}", "total_s": "{:.2f}"}),
+        use_container_width=True,
+    )
+
+    stage = st.selectbox("Chọn stage để xem histogram:", summary["stage"].tolist())
+    st.plotly_chart(stage_histogram(stage), use_container_width=True)
+
+    st.subheader("🗃️ Cache hit / miss")
+    st.dataframe(cache_table(), use_container_width=True)
+
+    with st.expander("📤 Prometheus text format"):
+        text = metrics.to_prometheus()
+        st.code(text, language="text")
+        st.download_button("Tải về metrics.prom", text, file_name="metrics.prom", mime="text/plain")
+
+
+# ====== Trang quản trị: theo dõi hiệu năng ======
+def metrics_admin():
+    st.header("🛠️ Theo dõi hiệu năng")
+
+    cols = st.columns([1, 1, 3])
+    with cols[0]:
+        if st.button("🔄 Làm mới"):
+            st.rerun()
+    with cols[1]:
+        if st.button("🧹 Xóa số liệu"):
+            metrics.reset()
+    with cols[2]:
+        auto = st.checkbox("Tự làm mới mỗi 5 giây", value=False)
+
+    if auto and hasattr(st, "fragment"):
+        st.fragment(run_every=5)(render_metrics)()
+    else:
+        render_metrics()
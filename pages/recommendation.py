@@ -1,140 +1,262 @@
 # pages/recommendation.py
 import streamlit as st
-import pandas as pd
-import joblib
-import os
-import math
+from functools import partial
+
+from utils.catalog import Catalog
+from utils.collaborative import usable_user_topn
+from utils.data_store import read_products, read_ratings, PRODUCT_DISPLAY_COLUMNS, RATING_COLUMNS
+from utils.thumbnails import get_thumbnail
+from utils.model_loader import (
+    CB_MODEL_NAME, CF_MODEL_NAME, INTERACTIONS_NAME, PRODUCTS_NAME, USER_TOPN_NAME,
+    load_content_model, load_collaborative_model, load_interaction_index, load_user_topn,
+)
+from utils.hot_reload import HotReloader, unchanged, warm_models
+from utils.result_cache import ResultCache
+from utils import metrics
 
 # ====== Load mô hình & dữ liệu ======
-@st.cache_resource
-def load_cb_model():
-    path = "models/content_based_model_top1000.pkl"
-    if not os.path.exists(path):
-        st.error("❌ Không tìm thấy file content_based_model_top1000.pkl")
-        st.stop()
-    return joblib.load(path)
+def load_model_snapshot(versions, previous=None):
+    """Mô hình đúng các phiên bản versions; phần có phiên bản không đổi so với previous được dùng lại."""
+    def reuse_or_load(key, names, load):
+        return previous[key] if unchanged(previous, versions, *names) else load()
+
+    snapshot = {
+        "versions": versions,
+        "cb_model": reuse_or_load("cb_model", [CB_MODEL_NAME], lambda: load_content_model(versions[CB_MODEL_NAME])),
+        "cf_model": reuse_or_load("cf_model", [CF_MODEL_NAME], lambda: load_collaborative_model(versions[CF_MODEL_NAME])),
+        # CSR user <-> sản phẩm: "sản phẩm user đã đánh giá" là một lát cắt, không quét cả bảng đánh giá
+        "interactions": reuse_or_load("interactions", [INTERACTIONS_NAME],
+                                      lambda: load_interaction_index(versions[INTERACTIONS_NAME])),
+        # Cột hiển thị + chỉ mục product_id -> dòng, nạp lại khi file sản phẩm đổi
+        "catalog": reuse_or_load("catalog", [PRODUCTS_NAME],
+                                 lambda: Catalog.from_df(read_products(PRODUCT_DISPLAY_COLUMNS))),
+    }
+    # Bảng top-N tính sẵn (build_user_recommendations.py); chưa có, hoặc không khớp mô hình SVD / danh mục
+    # đang phục vụ, thì chấm điểm trực tiếp
+    snapshot["user_topn"] = reuse_or_load(
+        "user_topn", [USER_TOPN_NAME, CF_MODEL_NAME, PRODUCTS_NAME],
+        lambda: usable_user_topn(load_user_topn(), snapshot["cf_model"], snapshot["catalog"]),
+    )
+    return snapshot
 
-@st.cache_resource
-def load_cf_model():
-    path = "models/collaborative_model_svd.joblib"
-    if not os.path.exists(path):
-        st.error("❌ Không tìm thấy file collaborative_model_svd.joblib")
+@metrics.cached(st.cache_resource, "models")
+def load_models():
+    # Snapshot mô hình dùng chung cho mọi phiên; thread nền nạp phiên bản mới (build script vừa công bố)
+    # rồi đổi snapshot, không cần khởi động lại app. Mỗi lần chạy trang chỉ đọc .current một lần.
+    try:
+        return HotReloader(load_model_snapshot, warm=warm_models, name="page").start()
+    except FileNotFoundError as e:
+        st.error(str(e))
         st.stop()
-    return joblib.load(path)
 
-@st.cache_data
-def load_products():
-    return pd.read_csv("data/Products_ThoiTrangNam_clean.csv")
+def artifact_version(models, *names):
+    """Phần "phiên bản mô hình" của khóa cache (cache kết quả và các chỉ mục dựng từ mô hình)."""
+    return tuple(models["versions"][name] for name in names)
+
+@metrics.cached(st.cache_resource, "result_cache")
+def load_result_cache():
+    # Cache kết quả dùng chung cho mọi phiên (LRU + TTL, tầng đĩa nếu đặt RECSYS_RESULT_CACHE_DIR)
+    return ResultCache()
+
+def cached_result(models, names, mode, query, k, compute):
+    """Kết quả qua cache dùng chung, khóa theo phiên bản các artifact names của snapshot models."""
+    return load_result_cache().get_or_compute(artifact_version(models, *names), mode, query, k, compute,
+                                              generation=models.get("generation"))
 
-@st.cache_data
-def load_ratings():
-    return pd.read_csv("data/Products_ThoiTrangNam_rating_clean.csv", sep="\t")
+# Các chỉ mục dựng từ mô hình: khóa theo phiên bản (_models không hash), max_entries=1 để bản của
+# mô hình cũ được giải phóng khi snapshot đổi
+@metrics.cached(partial(st.cache_resource, max_entries=1), "hybrid")
+def load_hybrid(_models, version):
+    # Chỉ mục sản phẩm / user dùng chung cho cả hai mô hình, dựng một lần rồi giữ trong bộ nhớ
+    from utils.hybrid import HybridRecommender
+    return HybridRecommender(_models["cb_model"], _models["cf_model"], _models["interactions"])
+
+@metrics.cached(partial(st.cache_resource, max_entries=1), "product_search")
+def load_product_search(_models, version):
+    # Chỉ mục gợi ý khi gõ trên tên / mã các sản phẩm có trong mô hình content-based
+    from utils.content_based_top1000 import get_catalog
+    from utils.product_search import ProductSearch
+    return ProductSearch(get_catalog(_models["cb_model"]))
+
+# Danh bạ user đọc lại cùng lúc với chỉ mục đánh giá (khóa theo phiên bản INTERACTIONS_NAME của snapshot):
+# user mới xuất hiện sau khi build script công bố chỉ mục mới, không cần khởi động lại app
+@metrics.cached(partial(st.cache_resource, max_entries=1), "user_directory")
+def load_user_directory(version):
+    # Danh bạ user + chỉ mục tìm kiếm, dựng một lần thay vì drop_duplicates mỗi lần rerun
+    from utils.user_directory import UserDirectory
+    return UserDirectory.from_ratings(load_ratings(version))
+
+@metrics.cached(partial(st.cache_data, max_entries=1), "ratings")
+def load_ratings(version):
+    return read_ratings(RATING_COLUMNS)
 
 # ====== Hiển thị sản phẩm gợi ý ======
-def display_recommendations(result_df, is_cb=True):
+@metrics.timed("render.recommendations")
+def display_recommendations(result_df):
+    """Hiển thị bảng kết quả (tên cột gốc từ Catalog.take); nhãn tiếng Việt chỉ gắn ở đây."""
     if result_df.empty:
         st.warning("🙁 Không tìm thấy sản phẩm phù hợp.")
     else:
-        for _, row in result_df.iterrows():
+        for row in result_df.to_dict("records"):
             with st.container():
                 cols = st.columns([1, 4])
                 with cols[0]:
-                    image_url = row.get("image", "")
-                    if isinstance(image_url, str) and image_url.startswith("http"):
-                        st.image(image_url, width=120)
-                    else:
-                        st.image("images/no_image.jpg", width=120)
+                    # Thumbnail lấy từ đĩa (cache cục bộ), không tải ảnh qua mạng khi render
+                    st.image(get_thumbnail(row.get("product_id", "")), width=120)
 
                 with cols[1]:
-                    mota = str(row['Mô tả'])
+                    mota = str(row['description'])
                     short_desc = mota[:200] + "..." if len(mota) > 200 else mota
 
                     st.markdown(f"""
-                    **🧢 Tên sản phẩm:** {row['Tên sản phẩm']}  
-                    **📦 Loại sản phẩm:** {row['Loại sản phẩm']}  
-                    **💸 Giá:** {int(row['Giá']):,}₫  
-                    **⭐ Đánh giá:** {float(row['Đánh giá']):.1f}  
+                    **🧢 Tên sản phẩm:** {row['product_name']}  
+                    **📦 Loại sản phẩm:** {row['sub_category']}  
+                    **💸 Giá:** {int(row['price']):,}₫  
+                    **⭐ Đánh giá:** {float(row['rating']):.1f}  
                     **📖 Mô tả:** {short_desc}
                     """)
 
-                    if is_cb and 'Độ tương đồng' in row:
-                        st.markdown(f"📊 **Độ tương đồng:** {float(row['Độ tương đồng']):.3f}")
-                    elif not is_cb and 'Dự đoán' in row and float(row['Dự đoán']) > 0:
-                        st.markdown(f"📊 **Dự đoán:** {float(row['Dự đoán']):.1f}")
+                    if 'hybrid_score' in row:
+                        st.markdown(f"📊 **Điểm kết hợp:** {float(row['hybrid_score']):.3f} "
+                                    f"(SVD {float(row['prediction']):.1f}, nội dung {float(row['similarity']):.3f})")
+                    elif 'similarity' in row:
+                        st.markdown(f"📊 **Độ tương đồng:** {float(row['similarity']):.3f}")
+                    elif 'prediction' in row and float(row['prediction']) > 0:
+                        st.markdown(f"📊 **Dự đoán:** {float(row['prediction']):.1f}")
 
                 st.markdown("---")
 
+# ====== Chọn user (tìm kiếm + phân trang phía server) ======
+def select_user(models, key):
+    """Chỉ gửi một trang user xuống trình duyệt; trả về user_id được chọn (None nếu không có kết quả)."""
+    from utils.user_directory import MAX_RESULTS, PAGE_SIZE, n_pages
+    directory = load_user_directory(artifact_version(models, INTERACTIONS_NAME))
+
+    query = st.text_input("🔎 Tìm user theo ID hoặc tên:", key=f"{key}_query")
+    positions = directory.search(query, limit=MAX_RESULTS)
+    total_pages = n_pages(len(positions))
+    # Key theo truy vấn để về trang 1 mỗi khi đổi từ khóa
+    page = st.number_input(f"Trang (1-{total_pages}):", min_value=1, max_value=total_pages, value=1, step=1,
+                           key=f"{key}_page_{query}")
+    page_df = directory.page(positions, int(page), PAGE_SIZE)
+    # Kết quả bị giới hạn ở MAX_RESULTS: hiện "1,000+" thay vì đếm hết
+    n_found = f"{len(positions):,}" + ("+" if len(positions) >= MAX_RESULTS else "")
+    st.caption(f"👥 {n_found} / {len(directory):,} người dùng khớp — trang {int(page)}/{total_pages}")
+    st.dataframe(page_df.rename(columns={"user_id": "User ID", "user": "Tên người dùng", "n_ratings": "Số đánh giá"}),
+                 use_container_width=True, hide_index=True)
+    if page_df.empty:
+        st.warning("🙁 Không tìm thấy người dùng phù hợp.")
+        return None
+    return st.selectbox("Chọn User ID:", page_df["user_id"].tolist(),
+                        format_func=lambda uid: f"{uid} — {directory.name(uid)}", key=f"{key}_user")
+
 # ====== Giao diện chính gợi ý ======
 def product_recommendation():
     st.header("🎯 Hệ thống gợi ý sản phẩm")
 
-    method = st.selectbox("🔍 Chọn phương pháp gợi ý:", ["Gợi ý theo nội dung", "Gợi ý theo người dùng"])
-    products_df = load_products()
+    method = st.selectbox("🔍 Chọn phương pháp gợi ý:", ["Gợi ý theo nội dung", "Gợi ý theo người dùng", "Gợi ý kết hợp"])
+    # Một snapshot cho cả lần chạy: mô hình có đổi giữa chừng thì lần chạy này vẫn dùng trọn bản cũ
+    models = load_models().current
 
     if method == "Gợi ý theo nội dung":
-        model_cb = load_cb_model()
-        from utils.content_based_top1000 import search_and_recommend_top10, recommend_by_product_id_top10
+        model_cb = models["cb_model"]
+        from utils.content_based_top1000 import get_catalog, search_rows, similar_rows
+        catalog_cb = get_catalog(model_cb)
 
         search_mode = st.radio("Chọn cách tìm kiếm:", ["Từ khóa", "Mã sản phẩm"])
+        backend = "exact"
+        if "ann_index" in model_cb:
+            # Chỉ mục ANN có sẵn trong mô hình: cho phép đổi giữa tìm chính xác và tìm gần đúng
+            recall = model_cb.get("ann_recall_at_10")
+            label = "Gần đúng (ANN)" + (f" — recall@10 ≈ {recall:.2f}" if recall is not None else "")
+            backend = "ann" if st.radio("Kiểu tìm kiếm:", ["Chính xác", label], horizontal=True) == label else "exact"
         if search_mode == "Từ khóa":
             keyword = st.text_input("Nhập từ khóa (ví dụ: áo thun)")
             if st.button("Gợi ý", key="btn_cb_keyword"):
-                result = search_and_recommend_top10(model_cb, keyword, top_k=10)
-                display_recommendations(result, is_cb=True)
+                rows, similarities = cached_result(
+                    models, [CB_MODEL_NAME], f"keywords.{backend}", keyword, 10,
+                    lambda: search_rows(model_cb, keyword, top_k=10, backend=backend))
+                display_recommendations(catalog_cb.take(rows, similarity=similarities))
 
         elif search_mode == "Mã sản phẩm":
-            unique_ids = products_df["product_id"].dropna().unique()
-            product_id = st.selectbox("Chọn mã sản phẩm:", unique_ids)
+            # Chỉ gửi tối đa MAX_SUGGESTIONS gợi ý xuống trình duyệt, tra trên chỉ mục mỗi lần gõ
+            from utils.product_search import MAX_SUGGESTIONS
+            query = st.text_input("🔎 Nhập mã hoặc tên sản phẩm:", key="product_query")
+            product_search = load_product_search(models, artifact_version(models, CB_MODEL_NAME))
+            suggestions = product_search.suggestions(query, limit=MAX_SUGGESTIONS)
+            if not suggestions:
+                st.warning("🙁 Không tìm thấy sản phẩm phù hợp.")
+                return
+            product_id = st.selectbox("Chọn sản phẩm:", [pid for pid, _ in suggestions],
+                                      format_func=lambda pid: f"{pid} — {dict(suggestions)[pid]}")
 
             if st.button("Gợi ý", key="btn_cb_product"):
                 try:
-                    result = recommend_by_product_id_top10(model_cb, product_id, top_k=10)
-                    display_recommendations(result, is_cb=True)
+                    rows, similarities = cached_result(
+                        models, [CB_MODEL_NAME], f"products.{backend}", product_id, 10,
+                        lambda: similar_rows(model_cb, product_id, top_k=10, backend=backend))
+                    display_recommendations(catalog_cb.take(rows, similarity=similarities))
                 except Exception as e:
                     st.error(f"Lỗi: {e}")
 
     elif method == "Gợi ý theo người dùng":
-        from utils.collaborative import get_top_n_recommendations
-        model_cf = load_cf_model()
-        ratings_df = load_ratings()
-
-        user_map_df = ratings_df[['user_id', 'user']].drop_duplicates()
-        user_map = dict(zip(user_map_df['user_id'], user_map_df['user']))
+        from utils.collaborative import precomputed_rows, top_n_rows
+        catalog = models["catalog"]
+        model_cf = models["cf_model"]
+        user_topn = models["user_topn"]
+        interactions = models["interactions"]
 
         st.subheader("👥 Danh sách người dùng và mã ID")
-        st.dataframe(user_map_df.reset_index(drop=True), use_container_width=True)
-
-        user_ids = sorted(user_map.keys())
-        selected_user = st.selectbox("Chọn User ID:", user_ids)
-
-        if selected_user:
-            user_name = user_map.get(selected_user, "Không xác định")
-            st.markdown(f"👤 **Tên người dùng:** `{user_name}`")
+        selected_user = select_user(models, "cf")
+        if selected_user is None:
+            return
+        user_name = load_user_directory(artifact_version(models, INTERACTIONS_NAME)).name(selected_user)
+        st.markdown(f"👤 **Tên người dùng:** `{user_name}`")
 
         st.subheader("🛍️ Sản phẩm đã đánh giá:")
-        user_rated_df = ratings_df[ratings_df['user_id'] == selected_user]
-        rated_products = products_df[products_df['product_id'].isin(user_rated_df['product_id'])].copy()
-        rated_products.rename(columns={
-            'product_id': 'Mã SP',
-            'product_name': 'Tên sản phẩm',
-            'sub_category': 'Loại sản phẩm',
-            'price': 'Giá',
-            'rating': 'Đánh giá',
-            'description': 'Mô tả',
-            'image': 'image'
-        }, inplace=True)
-        display_recommendations(rated_products, is_cb=False)
+        from utils.interactions import rated_products
+        rated_rows = catalog.rows(rated_products(interactions, selected_user))
+        display_recommendations(catalog.take(rated_rows[rated_rows >= 0]))
 
         if st.button("Gợi ý", key="btn_cf_user"):
+            def compute():
+                found = precomputed_rows(selected_user, user_topn, catalog, n=10, ratings=interactions)
+                if found is None:
+                    found = top_n_rows(
+                        user_id=selected_user,
+                        model=model_cf,
+                        catalog=catalog,
+                        ratings=interactions,
+                        n=10
+                    )
+                return found
+
             try:
-                result = get_top_n_recommendations(
-                    user_id=selected_user,
-                    model=model_cf,
-                    product_df=products_df,
-                    ratings_df=ratings_df,
-                    n=10
-                )
+                rows, predictions = cached_result(
+                    models, [CF_MODEL_NAME, INTERACTIONS_NAME, USER_TOPN_NAME, PRODUCTS_NAME],
+                    "users", selected_user, 10, compute)
                 st.subheader("🎁 Gợi ý sản phẩm dựa trên hành vi người dùng:")
-                display_recommendations(result, is_cb=False)
+                display_recommendations(catalog.take(rows, prediction=predictions))
+            except Exception as e:
+                st.error(f"Lỗi khi gợi ý: {e}")
+
+    elif method == "Gợi ý kết hợp":
+        from utils.hybrid import CB_WEIGHT
+        hybrid = load_hybrid(models, artifact_version(models, CB_MODEL_NAME, CF_MODEL_NAME, INTERACTIONS_NAME))
+
+        selected_user = select_user(models, "hybrid")
+        if selected_user is None:
+            return
+        cb_weight = st.slider("⚖️ Trọng số nội dung (phần còn lại cho SVD):", 0.0, 1.0, CB_WEIGHT, 0.05)
+        st.caption("0 = chỉ dùng SVD, 1 = chỉ dùng độ tương đồng nội dung với các sản phẩm user đã đánh giá.")
+
+        if st.button("Gợi ý", key="btn_hybrid_user"):
+            try:
+                rows, scores, predictions, similarities = cached_result(
+                    models, [CB_MODEL_NAME, CF_MODEL_NAME, INTERACTIONS_NAME], "hybrid",
+                    (selected_user, cb_weight), 10, lambda: hybrid.recommend(selected_user, n=10, cb_weight=cb_weight))
+                st.subheader("🎁 Gợi ý kết hợp nội dung và hành vi người dùng:")
+                display_recommendations(hybrid.catalog.take(rows, hybrid_score=scores, prediction=predictions,
+                                                            similarity=similarities))
             except Exception as e:
-                st.error(f"Lỗi khi gợi ý: {e}")
\ No newline at end of file
+                st.error(f"Lỗi khi gợi ý: {e}")
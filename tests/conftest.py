@@ -0,0 +1,6 @@
+# tests/conftest.py
+import os
+import sys
+
+# Các script và gói utils/ nằm ở thư mục gốc repo (không cài đặt như package)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,67 @@
+# tests/test_api_server.py
+import asyncio
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("aiohttp")
+from aiohttp.test_utils import TestClient, TestServer  # noqa: E402
+from sklearn.feature_extraction.text import TfidfVectorizer  # noqa: E402
+
+from api_server import create_app, recommend_products  # noqa: E402
+from utils.content_based_top1000 import compute_top_k_neighbors  # noqa: E402
+from utils.model_loader import CB_MODEL_NAME  # noqa: E402
+from utils.result_cache import ResultCache  # noqa: E402
+
+NAMES = ["Áo thun nam", "Áo thun nam cổ tròn", "Quần jean nam", "Áo sơ mi nam", "Quần short nam"]
+
+
+@pytest.fixture()
+def state():
+    products = pd.DataFrame({
+        "product_id": np.arange(100, 100 + len(NAMES)), "product_name": NAMES,
+        "sub_category": "Áo", "price": 100_000.0, "rating": 4.5, "description": "",
+    })
+    vectorizer = TfidfVectorizer(dtype=np.float32)
+    matrix = vectorizer.fit_transform(products["product_name"].str.lower()).tocsr()
+    model = {"product_df": products, "tfidf_vectorizer": vectorizer, "tfidf_matrix": matrix}
+    model["neighbor_indices"], model["neighbor_scores"] = compute_top_k_neighbors(matrix, 3)
+    return {"versions": {CB_MODEL_NAME: "v1"}, "cb_model": model, "result_cache": ResultCache(disk_dir=None)}
+
+
+def _post(state, path, body):
+    async def run():
+        async with TestClient(TestServer(create_app(state, workers=1))) as client:
+            response = await client.post(path, json=body)
+            return response.status, (await response.json() if response.status == 200 else await response.text())
+
+    return asyncio.run(run())
+
+
+def test_products_batch(state):
+    status, body = _post(state, "/recommend/products", {"product_ids": [100, 999], "top_k": 2})
+    assert status == 200
+    first, missing = body["results"]
+    assert first["product_id"] == 100 and len(first["items"]) == 2
+    assert missing["product_id"] == 999 and "error" in missing
+
+
+@pytest.mark.parametrize("ids", [[[100]], [{"a": 1}], [100, [101]]])
+def test_non_scalar_ids_are_rejected(state, ids):
+    for path, field in (("/recommend/products", "product_ids"), ("/recommend/users", "user_ids"),
+                        ("/recommend/hybrid", "user_ids"), ("/recommend/keywords", "keywords")):
+        status, text = _post(state, path, {field: ids})
+        assert status == 400 and field in text
+
+
+@pytest.mark.parametrize("body", [{"product_ids": []}, {"product_ids": 100}, {"product_ids": [100], "top_k": True},
+                                  {"product_ids": [100], "top_k": 0}, [100]])
+def test_invalid_batches_are_rejected(state, body):
+    assert _post(state, "/recommend/products", body)[0] == 400
+
+
+def test_unhashable_id_is_a_per_item_error(state):
+    # Gọi thẳng (không qua _read_batch): lỗi của một id không làm hỏng cả lô
+    results = recommend_products(state, [[100], 101], 2)
+    assert "error" in results[0] and len(results[1]["items"]) == 2
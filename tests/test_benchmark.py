@@ -0,0 +1,24 @@
+# tests/test_benchmark.py
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_benchmark_runs_end_to_end_at_tiny_scale(tmp_path):
+    pytest.importorskip("sklearn")
+    pytest.importorskip("surprise")
+    output = tmp_path / "bench.json"
+    subprocess.run(
+        [sys.executable, os.path.join(REPO_DIR, "benchmark_recommendations.py"), "--products", "300",
+         "--ratings", "3000", "--calls", "40", "--warmup", "1", "--workdir", str(tmp_path / "work"),
+         "--output", str(output)],
+        cwd=REPO_DIR, check=True, capture_output=True, timeout=600,
+    )
+    results = json.loads(output.read_text())["results"]
+    for case in ("search_and_recommend_top10", "recommend_by_product_id_top10", "get_top_n_recommendations"):
+        assert results[case]["calls"] == 40
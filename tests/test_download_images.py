@@ -0,0 +1,113 @@
+# tests/test_download_images.py
+import os
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+import pytest
+
+from download_product_images import collect_tasks, download_images, image_path, make_session
+
+IMAGES = {f"/img/{i}.jpg": f"jpeg-{i}".encode() * 50 for i in range(1, 6)}
+
+
+class ImageHandler(BaseHTTPRequestHandler):
+    """Server ảnh giả: ETag cố định theo đường dẫn, trả 304 khi If-None-Match khớp, 503 cho lần đầu của /flaky/."""
+
+    hits = Counter()
+    lock = threading.Lock()
+
+    def do_GET(self):
+        with self.lock:
+            self.hits[self.path] += 1
+            first = self.hits[self.path] == 1
+        path = self.path
+        if path.startswith("/flaky/"):
+            if first:
+                self.send_response(503)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            path = "/img/" + path.rsplit("/", 1)[1]
+        body = IMAGES.get(path)
+        if body is None:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        etag = f'"{path}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "image/jpeg")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture()
+def server():
+    ImageHandler.hits = Counter()
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), ImageHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _download(tasks, output_dir, **kwargs):
+    # backoff=0: retry ngay, test không phải chờ
+    return download_images(tasks, str(output_dir), workers=4, timeout=5,
+                           session=make_session(4, retries=2, backoff=0), **kwargs)
+
+
+def test_collect_tasks_dedupes_product_ids():
+    df = pd.DataFrame({
+        "product_id": [1, 2, 1, 3, 2, 4],
+        "image": ["http://a/1.jpg", None, "http://a/1b.jpg", "ftp://x", "http://a/2.jpg", "http://a/4.jpg x"],
+    })
+    assert collect_tasks(df) == [("1", "http://a/1.jpg"), ("2", "http://a/2.jpg"), ("4", "http://a/4.jpg")]
+
+
+def test_fresh_fetch_then_rerun_skips(server, tmp_path):
+    tasks = [(str(i), f"{server}/img/{i}.jpg") for i in range(1, 6)]
+    stats = _download(tasks, tmp_path)
+    assert (stats["downloaded"], stats["failed"]) == (5, 0)
+    for i in range(1, 6):
+        with open(image_path(str(tmp_path), str(i)), "rb") as f:
+            assert f.read() == IMAGES[f"/img/{i}.jpg"]
+
+    stats = _download(tasks, tmp_path)
+    assert (stats["skipped"], stats["downloaded"]) == (5, 0)
+    assert all(n == 1 for n in ImageHandler.hits.values())  # lần chạy lại không gửi request nào
+
+
+def test_revalidate_gets_304(server, tmp_path):
+    tasks = [("1", f"{server}/img/1.jpg"), ("2", f"{server}/img/2.jpg")]
+    _download(tasks, tmp_path)
+    mtime = os.path.getmtime(image_path(str(tmp_path), "1"))
+
+    stats = _download(tasks, tmp_path, revalidate=True)
+    assert (stats["not_modified"], stats["downloaded"]) == (2, 0)
+    assert ImageHandler.hits["/img/1.jpg"] == 2
+    assert os.path.getmtime(image_path(str(tmp_path), "1")) == mtime
+
+
+def test_retries_after_server_error(server, tmp_path):
+    stats = _download([("3", f"{server}/flaky/3.jpg"), ("9", f"{server}/img/9.jpg")], tmp_path)
+    assert stats["downloaded"] == 1
+    assert ImageHandler.hits["/flaky/3.jpg"] == 2
+    with open(image_path(str(tmp_path), "3"), "rb") as f:
+        assert f.read() == IMAGES["/img/3.jpg"]
+    # 404 không nằm trong danh sách retry: lỗi ngay, không làm hỏng các ảnh khác
+    assert [pid for pid, _, _ in stats["failures"]] == ["9"]
+    assert ImageHandler.hits["/img/9.jpg"] == 1
@@ -0,0 +1,134 @@
+# tests/test_hot_reload.py
+import threading
+import time
+
+import pytest
+
+from utils.hot_reload import HotReloader, unchanged
+
+
+class Disk:
+    """Phiên bản artifact "trên đĩa" do test điều khiển."""
+
+    def __init__(self, **versions):
+        self.versions = dict(versions)
+
+    def __call__(self):
+        return dict(self.versions)
+
+
+def make_loader(fail_on=()):
+    calls = []
+
+    def load(versions, previous):
+        calls.append(versions)
+        if versions.get("cf") in fail_on:
+            raise ValueError(f"hỏng {versions['cf']}")
+        # Phần cb được dùng lại nếu phiên bản không đổi
+        cb = previous["cb"] if unchanged(previous, versions, "cb") else object()
+        return {"versions": versions, "cb": cb}
+
+    return load, calls
+
+
+def test_initial_load_and_no_reload_when_unchanged():
+    disk = Disk(cb="1", cf="1")
+    load, calls = make_loader()
+    reloader = HotReloader(load, versions=disk, interval=0)
+    assert reloader.current["versions"] == {"cb": "1", "cf": "1"}
+    assert reloader.check() is False
+    assert len(calls) == 1
+
+
+def test_swaps_snapshot_and_reuses_unchanged_parts():
+    disk = Disk(cb="1", cf="1")
+    load, _ = make_loader()
+    reloader = HotReloader(load, versions=disk, interval=0)
+    first = reloader.current
+
+    disk.versions["cf"] = "2"
+    assert reloader.check() is True
+    second = reloader.current
+    assert second["versions"]["cf"] == "2"
+    assert second["cb"] is first["cb"]
+    assert second["generation"] > first["generation"]
+    assert first["versions"]["cf"] == "1"  # snapshot cũ không bị sửa: request đang dùng nó vẫn nhất quán
+
+
+def test_warm_runs_before_swap():
+    disk = Disk(cb="1", cf="1")
+    load, _ = make_loader()
+    holder = {}
+    warmed = []
+
+    def warm(snapshot):
+        # Lúc warm chạy, snapshot mới chưa được phục vụ
+        reloader = holder.get("reloader")
+        warmed.append(reloader is None or reloader.current is not snapshot)
+
+    holder["reloader"] = reloader = HotReloader(load, warm=warm, versions=disk, interval=0)
+    disk.versions["cb"] = "2"
+    assert reloader.check() is True
+    assert warmed == [True, True]
+
+
+def test_failed_load_keeps_old_snapshot_and_is_not_retried():
+    disk = Disk(cb="1", cf="1")
+    load, calls = make_loader(fail_on={"bad"})
+    reloader = HotReloader(load, versions=disk, interval=0)
+    served = reloader.current
+
+    disk.versions["cf"] = "bad"
+    assert reloader.check() is False
+    assert reloader.current is served and "hỏng bad" in reloader.last_error
+    assert reloader.check() is False
+    assert len(calls) == 2  # không nạp lại đúng bộ phiên bản đã lỗi
+
+    # Gỡ bản lỗi: con trỏ quay về bản đang phục vụ, lỗi được xóa
+    disk.versions["cf"] = "1"
+    assert reloader.check() is False and reloader.last_error is None
+
+    disk.versions["cf"] = "3"
+    assert reloader.check() is True and reloader.last_error is None
+
+
+def test_rollback_gets_a_new_generation():
+    disk = Disk(cb="1", cf="1")
+    load, _ = make_loader()
+    reloader = HotReloader(load, versions=disk, interval=0)
+    generations = [reloader.current["generation"]]
+    for cf in ("2", "1"):
+        disk.versions["cf"] = cf
+        reloader.check()
+        generations.append(reloader.current["generation"])
+    assert generations == sorted(set(generations))
+    # Một HotReloader mới trong cùng tiến trình không dùng lại số generation cũ
+    assert HotReloader(load, versions=disk, interval=0).current["generation"] > generations[-1]
+
+
+def test_background_thread_picks_up_new_versions():
+    disk = Disk(cb="1", cf="1")
+    swapped = threading.Event()
+    load, _ = make_loader()
+
+    def warm(snapshot):
+        if snapshot["versions"]["cf"] == "2":
+            swapped.set()
+
+    reloader = HotReloader(load, warm=warm, versions=disk, interval=0.01).start()
+    try:
+        disk.versions["cf"] = "2"
+        assert swapped.wait(5)
+        for _ in range(500):
+            if reloader.current["versions"]["cf"] == "2":
+                break
+            time.sleep(0.01)
+        assert reloader.current["versions"]["cf"] == "2"
+    finally:
+        reloader.stop()
+
+
+def test_initial_load_errors_propagate():
+    load, _ = make_loader(fail_on={"bad"})
+    with pytest.raises(ValueError):
+        HotReloader(load, versions=Disk(cb="1", cf="bad"), interval=0)
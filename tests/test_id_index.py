@@ -0,0 +1,46 @@
+# tests/test_id_index.py
+import numpy as np
+import pytest
+
+from utils.id_index import IdIndex, normalize_ids
+
+
+@pytest.fixture()
+def index():
+    return IdIndex(np.array([50, 12, 7, 12, 1003]))
+
+
+def test_positions_keep_first_duplicate(index):
+    assert [index.get(i) for i in (50, 12, 7, 1003)] == [0, 1, 2, 4]
+    assert index.get(8) == -1
+    assert index.get(8, default=None) is None
+    np.testing.assert_array_equal(index.get_many(np.array([7, 12, 8, 50])), [2, 1, -1, 0])
+    assert 1003 in index and 1004 not in index
+
+
+@pytest.mark.parametrize("raw", [12, "12", " 12", "12.0", 12.0, np.int64(12), np.float32(12.0)])
+def test_integral_values_resolve(index, raw):
+    assert index.get(raw) == 1
+
+
+@pytest.mark.parametrize("raw", [12.7, "12.7", 7.5, True, np.bool_(True), float("nan"), float("inf"),
+                                 "abc", None, "", [12]])
+def test_non_integral_values_are_unknown(index, raw):
+    # int(12.7) == 12: không được trả về vị trí của id 12
+    assert index.get(raw) == -1
+    assert index.get(raw, default="x") == "x"
+
+
+def test_get_many_with_float_array_matches_get(index):
+    raws = np.array([12.0, 12.5, 7.0, 50.9])
+    np.testing.assert_array_equal(index.get_many(raws), [1, -1, 2, -1])
+
+
+def test_str_ids_and_round_trip():
+    text = IdIndex(normalize_ids(["a1", "b2", "a1"]))
+    assert text.get("b2") == 1 and text.get("zz") == -1
+
+    numeric = IdIndex(normalize_ids(["3", "1", "2"]))
+    assert numeric.ids.dtype == np.int64
+    restored = IdIndex.from_arrays(numeric.arrays("item"), "item")
+    np.testing.assert_array_equal(restored.get_many([1, 2, 3, 4]), [1, 2, 0, -1])
@@ -0,0 +1,71 @@
+# tests/test_interactions.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.interactions import InteractionIndex, rated_products
+
+
+@pytest.fixture()
+def ratings():
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        "user_id": rng.integers(1, 40, 500),
+        "product_id": rng.integers(1000, 1080, 500),
+        "rating": rng.integers(1, 6, 500).astype(float),
+    })
+
+
+def test_slices_match_dataframe_scan(ratings):
+    index = InteractionIndex.from_ratings(ratings)
+    assert len(index) == len(ratings)
+    assert (index.n_users, index.n_items) == (ratings["user_id"].nunique(), ratings["product_id"].nunique())
+
+    for user_id in (*ratings["user_id"].unique()[:10], 9999):
+        rows = ratings[ratings["user_id"] == user_id].sort_values("product_id", kind="stable")
+        items, values = index.items_of(user_id)
+        np.testing.assert_array_equal(np.sort(items), rows["product_id"].to_numpy())
+        np.testing.assert_array_equal(np.sort(rated_products(index, user_id)),
+                                      np.sort(rated_products(ratings, user_id)))
+        assert sorted(zip(items.tolist(), values.tolist())) == sorted(
+            zip(rows["product_id"].tolist(), rows["rating"].tolist()))
+
+    for product_id in (*ratings["product_id"].unique()[:10], 5):
+        rows = ratings[ratings["product_id"] == product_id]
+        users, _ = index.users_of(product_id)
+        np.testing.assert_array_equal(users, np.sort(rows["user_id"].to_numpy()))
+
+
+def test_degrees_and_matrix(ratings):
+    index = InteractionIndex.from_ratings(ratings)
+    counts = ratings.groupby("user_id").size()
+    np.testing.assert_array_equal(index.user_ids, counts.index.to_numpy())
+    np.testing.assert_array_equal(index.user_degree(), counts.to_numpy())
+    np.testing.assert_array_equal(index.item_degree(), ratings.groupby("product_id").size().to_numpy())
+
+    matrix = index.user_item_matrix()
+    assert matrix.shape == (index.n_users, index.n_items)
+    assert matrix.nnz == len(ratings)
+    first = ratings.iloc[0]
+    u, i = index.user_index.get(first["user_id"]), index.item_index.get(first["product_id"])
+    expected = ratings[(ratings["user_id"] == first["user_id"]) & (ratings["product_id"] == first["product_id"])]
+    assert matrix[u, i] == expected["rating"].sum()
+
+
+def test_string_ids_and_missing_rows():
+    df = pd.DataFrame({"user_id": ["7", "3", None, "7"], "product_id": ["10", "11", "12", "11"],
+                       "rating": [5.0, 4.0, 3.0, np.nan]})
+    index = InteractionIndex.from_ratings(df)
+    assert len(index) == 2  # bỏ dòng thiếu user / rating
+    assert index.user_ids.dtype == np.int64
+    assert index.items_of(7)[0].tolist() == [10] and index.items_of("3")[0].tolist() == [11]
+
+
+def test_save_load_round_trip(ratings, tmp_path):
+    index = InteractionIndex.from_ratings(ratings)
+    index.save(str(tmp_path))
+    loaded = InteractionIndex.load(str(tmp_path))
+    for user_id in ratings["user_id"].unique()[:5]:
+        for a, b in zip(index.items_of(user_id), loaded.items_of(user_id)):
+            np.testing.assert_array_equal(a, b)
+    np.testing.assert_array_equal(loaded.item_degree(), index.item_degree())
@@ -0,0 +1,89 @@
+# tests/test_keyword_filter.py
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from utils.ann_index import IVFIndex
+from utils.content_based_top1000 import (
+    apply_keyword_filter, compute_top_k_neighbors, recompute_neighbors, search_rows, similar_rows,
+)
+from utils.keyword_filter import KeywordFilter
+
+NAMES = [
+    "Áo thun nam cổ tròn", "Áo thun nam basic", "Áo thun NỮ form rộng", "Áo thun nam xinh",
+    "Quần jean nam", "Quần jean nam ống suông", "Váy jean", None, "Áo sơ mi nam", "Áo thun nam trơn",
+]
+
+
+@pytest.fixture()
+def products():
+    return pd.DataFrame({
+        "product_id": np.arange(100, 100 + len(NAMES)),
+        "product_name": NAMES,
+        "description": ["", "", "", "", "", "", "", "quần nữ", "", ""],
+    })
+
+
+def test_mask_matches_any_keyword_in_any_column(products):
+    keyword_filter = KeywordFilter(["nữ", "VÁY", "xinh", " "])
+    assert keyword_filter.keywords == ("nữ", "váy", "xinh")
+    mask = keyword_filter.mask(products)
+    np.testing.assert_array_equal(np.flatnonzero(mask), [2, 3, 6])
+    assert [keyword_filter.matches(name) for name in NAMES] == mask.tolist()
+
+    both = KeywordFilter(["nữ"], columns=("product_name", "description"))
+    np.testing.assert_array_equal(np.flatnonzero(both.mask(products)), [2, 7])
+    assert not KeywordFilter([]).mask(products).any()
+
+
+def _model(products, keyword_filter, k=4):
+    texts = products["product_name"].fillna("").str.lower()
+    vectorizer = TfidfVectorizer(dtype=np.float32)
+    model = {"product_df": products, "tfidf_vectorizer": vectorizer,
+             "tfidf_matrix": vectorizer.fit_transform(texts).tocsr()}
+    apply_keyword_filter(model, keyword_filter)
+    model["neighbor_indices"], model["neighbor_scores"] = compute_top_k_neighbors(
+        model["tfidf_matrix"], k, exclude_mask=model["exclude_mask"])
+    return model
+
+
+def test_neighbors_never_include_excluded_products(products):
+    model = _model(products, KeywordFilter(["nữ", "xinh"]))
+    excluded = np.flatnonzero(model["exclude_mask"])
+    valid = model["neighbor_scores"] > -np.inf
+    assert not np.isin(model["neighbor_indices"][valid], excluded).any()
+    # Sản phẩm bị loại nhường chỗ: "Áo thun nam cổ tròn" vẫn đủ các áo thun nam còn lại
+    rows, _ = similar_rows(model, 100, top_k=3)
+    assert rows.tolist() == [1, 9, 8]
+
+
+def test_excluded_product_cannot_be_the_query(products):
+    model = _model(products, KeywordFilter(["nữ"]))
+    with pytest.raises(ValueError):
+        similar_rows(model, 102)
+    with pytest.raises(ValueError):
+        similar_rows(model, 999)
+    rows, _ = search_rows(model, "áo thun", top_k=10)
+    assert 2 not in rows and len(rows) == 5
+
+
+def test_recompute_after_rule_change(products):
+    model = _model(products, KeywordFilter(["nữ", "xinh"]))
+    assert 3 not in model["neighbor_indices"][1]
+
+    apply_keyword_filter(model, KeywordFilter(["nữ"]))
+    recompute_neighbors(model)
+    assert model["neighbor_indices"].shape[1] == 4
+    assert 3 in similar_rows(model, 101, top_k=4)[0]
+    assert 3 in similar_rows(model, 100, top_k=4)[0]
+
+
+def test_ivf_search_skips_masked_candidates(products):
+    model = _model(products, KeywordFilter(["nữ", "xinh"]))
+    matrix = model["tfidf_matrix"]
+    index = IVFIndex.build(matrix, n_components=4, n_lists=2, n_probe=2)
+    rows, _ = index.search(index.vectors[0], 5, exclude=0, exclude_mask=model["exclude_mask"],
+                           tfidf_matrix=matrix, tfidf_query=matrix[0])
+    assert len(rows) == 5
+    assert not model["exclude_mask"][rows].any() and 0 not in rows
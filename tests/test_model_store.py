@@ -0,0 +1,59 @@
+# tests/test_model_store.py
+import os
+
+import numpy as np
+import pytest
+
+from utils import model_store
+from utils.model_store import (
+    current_version, latest_version_dir, list_versions, load_arrays, prune_versions, publish, save_arrays,
+    verify_version, write_version,
+)
+
+
+@pytest.fixture(autouse=True)
+def distinct_versions(monkeypatch):
+    # Tên phiên bản theo giây: đánh số giả để ghi nhiều phiên bản liên tiếp trong một giây
+    stamps = iter(f"20260101-{i:06d}" for i in range(1000))
+    monkeypatch.setattr(model_store.time, "strftime",
+                        lambda fmt, *args: next(stamps) if fmt == "%Y%m%d-%H%M%S" else "2026-01-01T00:00:00")
+
+
+def _write(base_dir, value, **kwargs):
+    return write_version("m", lambda d: save_arrays(d, {"x": np.array([value])}), base_dir=str(base_dir), **kwargs)
+
+
+def test_write_publishes_and_round_trips(tmp_path):
+    version_dir = _write(tmp_path, 1)
+    assert latest_version_dir("m", base_dir=str(tmp_path)) == version_dir
+    verify_version(version_dir)
+    assert load_arrays(version_dir)["x"].tolist() == [1]
+    with open(os.path.join(version_dir, "x.npy"), "ab") as f:
+        f.write(b"0")
+    with pytest.raises(ValueError):
+        verify_version(version_dir)
+
+
+def test_keeps_last_n_versions(tmp_path):
+    dirs = [_write(tmp_path, i, keep=3) for i in range(6)]
+    assert list_versions("m", base_dir=str(tmp_path)) == [os.path.basename(d) for d in dirs[-3:]]
+    assert current_version("m", base_dir=str(tmp_path)) == os.path.basename(dirs[-1])
+
+
+def test_pruning_never_deletes_current(tmp_path):
+    dirs = [os.path.basename(_write(tmp_path, i, keep=None)) for i in range(4)]
+    publish("m", dirs[0], base_dir=str(tmp_path))  # quay lại bản cũ nhất
+    _write(tmp_path, 9, keep=2, publish_version=False)
+    versions = list_versions("m", base_dir=str(tmp_path))
+    assert dirs[0] in versions and len(versions) == 3
+    assert current_version("m", base_dir=str(tmp_path)) == dirs[0]
+
+    assert prune_versions("m", keep=0, base_dir=str(tmp_path)) == versions[1:]
+    assert list_versions("m", base_dir=str(tmp_path)) == [dirs[0]]
+
+
+def test_unpublished_write_is_kept_even_with_keep_zero(tmp_path):
+    first = os.path.basename(_write(tmp_path, 1))
+    second = os.path.basename(_write(tmp_path, 2, keep=0, publish_version=False))
+    assert list_versions("m", base_dir=str(tmp_path)) == [first, second]
+    assert current_version("m", base_dir=str(tmp_path)) == first
@@ -0,0 +1,144 @@
+# tests/test_result_cache.py
+import os
+import shutil
+import time
+
+import pytest
+
+from utils.result_cache import ResultCache
+
+
+@pytest.fixture()
+def cache():
+    return ResultCache(max_entries=3, ttl=60, disk_dir=None)
+
+
+def test_get_or_compute_calls_compute_once(cache):
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return ["a", "b"]
+
+    assert cache.get_or_compute("v1", "users", 7, 10, compute) == ["a", "b"]
+    assert cache.get_or_compute("v1", "users", 7, 10, compute) == ["a", "b"]
+    assert len(calls) == 1
+    # k khác là khóa khác
+    cache.get_or_compute("v1", "users", 7, 5, compute)
+    assert len(calls) == 2
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 2, 2)
+
+
+def test_errors_are_not_cached(cache):
+    def fail():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        cache.get_or_compute("v1", "users", 1, 10, fail)
+    assert cache.get("v1", "users", 1, 10) is None and len(cache) == 0
+
+
+def test_lru_eviction(cache):
+    for q in range(3):
+        cache.put("v1", "kw", q, 10, q)
+    assert cache.get("v1", "kw", 0, 10) == 0  # 0 vừa được dùng, 1 là mục cũ nhất
+    cache.put("v1", "kw", 3, 10, 3)
+    assert cache.get("v1", "kw", 1, 10) is None
+    assert [cache.get("v1", "kw", q, 10) for q in (0, 2, 3)] == [0, 2, 3]
+    assert cache.stats()["evictions"] == 1
+
+
+def test_ttl_expiry(monkeypatch):
+    cache = ResultCache(ttl=10, disk_dir=None)
+    now = [1000.0]
+    monkeypatch.setattr(time, "time", lambda: now[0])
+    cache.put("v1", "kw", "áo", 10, "x")
+    now[0] += 9
+    assert cache.get("v1", "kw", "áo", 10) == "x"
+    now[0] += 2
+    assert cache.get("v1", "kw", "áo", 10) is None
+    assert len(cache) == 0
+
+
+def test_new_version_drops_old_results_per_mode(cache):
+    cache.put("v1", "users", 1, 10, "old")
+    cache.put("c1", "keywords", "áo", 10, "kw")
+    assert cache.get("v2", "users", 1, 10) is None
+    cache.put("v2", "users", 1, 10, "new")
+    assert cache.get("v2", "users", 1, 10) == "new"
+    # Chế độ khác giữ nguyên kết quả của nó
+    assert cache.get("c1", "keywords", "áo", 10) == "kw"
+    assert len(cache) == 2
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    first = ResultCache(disk_dir=str(tmp_path))
+    first.put("v1", "users", 1, 10, {"items": [1, 2]})
+
+    second = ResultCache(disk_dir=str(tmp_path))
+    assert second.get("v1", "users", 1, 10) == {"items": [1, 2]}
+    assert second.stats()["disk_hits"] == 1
+    # Phiên bản mới: thư mục của phiên bản cũ bị xóa khỏi đĩa
+    assert second.get("v2", "users", 1, 10) is None
+    assert len(os.listdir(tmp_path / "users")) == 0
+    third = ResultCache(disk_dir=str(tmp_path))
+    assert third.get("v1", "users", 1, 10) is None
+
+
+def test_corrupt_disk_entry_is_a_miss(tmp_path):
+    cache = ResultCache(disk_dir=str(tmp_path))
+    cache.put("v1", "users", 1, 10, "x")
+    for root, _, files in os.walk(tmp_path):
+        for name in files:
+            with open(os.path.join(root, name), "wb") as f:
+                f.write(b"not a pickle")
+    assert ResultCache(disk_dir=str(tmp_path)).get("v1", "users", 1, 10) is None
+
+
+def test_stale_snapshot_does_not_flip_the_version_back(cache):
+    cache.put("v1", "users", 1, 10, "old", generation=1)
+    cache.put("v2", "users", 1, 10, "new", generation=2)
+    # Request còn dở trên snapshot 1: không đọc / ghi cache, không xóa kết quả của v2
+    assert cache.get("v1", "users", 1, 10, generation=1) is None
+    cache.put("v1", "users", 1, 10, "old", generation=1)
+    assert cache.get("v2", "users", 1, 10, generation=2) == "new"
+    assert cache.get("v1", "users", 1, 10, generation=1) is None
+
+
+def test_rollback_to_an_earlier_version_is_cached_again(cache):
+    cache.put("v1", "users", 1, 10, "a", generation=1)
+    cache.put("v2", "users", 1, 10, "b", generation=2)
+    # Gỡ bản lỗi: con trỏ quay về v1, HotReloader nạp snapshot mới (generation 3)
+    assert cache.get("v1", "users", 1, 10, generation=3) is None
+    cache.put("v1", "users", 1, 10, "a2", generation=3)
+    assert cache.get("v1", "users", 1, 10, generation=3) == "a2"
+    assert cache.get("v2", "users", 1, 10, generation=2) is None
+    # Snapshot khác nhưng cùng phiên bản của chế độ này (artifact khác đổi): vẫn dùng được kết quả
+    assert cache.get("v1", "users", 1, 10, generation=4) == "a2"
+    assert cache.get("v1", "users", 1, 10, generation=3) == "a2"
+
+
+def test_without_generation_any_new_version_is_activated(cache):
+    cache.put("v1", "users", 1, 10, "a")
+    cache.put("v2", "users", 1, 10, "b")
+    cache.put("v1", "users", 1, 10, "a")
+    assert cache.get("v1", "users", 1, 10) == "a"
+
+
+def test_old_disk_versions_are_removed_outside_the_lock(tmp_path, monkeypatch):
+    cache = ResultCache(disk_dir=str(tmp_path))
+    cache.put("v1", "users", 1, 10, "a", generation=1)
+    removed = []
+    real_rmtree = shutil.rmtree
+
+    def rmtree(path, *args, **kwargs):
+        assert not cache._lock.locked()
+        removed.append(path)
+        real_rmtree(path, *args, **kwargs)
+
+    monkeypatch.setattr(shutil, "rmtree", rmtree)
+    cache.put("v2", "users", 1, 10, "b", generation=2)
+    assert len(removed) == 1 and not os.path.exists(removed[0])
+    assert os.listdir(tmp_path / "users") == [os.path.basename(os.path.dirname(cache._disk_path(("v2", "users"))))]
+    assert ResultCache(disk_dir=str(tmp_path)).get("v2", "users", 1, 10) == "b"
@@ -0,0 +1,34 @@
+# tests/test_svd_evaluation.py
+import numpy as np
+import pytest
+
+pytest.importorskip("surprise")
+
+from utils.svd_evaluation import cheapest_meeting, cross_validate, make_folds  # noqa: E402
+from utils.svd_training import fit_surprise  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def ratings():
+    rng = np.random.default_rng(0)
+    u = rng.integers(0, 40, 800)
+    i = rng.integers(0, 30, 800)
+    r = np.clip(np.round(3 + rng.normal(0, 1, 800)), 1, 5)
+    return u, i, r
+
+
+def test_folds_are_scored_with_the_build_trainer(ratings):
+    u, i, r = ratings
+    configs = [{"n_factors": 4, "n_epochs": 5, "reg": 0.02}, {"n_factors": 8, "n_epochs": 10, "reg": 0.1}]
+    per_fold, summary = cross_validate(u, i, r, configs, n_folds=3, k=5, workers=1, seed=0)
+    assert len(per_fold) == 6 and list(summary["n_factors"]) == [4, 8]
+
+    # Fold 0 của cấu hình 0 tính lại bằng fit_surprise (đường huấn luyện của build) cho cùng RMSE
+    train = make_folds(len(r), 3, 0) != 0
+    scorer = fit_surprise(u[train], i[train], r[train], n_factors=4, n_epochs=5, reg=0.02, seed=0)
+    est = scorer.score_pairs(scorer.user_index.get_many(u[~train]), scorer.item_index.get_many(i[~train]))
+    row = per_fold[(per_fold["config_id"] == 0) & (per_fold["fold"] == 0)].iloc[0]
+    assert row["rmse"] == pytest.approx(np.sqrt(np.mean((r[~train] - est) ** 2)))
+
+    best = cheapest_meeting(summary, max_rmse=10)
+    assert best is not None and best["fit_seconds"] == summary["fit_seconds"].min()
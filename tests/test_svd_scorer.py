@@ -0,0 +1,60 @@
+# tests/test_svd_scorer.py
+import numpy as np
+import pandas as pd
+import pytest
+
+surprise = pytest.importorskip("surprise")
+
+from utils.collaborative import SVDScorer, get_svd_scorer  # noqa: E402
+
+
+@pytest.fixture(scope="module", params=[True, False], ids=["biased", "unbiased"])
+def model(request):
+    rng = np.random.default_rng(0)
+    ratings = pd.DataFrame({
+        "user_id": rng.integers(100, 140, 600),
+        "product_id": rng.integers(1000, 1060, 600),
+        "rating": rng.integers(1, 6, 600).astype(float),
+    })
+    data = surprise.Dataset.load_from_df(ratings, surprise.Reader(rating_scale=(1, 5)))
+    algo = surprise.SVD(n_factors=8, n_epochs=5, biased=request.param, random_state=0)
+    algo.fit(data.build_full_trainset())
+    return algo
+
+
+def test_score_matches_surprise_predict_with_native_ids(model):
+    scorer = SVDScorer.from_surprise(model)
+    users = list(range(95, 145))  # gồm cả user chưa biết
+    items = np.arange(995, 1065)  # gồm cả sản phẩm chưa biết
+    expected = np.array([[model.predict(u, int(i)).est for i in items] for u in users])
+    got = scorer.score_matrix(scorer.user_index.get_many(users), scorer.inner_item_ids(items))
+    np.testing.assert_allclose(got, expected, rtol=0, atol=1e-9)
+
+
+def test_top_n_matches_sorted_predict_loop(model):
+    scorer = get_svd_scorer(model)
+    items = np.arange(1000, 1060)
+    rated = items[::7]
+    for user in (100, 117, 139, 999):
+        loop = sorted(((model.predict(user, int(i)).est, int(i)) for i in items if i not in rated),
+                      key=lambda t: t[0], reverse=True)[:10]
+        top_ids, top_scores = scorer.top_n(user, items, n=10, exclude=rated)
+        assert top_ids.tolist() == [i for _, i in loop]
+        np.testing.assert_allclose(top_scores, [s for s, _ in loop], atol=1e-9)
+
+
+def test_string_ids_resolve_to_trained_int_ids(model):
+    # Lỗi của bản gốc: predict(str(uid), str(pid)) trên mô hình huấn luyện bằng id int luôn trả về global mean
+    scorer = SVDScorer.from_surprise(model)
+    items = scorer.inner_item_ids(["1000", "1001"])
+    np.testing.assert_allclose(scorer.score("117", items), scorer.score(117, scorer.inner_item_ids([1000, 1001])))
+    assert model.predict("117", "1000").est == pytest.approx(model.trainset.global_mean)
+
+
+def test_score_pairs_matches_surprise_predict(model):
+    scorer = SVDScorer.from_surprise(model)
+    users = np.array([95, 100, 117, 139, 144, 120])  # gồm cả user / sản phẩm chưa biết
+    items = np.array([1000, 995, 1030, 1059, 1065, 1010])
+    expected = [model.predict(int(u), int(i)).est for u, i in zip(users, items)]
+    got = scorer.score_pairs(scorer.user_index.get_many(users), scorer.inner_item_ids(items))
+    np.testing.assert_allclose(got, expected, rtol=0, atol=1e-9)
@@ -0,0 +1,145 @@
+# tests/test_svd_training.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import data_store
+from utils.collaborative import SVDScorer
+from utils.interactions import InteractionIndex
+from utils.svd_training import (
+    RatingLog, appended_since, encode, sgd, train_full, train_incremental, train_state, warm_start,
+)
+
+
+def _ratings(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "product_id": rng.integers(1000, 1040, n),
+        "user_id": rng.integers(1, 60, n),
+        "user": "u",
+        "rating": rng.integers(1, 6, n),
+    })
+
+
+@pytest.fixture()
+def ratings_csv(tmp_path, monkeypatch):
+    csv = tmp_path / "ratings.csv"
+    monkeypatch.setattr(data_store, "RATINGS_CSV", str(csv))
+    monkeypatch.setattr(data_store, "RATINGS_PARQUET", str(tmp_path / "missing.parquet"))
+    monkeypatch.setattr(data_store, "DIGEST_WINDOW_BYTES", 64)
+    return csv
+
+
+def _append(csv, df, header=False):
+    df.to_csv(csv, sep="\t", index=False, header=header, mode="a")
+
+
+def test_tail_read_returns_only_appended_rows(ratings_csv):
+    head, tail = _ratings(300), _ratings(50, seed=1)
+    _append(ratings_csv, head, header=True)
+    end = data_store.ratings_end()
+    assert len(RatingLog.read(chunksize=64, end=end)) == 300
+
+    _append(ratings_csv, tail)
+    with open(ratings_csv, "a") as f:
+        f.write("1000\t7\tu")  # dòng cuối đang ghi dở: chưa đọc
+    log = RatingLog.read(chunksize=16, start=end)
+    np.testing.assert_array_equal(log.user_raw, tail["user_id"])
+    np.testing.assert_array_equal(log.item_raw, tail["product_id"])
+    np.testing.assert_array_equal(log.ratings, tail["rating"])
+    assert log.end == ratings_csv.stat().st_size - len("1000\t7\tu")
+
+
+def test_appended_since_detects_rewrites(ratings_csv):
+    _append(ratings_csv, _ratings(300), header=True)
+    state = train_state(data_store.ratings_end(), "v1")
+    _append(ratings_csv, _ratings(10, seed=1))
+    assert appended_since(state, data_store.ratings_end())
+
+    # Ghi lại file: cửa sổ cuối trước vị trí cũ đổi -> không còn là "chỉ nối thêm"
+    rewritten = _ratings(320, seed=2)
+    rewritten.to_csv(ratings_csv, sep="\t", index=False)
+    assert not appended_since(state, data_store.ratings_end())
+    # File ngắn đi / state cũ không có vị trí
+    _ratings(5).to_csv(ratings_csv, sep="\t", index=False)
+    assert not appended_since(state, data_store.ratings_end())
+    assert not appended_since({"trained_rows": 300, "fingerprint": "x"}, data_store.ratings_end())
+
+
+def test_parquet_tail(tmp_path, monkeypatch):
+    pytest.importorskip("pyarrow")
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    path = tmp_path / "ratings.parquet"
+    monkeypatch.setattr(data_store, "RATINGS_PARQUET", str(path))
+    df = _ratings(250)
+    pq.write_table(pa.Table.from_pandas(df, preserve_index=False), path, row_group_size=40)
+    assert data_store.ratings_end() == 250
+    log = RatingLog.read(chunksize=30, start=95, end=230)
+    np.testing.assert_array_equal(log.user_raw, df["user_id"][95:230])
+
+
+def test_extend_matches_full_rebuild():
+    df = _ratings(600)
+    df.loc[550:, "user_id"] += 100  # user và sản phẩm mới chỉ có trong phần nối thêm
+    df.loc[580:, "product_id"] += 100
+    full = InteractionIndex.from_ratings(df)
+    extended = InteractionIndex.from_ratings(df[:500]).extend(
+        df["user_id"][500:], df["product_id"][500:], df["rating"][500:])
+    for key in ("user_ids", "item_ids", "user_indptr", "user_items", "user_ratings",
+                "item_indptr", "item_users", "item_ratings"):
+        np.testing.assert_array_equal(getattr(extended, key), getattr(full, key), err_msg=key)
+
+
+def _fit(log, n_epochs=10):
+    user_ids, item_ids, u, i, r, _ = encode(log)
+    pu, qi, bu, bi = warm_start(None, user_ids, item_ids, n_factors=4)
+    global_mean = float(r.mean())
+    sgd(pu, qi, bu, bi, global_mean, u, i, r, n_epochs=n_epochs)
+    return SVDScorer(pu, qi, bu, bi, global_mean, user_ids, item_ids)
+
+
+def _log(df):
+    return RatingLog(df["user_id"].to_numpy(np.int64), df["product_id"].to_numpy(np.int64),
+                     df["rating"].to_numpy(np.float32))
+
+
+def test_incremental_updates_only_touched_parameters():
+    df = _ratings(600)
+    # User 200: một đánh giá cũ (sản phẩm 1060 chỉ mình họ đánh giá), đủ min_ratings nhờ phần mới
+    extra = pd.DataFrame({"product_id": [1060, 1039, 1050], "user_id": 200, "user": "u", "rating": [3, 5, 4]})
+    head = pd.concat([df[:500], extra[:1]], ignore_index=True)
+    tail = pd.concat([df[500:], extra[1:]], ignore_index=True)
+    previous = _fit(_log(head))
+    index = InteractionIndex.from_ratings(head).extend(tail["user_id"], tail["product_id"], tail["rating"])
+    scorer, stats = train_incremental(previous, index, _log(tail), min_ratings=3)
+
+    full_ids, full_items, *_ = encode(_log(pd.concat([head, tail])))
+    np.testing.assert_array_equal(np.sort(scorer.user_ids), full_ids)
+    np.testing.assert_array_equal(np.sort(scorer.item_ids), full_items)
+    assert 200 not in previous.user_index and 1060 not in previous.item_index
+    assert 200 in scorer.user_index and {1050, 1060} <= set(scorer.item_ids.tolist())
+    assert stats["new_rows"] == len(tail)
+
+    untouched = np.setdiff1d(previous.user_ids, tail["user_id"])
+    assert len(untouched)
+    for user_id in untouched:
+        new, old = scorer.user_index.get(user_id), previous.user_index.get(user_id)
+        np.testing.assert_array_equal(scorer.pu[new], previous.pu[old])
+        assert scorer.bu[new] == previous.bu[old]
+    moved = [user_id for user_id in tail["user_id"].unique() if user_id in previous.user_index]
+    assert any(not np.array_equal(scorer.pu[scorer.user_index.get(x)], previous.pu[previous.user_index.get(x)])
+               for x in moved)
+
+
+def test_full_training_uses_surprise_on_kept_users():
+    pytest.importorskip("surprise")
+    df = _ratings(400)
+    df.loc[0, "user_id"] = 500  # một đánh giá: bị lọc bởi min_ratings
+    scorer, stats = train_full(_log(df), min_ratings=3, n_factors=4, n_epochs=5)
+    user_ids, item_ids, *_ = encode(_log(df))
+    np.testing.assert_array_equal(np.sort(scorer.user_ids), user_ids)
+    np.testing.assert_array_equal(np.sort(scorer.item_ids), item_ids)
+    assert 500 not in scorer.user_index and scorer.pu.shape[1] == 4
+    assert stats["mode"] == "full" and stats["train_rmse"] < 1.5
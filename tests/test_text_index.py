@@ -0,0 +1,69 @@
+# tests/test_text_index.py
+import random
+import unicodedata
+
+import numpy as np
+import pytest
+
+from utils.text_index import NgramIndex, normalize_text
+
+TEXTS = [
+    "Áo thun nam cổ tròn", "áo  THUN nữ", "Quần jean nam", "Áo sơ mi nam", "Giày thể thao",
+    "Quần short thun", "áo", "Thắt lưng da", "Áo khoác jean", "",
+]
+
+
+def brute_contains(texts, query):
+    query = normalize_text(query)
+    return [i for i, t in enumerate(texts) if query in normalize_text(t)]
+
+
+def brute_search(texts, query):
+    query = normalize_text(query)
+    norm = [normalize_text(t) for t in texts]
+    prefix = sorted((i for i, t in enumerate(norm) if t.startswith(query)), key=lambda i: norm[i])
+    return prefix + [i for i, t in enumerate(norm) if query in t and i not in prefix]
+
+
+def test_normalize_text():
+    assert normalize_text("  Áo   THUN\tnữ ") == "áo thun nữ"
+    # Cùng một chữ ở dạng dựng sẵn (NFC) và tổ hợp (NFD) phải khớp nhau
+    assert normalize_text(unicodedata.normalize("NFD", "\u00c1o")) == normalize_text("\u00c1o") == "\u00e1o"
+
+
+@pytest.mark.parametrize("query", ["áo", "ÁO THUN", "thun", "jean", "n", "am", "q", "xyz", "sơ mi nam", "áo"])
+def test_matches_brute_force(query):
+    index = NgramIndex(TEXTS)
+    assert index.contains(query).tolist() == brute_contains(TEXTS, query)
+    assert index.search(query).tolist() == brute_search(TEXTS, query)
+    assert index.prefix(query).tolist() == [i for i in brute_search(TEXTS, query)
+                                            if normalize_text(TEXTS[i]).startswith(normalize_text(query))]
+
+
+def test_limit_returns_a_prefix_of_the_full_result():
+    index = NgramIndex(TEXTS)
+    for query in ("áo", "n", "thun", "nam"):
+        full = index.search(query).tolist()
+        for limit in (1, 2, 3, 10):
+            assert index.search(query, limit=limit).tolist() == full[:limit]
+            assert len(index.contains(query, limit=limit)) == min(limit, len(brute_contains(TEXTS, query)))
+
+
+def test_empty_query_lists_all_alphabetically():
+    index = NgramIndex(TEXTS)
+    assert index.search("").tolist() == sorted(range(len(TEXTS)), key=lambda i: normalize_text(TEXTS[i]))
+    assert index.search("  ", limit=3).tolist() == index.search("")[:3].tolist()
+    assert len(index) == len(TEXTS)
+
+
+def test_random_corpus_against_brute_force():
+    rng = random.Random(0)
+    alphabet = "abcăâđeêôơư "
+    texts = ["".join(rng.choice(alphabet) for _ in range(rng.randint(0, 12))) for _ in range(300)]
+    index = NgramIndex(texts)
+    for _ in range(200):
+        source = rng.choice(texts)
+        start = rng.randint(0, max(len(source) - 1, 0))
+        query = source[start:start + rng.randint(1, 5)]
+        assert index.contains(query).tolist() == brute_contains(texts, query), query
+        assert np.array_equal(index.search(query), brute_search(texts, query)), query
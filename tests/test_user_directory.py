@@ -0,0 +1,49 @@
+# tests/test_user_directory.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.text_index import normalize_text
+from utils.user_directory import UserDirectory
+
+
+@pytest.fixture()
+def directory():
+    ratings = pd.DataFrame({
+        "user_id": [12, 3, 120, 7, 12, 45, 1200, 3],
+        "user": ["an", "bình", "anh", "chi", "an", "mai anh", None, "bình"],
+    })
+    return UserDirectory.from_ratings(ratings)
+
+
+def _brute(directory, query):
+    query = normalize_text(query)
+    texts = [normalize_text(f"{uid} {name}") for uid, name in zip(directory.user_ids, directory.names)]
+    prefix = sorted((i for i, t in enumerate(texts) if t.startswith(query)), key=lambda i: texts[i])
+    return prefix + [i for i, t in enumerate(texts) if query in t and i not in prefix]
+
+
+def test_exact_id_first_then_prefix_then_substring(directory):
+    assert directory.user_ids[directory.search("12")].tolist() == [12, 120, 1200]
+    assert directory.search("anh").tolist() == _brute(directory, "anh")
+    assert directory.user_ids[directory.search("120")[0]] == 120
+    assert directory.n_ratings[directory.index.get(12)] == 2
+
+
+def test_short_queries_only_match_prefixes_without_scanning(directory, monkeypatch):
+    def scan(*args, **kwargs):
+        raise AssertionError("truy vấn ngắn không được duyệt mọi user")
+
+    monkeypatch.setattr(directory.text_index, "contains", scan)
+    assert directory.user_ids[directory.search("1")].tolist() == [12, 120, 1200]
+    assert directory.user_ids[directory.search("3")].tolist() == [3]
+    assert directory.search("an").tolist() == []  # "an" chỉ có sau id: không phải tiền tố
+
+
+def test_limit(directory):
+    assert directory.search("", limit=3).tolist() == [0, 1, 2]
+    assert len(directory.search("", limit=None)) == len(directory)
+    assert directory.user_ids[directory.search("12", limit=2)].tolist() == [12, 120]
+    for query in ("an", "anh", "1 a", "bình"):
+        assert directory.search(query, limit=1).tolist() == directory.search(query, limit=None)[:1].tolist()
+    assert isinstance(directory.search("xyz"), np.ndarray)
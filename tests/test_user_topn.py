@@ -0,0 +1,83 @@
+# tests/test_user_topn.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.catalog import Catalog
+from utils.collaborative import (
+    SVDScorer, UserTopNTable, catalog_item_ids, model_fingerprint, precomputed_rows, top_n_rows, usable_user_topn,
+)
+from utils.interactions import InteractionIndex
+
+ITEMS = np.arange(1000, 1020)
+USERS = np.arange(1, 6)
+
+
+@pytest.fixture()
+def scorer():
+    rng = np.random.default_rng(0)
+    return SVDScorer(pu=rng.normal(size=(len(USERS), 4)), qi=rng.normal(size=(len(ITEMS), 4)),
+                     bu=rng.normal(size=len(USERS)), bi=rng.normal(size=len(ITEMS)),
+                     global_mean=3.0, user_ids=USERS, item_ids=ITEMS)
+
+
+@pytest.fixture()
+def catalog():
+    return Catalog.from_df(pd.DataFrame({
+        "product_id": ITEMS, "price": np.full(len(ITEMS), 1000.0), "description": ["mô tả"] * len(ITEMS),
+    }))
+
+
+def _table(scorer, catalog, ratings, top_n):
+    """Bảng top-N như build_user_recommendations.py tính, từ top_n_rows."""
+    top = [top_n_rows(u, scorer, catalog, ratings, n=top_n) for u in USERS]
+    top_ids = np.full((len(USERS), top_n), -1, dtype=np.int64)  # -1 = ô trống
+    top_scores = np.zeros((len(USERS), top_n), dtype=np.float32)
+    for i, (rows, scores) in enumerate(top):
+        top_ids[i, :len(rows)] = catalog.product_ids[rows]
+        top_scores[i, :len(rows)] = scores
+    return UserTopNTable(USERS, top_ids, top_scores,
+                         model_fingerprint=model_fingerprint(scorer, catalog_item_ids(catalog.product_ids)))
+
+
+def _ratings(pairs):
+    users, items = zip(*pairs)
+    return InteractionIndex.from_ratings(pd.DataFrame({
+        "user_id": users, "product_id": items, "rating": np.full(len(pairs), 5.0),
+    }))
+
+
+def test_table_is_dropped_when_model_or_catalog_changes(scorer, catalog):
+    table = _table(scorer, catalog, _ratings([(1, 1000)]), top_n=5)
+    assert usable_user_topn(table, scorer, catalog) is table
+
+    retrained = SVDScorer(scorer.pu, scorer.qi * 1.01, scorer.bu, scorer.bi, scorer.global_mean, USERS, ITEMS)
+    assert usable_user_topn(table, retrained, catalog) is None
+    smaller = Catalog.from_df(pd.DataFrame({"product_id": ITEMS[:-1]}))
+    assert usable_user_topn(table, scorer, smaller) is None
+    assert usable_user_topn(None, scorer, catalog) is None
+
+
+def test_precomputed_rows_skip_items_rated_after_build(scorer, catalog):
+    ratings = _ratings([(1, 1000)])
+    table = _table(scorer, catalog, ratings, top_n=len(ITEMS))
+    rows, _ = precomputed_rows(1, table, catalog, n=5, ratings=ratings)
+    newly_rated = int(catalog.product_ids[rows[0]])
+
+    now = _ratings([(1, 1000), (1, newly_rated)])
+    rows, scores = precomputed_rows(1, table, catalog, n=5, ratings=now)
+    assert newly_rated not in catalog.product_ids[rows]
+    expected_rows, expected_scores = top_n_rows(1, scorer, catalog, now, n=5)
+    np.testing.assert_array_equal(rows, expected_rows)
+    np.testing.assert_allclose(scores, expected_scores, rtol=1e-6)
+
+
+def test_precomputed_rows_fall_back_when_filtered_table_runs_short(scorer, catalog):
+    ratings = _ratings([(2, 1000)])
+    table = _table(scorer, catalog, ratings, top_n=5)
+    rows, _ = precomputed_rows(2, table, catalog, n=5, ratings=ratings)
+    now = _ratings([(2, 1000), (2, int(catalog.product_ids[rows[0]]))])
+    # Bảng chỉ giữ 5 ứng viên: sau khi loại một sản phẩm thì không biết ứng viên thứ 6, để top_n_rows tính
+    assert precomputed_rows(2, table, catalog, n=5, ratings=now) is None
+    assert precomputed_rows(2, table, catalog, n=4, ratings=now) is not None
+    assert precomputed_rows(99, table, catalog, n=5, ratings=now) is None
@@ -0,0 +1,53 @@
+# update_content_filter.py
+# python3 update_content_filter.py                              # áp lại luật mặc định (FEMALE_KEYWORDS)
+# python3 update_content_filter.py --keywords "nữ" "váy" "đầm"  # đổi danh sách từ khóa
+# python3 update_content_filter.py --add "bikini" --columns product_name description
+#
+# Tính lại exclude_mask của mô hình content-based mới nhất và ghi thành một phiên bản mới.
+# Không vector hóa lại: một lượt regex trên bảng sản phẩm, rồi tính lại bảng láng giềng
+# (đã lưu theo mask cũ) từ ma trận TF-IDF sẵn có.
+
+import argparse
+import time
+
+from utils.content_based_top1000 import apply_keyword_filter, load_model_dir, recompute_neighbors, save_model_dir
+from utils.keyword_filter import KeywordFilter
+from utils.model_loader import CB_MODEL_NAME
+from utils.model_store import latest_version_dir, write_version
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cập nhật luật lọc sản phẩm theo từ khóa cho mô hình content-based.")
+    parser.add_argument("--keywords", nargs="+", default=None,
+                        help="Danh sách từ khóa mới (mặc định: giữ luật đang lưu trong mô hình)")
+    parser.add_argument("--add", nargs="+", default=[], help="Thêm từ khóa vào luật hiện tại")
+    parser.add_argument("--remove", nargs="+", default=[], help="Bỏ từ khóa khỏi luật hiện tại")
+    parser.add_argument("--columns", nargs="+", default=None, help="Cột được kiểm tra (mặc định: giữ như cũ)")
+    args = parser.parse_args()
+
+    version_dir = latest_version_dir(CB_MODEL_NAME)
+    if version_dir is None:
+        raise SystemExit("❌ Chưa có mô hình content-based dạng thư mục phiên bản (chạy build_content_based_light_model.py).")
+    model = load_model_dir(version_dir)
+    current = KeywordFilter(model.get("exclude_keywords", KeywordFilter().keywords),
+                            columns=model.get("exclude_columns", ("product_name",)))
+
+    keywords = list(args.keywords if args.keywords is not None else current.keywords)
+    removed = {k.lower() for k in args.remove}
+    keywords = [k for k in keywords + args.add if k.lower() not in removed]
+    keyword_filter = KeywordFilter(keywords, columns=args.columns or current.columns)
+
+    start = time.perf_counter()
+    mask = apply_keyword_filter(model, keyword_filter)
+    print(f"🏷️ {keyword_filter}: {int(mask.sum())}/{len(mask)} sản phẩm bị loại "
+          f"({(time.perf_counter() - start) * 1000:.0f} ms)")
+
+    if "neighbor_indices" in model:
+        # Láng giềng lưu sẵn được chọn theo mask cũ: sản phẩm vừa bị loại phải nhường chỗ, sản phẩm vừa được bỏ
+        # loại phải có mặt lại
+        start = time.perf_counter()
+        recompute_neighbors(model)
+        print(f"📊 Đã tính lại top-{model['neighbor_indices'].shape[1]} láng giềng "
+              f"({time.perf_counter() - start:.1f}s)")
+
+    new_dir = write_version(CB_MODEL_NAME, lambda tmp_dir: save_model_dir(model, tmp_dir))
+    print(f"💾 Phiên bản mới: {new_dir}")
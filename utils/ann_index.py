@@ -0,0 +1,163 @@
+# utils/ann_index.py
+import time
+
+import numpy as np
+from sklearn.decomposition import TruncatedSVD
+
+
+def _normalize_rows(x):
+    norms = np.linalg.norm(x, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return x / norms
+
+
+class IVFIndex:
+    """
+    Chỉ mục ANN dạng IVF (inverted file) thuần NumPy cho cosine similarity.
+    Sản phẩm được chiếu từ TF-IDF xuống vector ít chiều (TruncatedSVD), chuẩn hóa L2,
+    rồi chia vào n_lists cụm bằng spherical k-means. Khi tìm kiếm chỉ quét n_probe cụm gần nhất,
+    lấy k * rerank_factor ứng viên rồi (nếu có TF-IDF) tính lại cosine chính xác để xếp hạng.
+    """
+
+    def __init__(self, components, vectors, centroids, list_offsets, list_items, n_probe=8, rerank_factor=10):
+        self.components = np.asarray(components)  # (d, V): ma trận chiếu TF-IDF -> d chiều
+        self.vectors = np.asarray(vectors)  # (N, d) float32, đã chuẩn hóa L2
+        self.centroids = np.asarray(centroids)  # (n_lists, d)
+        self.list_offsets = np.asarray(list_offsets)  # (n_lists + 1,)
+        self.list_items = np.asarray(list_items)  # (N,) id dòng sản phẩm, gom theo cụm
+        self.n_probe = n_probe
+        self.rerank_factor = rerank_factor
+
+    @classmethod
+    def build(cls, tfidf_matrix, n_components=128, n_lists=None, n_iter=10,
+              train_size=50_000, n_probe=8, seed=42):
+        n = tfidf_matrix.shape[0]
+        n_components = max(1, min(n_components, tfidf_matrix.shape[1] - 1, n - 1))
+        svd = TruncatedSVD(n_components=n_components, random_state=seed)
+        vectors = _normalize_rows(svd.fit_transform(tfidf_matrix).astype(np.float32))
+
+        n_lists = n_lists or int(np.clip(np.sqrt(n), 1, 4096))
+        n_lists = min(n_lists, n)
+        rng = np.random.default_rng(seed)
+        train = vectors[rng.choice(n, size=min(train_size, n), replace=False)]
+        centroids = _spherical_kmeans(train, n_lists, n_iter, rng)
+
+        assign = _assign(vectors, centroids)
+        order = np.argsort(assign, kind="stable").astype(np.int32)
+        counts = np.bincount(assign, minlength=n_lists)
+        list_offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        return cls(svd.components_.astype(np.float32), vectors, centroids, list_offsets, order, n_probe)
+
+    def transform(self, tfidf_rows):
+        """Chiếu vector TF-IDF (thưa) của truy vấn về không gian của index, chuẩn hóa L2."""
+        return _normalize_rows(np.asarray(tfidf_rows @ self.components.T, dtype=np.float32))
+
+    def search(self, query, k, n_probe=None, exclude=None, tfidf_matrix=None, tfidf_query=None,
+               rerank_factor=None, exclude_mask=None):
+        """
+        Tìm k sản phẩm gần nhất với một vector truy vấn (d chiều, đã chuẩn hóa).
+        exclude: một dòng bị bỏ qua (chính sản phẩm truy vấn); exclude_mask: mảng bool theo dòng, các dòng
+        True bị bỏ khỏi ứng viên trước khi chọn / xếp hạng lại nên không chiếm chỗ trong top-k.
+        Nếu truyền tfidf_matrix và tfidf_query (thưa, đã chuẩn hóa L2) thì xếp hạng lại
+        các ứng viên bằng cosine chính xác trên TF-IDF.
+        Trả về (chỉ số dòng, điểm cosine) giảm dần.
+        """
+        query = np.asarray(query, dtype=np.float32).ravel()
+        n_probe = min(n_probe or self.n_probe, len(self.centroids))
+        centroid_scores = self.centroids @ query
+        probe = np.argpartition(-centroid_scores, n_probe - 1)[:n_probe]
+
+        candidates = np.concatenate([
+            self.list_items[self.list_offsets[c]:self.list_offsets[c + 1]] for c in probe
+        ])
+        if exclude is not None:
+            candidates = candidates[candidates != exclude]
+        if exclude_mask is not None:
+            candidates = candidates[~exclude_mask[candidates]]
+        if len(candidates) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        scores = self.vectors[candidates] @ query
+        rerank = tfidf_matrix is not None and tfidf_query is not None
+        if rerank:
+            # Giữ k * rerank_factor ứng viên tốt nhất theo vector giảm chiều, rồi chấm lại chính xác
+            n_keep = min(k * (rerank_factor or self.rerank_factor), len(candidates))
+            keep = np.argpartition(-scores, n_keep - 1)[:n_keep]
+            candidates = candidates[keep]
+            scores = (tfidf_matrix[candidates] @ tfidf_query.T).toarray().ravel()
+
+        k = min(k, len(candidates))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return candidates[top].astype(np.int64), scores[top]
+
+    def arrays(self, prefix="ann"):
+        return {
+            f"{prefix}_components": self.components,
+            f"{prefix}_vectors": self.vectors,
+            f"{prefix}_centroids": self.centroids,
+            f"{prefix}_list_offsets": self.list_offsets,
+            f"{prefix}_list_items": self.list_items,
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays, prefix="ann", n_probe=8, rerank_factor=10):
+        return cls(
+            arrays[f"{prefix}_components"], arrays[f"{prefix}_vectors"], arrays[f"{prefix}_centroids"],
+            arrays[f"{prefix}_list_offsets"], arrays[f"{prefix}_list_items"], n_probe, rerank_factor,
+        )
+
+
+def _assign(vectors, centroids, chunk=65_536):
+    assign = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), chunk):
+        assign[start:start + chunk] = np.argmax(vectors[start:start + chunk] @ centroids.T, axis=1)
+    return assign
+
+
+def _spherical_kmeans(x, n_clusters, n_iter, rng):
+    centroids = x[rng.choice(len(x), size=n_clusters, replace=False)].copy()
+    for _ in range(n_iter):
+        assign = _assign(x, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, x)
+        counts = np.bincount(assign, minlength=n_clusters)
+        empty = counts == 0
+        if empty.any():
+            # Cụm rỗng: khởi tạo lại bằng điểm ngẫu nhiên
+            sums[empty] = x[rng.choice(len(x), size=empty.sum(), replace=False)]
+        centroids = _normalize_rows(sums)
+    return centroids.astype(np.float32)
+
+
+def recall_at_k(index, tfidf_matrix, k=10, n_queries=200, n_probe=None, rerank_factor=None, seed=0):
+    """
+    So sánh ANN với cosine chính xác trên TF-IDF: lấy ngẫu nhiên n_queries sản phẩm làm truy vấn,
+    recall@k = tỉ lệ trung bình top-k chính xác (bỏ chính nó) nằm trong top-k của ANN.
+    Trả về (recall, thời gian trung bình mỗi truy vấn ANN tính bằng ms).
+    """
+    n = tfidf_matrix.shape[0]
+    rng = np.random.default_rng(seed)
+    queries = rng.choice(n, size=min(n_queries, n), replace=False)
+    hits, total, elapsed = 0, 0, 0.0
+
+    for q in queries:
+        exact = (tfidf_matrix @ tfidf_matrix[q].T).toarray().ravel()
+        exact[q] = -np.inf
+        kk = min(k, n - 1)
+        truth = np.argpartition(-exact, kk - 1)[:kk]
+        truth = truth[exact[truth] > 0]
+        if len(truth) == 0:
+            continue
+
+        start = time.perf_counter()
+        found, _ = index.search(index.vectors[q], kk, n_probe=n_probe, exclude=q,
+                                tfidf_matrix=tfidf_matrix, tfidf_query=tfidf_matrix[q],
+                                rerank_factor=rerank_factor)
+        elapsed += time.perf_counter() - start
+
+        hits += len(np.intersect1d(truth, found))
+        total += len(truth)
+
+    recall = hits / total if total else 1.0
+    return recall, 1000 * elapsed / max(len(queries), 1)
@@ -0,0 +1,82 @@
+# utils/catalog.py
+import numpy as np
+import pandas as pd
+
+from utils.data_store import PRODUCT_DISPLAY_COLUMNS
+from utils.id_index import IdIndex
+
+# Nhãn tiếng Việt, chỉ áp dụng lúc hiển thị (trang Streamlit, JSON của API)
+DISPLAY_LABELS = {
+    "product_id": "Mã SP",
+    "product_name": "Tên sản phẩm",
+    "sub_category": "Loại sản phẩm",
+    "price": "Giá",
+    "rating": "Đánh giá",
+    "description": "Mô tả",
+    "image": "image",
+    "similarity": "Độ tương đồng",
+    "prediction": "Dự đoán",
+    "hybrid_score": "Điểm kết hợp",
+}
+SHORT_DESCRIPTION_CHARS = 200
+
+
+class Catalog:
+    """
+    Bảng sản phẩm dùng chung trong một tiến trình: các cột hiển thị lưu theo cột (mảng numpy)
+    và chỉ mục product_id -> dòng. Bộ gợi ý chỉ trả về (dòng, điểm); take() dựng bảng k dòng
+    cho kết quả cuối cùng, nên mỗi request cấp phát tỉ lệ với k chứ không với kích thước danh mục.
+    """
+
+    def __init__(self, columns):
+        self.columns = {name: np.asarray(values) for name, values in columns.items()}
+        self.product_ids = self.columns["product_id"]
+        self.index = IdIndex(self.product_ids)
+        # Dòng đầu tiên của mỗi product_id (bỏ dòng trùng mã), giữ thứ tự xuất hiện
+        first = self.index.get_many(self.product_ids)
+        self.unique_rows = np.flatnonzero(first == np.arange(len(self.product_ids)))
+
+    @classmethod
+    def from_df(cls, df, columns=PRODUCT_DISPLAY_COLUMNS):
+        """Dòng i của Catalog là dòng i của df (không lọc, để khớp với các ma trận theo dòng của mô hình)."""
+        return cls({col: df[col].to_numpy() for col in columns if col in df.columns})
+
+    def __len__(self):
+        return len(self.product_ids)
+
+    def __contains__(self, product_id):
+        return product_id in self.index
+
+    def row(self, product_id):
+        """Dòng của product_id (-1 nếu không có)."""
+        return self.index.get(product_id)
+
+    def rows(self, product_ids):
+        """Dòng của nhiều product_id cùng lúc (mảng int64, -1 nếu không có)."""
+        return self.index.get_many(product_ids)
+
+    def column(self, name):
+        return self.columns[name]
+
+    def take(self, rows, columns=None, **scores):
+        """
+        Bảng kết quả cho các dòng rows (đúng thứ tự), tên cột gốc; scores là các cột điểm đi kèm,
+        vd. take(rows, similarity=sims). Chỉ sao chép len(rows) phần tử của mỗi cột.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        data = {col: self.columns[col][rows] for col in (columns or self.columns) if col in self.columns}
+        data.update({name: np.asarray(values) for name, values in scores.items()})
+        return pd.DataFrame(data)
+
+
+def as_catalog(products):
+    """Nhận Catalog hoặc DataFrame sản phẩm (dựng Catalog tạm — nên dựng một lần rồi truyền vào)."""
+    return products if isinstance(products, Catalog) else Catalog.from_df(products)
+
+
+def to_display(result, short_description=False):
+    """Đổi tên cột sang nhãn tiếng Việt để hiển thị; short_description cắt mô tả còn 200 ký tự."""
+    result = result.copy()
+    if short_description and "description" in result.columns:
+        result["description"] = result["description"].fillna("").astype(str).str.slice(0, SHORT_DESCRIPTION_CHARS)
+    return result.rename(columns={k: v for k, v in DISPLAY_LABELS.items() if k in result.columns})
@@ -1,49 +1,378 @@
-# utils/collaborative.py
+import hashlib
+import os
+import weakref
+
+import numpy as np
 import pandas as pd
 
+from utils import metrics
+from utils.catalog import as_catalog, to_display
+from utils.id_index import IdIndex, normalize_ids
+from utils.interactions import rated_products
+from utils.model_store import load_arrays, load_meta, save_arrays, save_meta
+
+
+class SVDScorer:
+    """
+    Bộ chấm điểm vector hóa cho mô hình SVD (Surprise).
+    Lấy các ma trận đã học (pu, qi, bu, bi, global mean) ra một lần,
+    sau đó chấm điểm một user với toàn bộ sản phẩm bằng một phép nhân ma trận-vector.
+    """
+
+    def __init__(self, pu, qi, bu, bi, global_mean, user_ids, item_ids,
+                 rating_scale=(1, 5), biased=True, user_index=None, item_index=None):
+        self.pu = np.asarray(pu)
+        self.qi = np.asarray(qi)
+        self.bu = np.asarray(bu)
+        self.bi = np.asarray(bi)
+        self.global_mean = float(global_mean)
+        self.rating_scale = tuple(rating_scale)
+        self.biased = bool(biased)
+
+        # Ánh xạ raw id -> inner id (chấp nhận cả id dạng str như model.predict(str(...)))
+        self.user_index = user_index if user_index is not None else IdIndex(normalize_ids(user_ids))
+        self.item_index = item_index if item_index is not None else IdIndex(normalize_ids(item_ids))
+        self.user_ids = self.user_index.ids
+        self.item_ids = self.item_index.ids
+
+    @classmethod
+    def from_surprise(cls, model):
+        trainset = model.trainset
+        biased = getattr(model, "biased", True)
+        return cls(
+            pu=model.pu,
+            qi=model.qi,
+            bu=model.bu if biased else np.zeros(trainset.n_users),
+            bi=model.bi if biased else np.zeros(trainset.n_items),
+            global_mean=trainset.global_mean,
+            user_ids=[trainset.to_raw_uid(i) for i in range(trainset.n_users)],
+            item_ids=[trainset.to_raw_iid(i) for i in range(trainset.n_items)],
+            rating_scale=trainset.rating_scale,
+            biased=biased,
+        )
+
+    def save(self, version_dir, train_state=None):
+        """
+        Lưu ma trận nhân tố và id thành các file .npy (mở lại bằng mmap), tham số nhỏ vào meta.pkl.
+        train_state: thông tin để lần huấn luyện sau khởi tạo tiếp từ phiên bản này (xem utils/svd_training.py).
+        """
+        arrays = {"pu": self.pu, "qi": self.qi, "bu": self.bu, "bi": self.bi}
+        arrays.update(self.user_index.arrays("user"))
+        arrays.update(self.item_index.arrays("item"))
+        save_arrays(version_dir, arrays)
+        save_meta(version_dir, {
+            "global_mean": self.global_mean,
+            "rating_scale": self.rating_scale,
+            "biased": self.biased,
+            "train_state": train_state,
+        })
+
+    @classmethod
+    def load(cls, version_dir, mmap_mode="r"):
+        arrays = load_arrays(version_dir, mmap_mode=mmap_mode)
+        meta = load_meta(version_dir)
+        user_index = IdIndex.from_arrays(arrays, "user")
+        item_index = IdIndex.from_arrays(arrays, "item")
+        return cls(
+            pu=arrays["pu"], qi=arrays["qi"], bu=arrays["bu"], bi=arrays["bi"],
+            global_mean=meta["global_mean"],
+            user_ids=user_index.ids, item_ids=item_index.ids,
+            rating_scale=meta["rating_scale"], biased=meta["biased"],
+            user_index=user_index, item_index=item_index,
+        )
+
+    @staticmethod
+    def load_train_state(version_dir):
+        return load_meta(version_dir).get("train_state")
+
+    def inner_item_ids(self, product_ids):
+        """Ánh xạ danh sách product_id sang inner id (-1 nếu mô hình chưa biết sản phẩm)."""
+        return self.item_index.get_many(product_ids)
+
+    def score_matrix(self, user_inner, item_inner):
+        """
+        Dự đoán rating cho nhiều user x nhiều sản phẩm (inner id, -1 = không biết), shape (U, I).
+        Cho kết quả giống hệt model.predict(...).est, kể cả trường hợp user/sản phẩm chưa biết.
+        """
+        user_inner = np.asarray(user_inner)
+        item_inner = np.asarray(item_inner)
+        known_user = user_inner >= 0
+        known_item = item_inner >= 0
+        safe_users = np.where(known_user, user_inner, 0)
+        safe_items = np.where(known_item, item_inner, 0)
+        both = known_user[:, None] & known_item[None, :]
+        dot = self.pu[safe_users] @ self.qi[safe_items].T
+
+        if self.biased:
+            est = (
+                self.global_mean
+                + np.where(known_user, self.bu[safe_users], 0.0)[:, None]
+                + np.where(known_item, self.bi[safe_items], 0.0)[None, :]
+                + np.where(both, dot, 0.0)
+            )
+        else:
+            # Không có bias: trường hợp không dự đoán được sẽ trả về global mean (default_prediction)
+            est = np.where(both, dot, self.global_mean)
+
+        low, high = self.rating_scale
+        return np.clip(est, low, high)
+
+    def score_pairs(self, user_inner, item_inner):
+        """Dự đoán rating cho từng cặp (user_inner[k], item_inner[k]) (inner id, -1 = không biết), như score_matrix."""
+        user_inner = np.asarray(user_inner)
+        item_inner = np.asarray(item_inner)
+        known_user = user_inner >= 0
+        known_item = item_inner >= 0
+        safe_users = np.where(known_user, user_inner, 0)
+        safe_items = np.where(known_item, item_inner, 0)
+        dot = np.einsum("ij,ij->i", self.pu[safe_users], self.qi[safe_items])
+        both = known_user & known_item
+        if self.biased:
+            est = (self.global_mean + np.where(known_user, self.bu[safe_users], 0.0)
+                   + np.where(known_item, self.bi[safe_items], 0.0) + np.where(both, dot, 0.0))
+        else:
+            est = np.where(both, dot, self.global_mean)
+        low, high = self.rating_scale
+        return np.clip(est, low, high)
+
+    def score(self, user_id, item_inner):
+        """Dự đoán rating của một user cho các sản phẩm (theo inner id, -1 = không biết)."""
+        u = self.user_index.get(user_id)
+        return self.score_matrix(np.array([u]), item_inner)[0]
+
+    def top_n_positions(self, user_id, item_inner, n=5, exclude=None):
+        """
+        Top-n theo vị trí: item_inner là inner id của từng ứng viên (-1 = không biết),
+        exclude là các vị trí bị loại. Trả về (vị trí, scores), điểm giảm dần, hòa điểm giữ thứ tự ban đầu.
+        """
+        scores = self.score(user_id, item_inner)
+        if exclude is not None and len(exclude):
+            scores[np.asarray(exclude)] = -np.inf
+        n = min(n, int(np.isfinite(scores).sum()))
+        if n <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+
+        # Chọn ứng viên bằng argpartition (O(N)), giữ cả các phần tử hòa điểm ở ngưỡng
+        threshold = np.partition(scores, len(scores) - n)[len(scores) - n]
+        candidates = np.flatnonzero(scores >= threshold)
+        order = np.lexsort((candidates, -scores[candidates]))[:n]
+        top = candidates[order]
+        return top, scores[top]
+
+    def top_n(self, user_id, product_ids, n=5, exclude=None):
+        """
+        Trả về (product_ids, scores) của top-n sản phẩm có điểm dự đoán cao nhất.
+        Thứ tự giống sorted(..., reverse=True): điểm giảm dần, hòa điểm giữ thứ tự ban đầu.
+        """
+        product_ids = np.asarray(product_ids)
+        excluded = None
+        if exclude is not None and len(exclude):
+            excluded = np.flatnonzero(np.isin(product_ids, np.asarray(exclude)))
+        top, scores = self.top_n_positions(user_id, self.inner_item_ids(product_ids), n=n, exclude=excluded)
+        return product_ids[top], scores
+
+
+# Cache bộ chấm điểm theo từng đối tượng mô hình (tránh trích xuất lại ma trận mỗi request)
+_scorer_cache = weakref.WeakKeyDictionary()
+# Inner id SVD của các sản phẩm trong từng Catalog: scorer -> {catalog: mảng inner id}
+_catalog_inner_cache = weakref.WeakKeyDictionary()
+
+
+def get_svd_scorer(model):
+    if isinstance(model, SVDScorer):
+        return model
+    try:
+        scorer = _scorer_cache.get(model)
+    except TypeError:
+        return SVDScorer.from_surprise(model)
+    if scorer is None:
+        metrics.count("cache_misses_total", cache="svd_scorer")
+        with metrics.timer("collaborative.extract_factors"):
+            scorer = SVDScorer.from_surprise(model)
+        _scorer_cache[model] = scorer
+    else:
+        metrics.count("cache_hits_total", cache="svd_scorer")
+    return scorer
+
+
+def _catalog_inner_ids(scorer, catalog):
+    """Inner id của scorer cho catalog.unique_rows, tính một lần cho mỗi cặp (mô hình, catalog)."""
+    per_catalog = _catalog_inner_cache.setdefault(scorer, weakref.WeakKeyDictionary())
+    inner = per_catalog.get(catalog)
+    if inner is None:
+        inner = per_catalog[catalog] = scorer.inner_item_ids(catalog.product_ids[catalog.unique_rows])
+    return inner
+
+
+def catalog_item_ids(product_ids):
+    """Các product_id của danh mục (bỏ mã trống, mỗi mã một lần, giữ thứ tự xuất hiện) — tập ứng viên của bảng top-N."""
+    return pd.unique(pd.Series(product_ids).dropna())
+
+
+def model_fingerprint(scorer, item_ids):
+    """Dấu vân tay của (mô hình SVD, danh mục sản phẩm) mà một UserTopNTable được tính từ đó."""
+    h = hashlib.sha1()
+    for arr in (scorer.pu, scorer.qi, scorer.bu, scorer.bi, np.asarray(item_ids)):
+        h.update(np.ascontiguousarray(arr).tobytes())
+    h.update(repr((scorer.global_mean, scorer.rating_scale, scorer.biased)).encode())
+    return h.hexdigest()
+
+
+class UserTopNTable:
+    """
+    Bảng gợi ý tính sẵn: user -> top-N (product_id, điểm dự đoán), tra cứu O(1).
+    Được tạo bởi build_user_recommendations.py.
+    """
+
+    def __init__(self, user_ids, top_ids, top_scores, user_fingerprints=None, model_fingerprint=""):
+        self.user_ids = np.asarray(user_ids)
+        self.top_ids = np.asarray(top_ids)
+        self.top_scores = np.asarray(top_scores)
+        self.user_fingerprints = (np.asarray(user_fingerprints, dtype=np.uint64)
+                                  if user_fingerprints is not None
+                                  else np.zeros(len(self.user_ids), dtype=np.uint64))
+        self.model_fingerprint = model_fingerprint
+        self.user_index = IdIndex(self.user_ids)
+
+    def __contains__(self, user_id):
+        return user_id in self.user_index
+
+    def __len__(self):
+        return len(self.user_ids)
+
+    def lookup(self, user_id):
+        """(product_ids, scores) đã sắp giảm dần của user, hoặc None nếu user không có trong bảng."""
+        row = self.user_index.get(user_id)
+        if row < 0:
+            return None
+        valid = self.top_ids[row] >= 0  # -1 = ô trống (user có ít ứng viên hơn N)
+        return self.top_ids[row][valid], self.top_scores[row][valid]
+
+    def matches(self, model, catalog):
+        """True nếu bảng được tính từ đúng mô hình SVD và danh mục sản phẩm này."""
+        item_ids = catalog_item_ids(catalog.product_ids)
+        return self.model_fingerprint == model_fingerprint(get_svd_scorer(model), item_ids)
+
+    def save(self, path):
+        tmp_path = path + ".tmp.npz"
+        np.savez(
+            tmp_path,
+            user_ids=self.user_ids,
+            top_ids=self.top_ids,
+            top_scores=self.top_scores,
+            user_fingerprints=self.user_fingerprints,
+            model_fingerprint=np.array(self.model_fingerprint),
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(
+                user_ids=data["user_ids"],
+                top_ids=data["top_ids"],
+                top_scores=data["top_scores"],
+                user_fingerprints=data["user_fingerprints"],
+                model_fingerprint=str(data["model_fingerprint"]),
+            )
+
+
+def _displayable(catalog, rows, scores):
+    """Loại sản phẩm không hợp lệ (giá = 0 hoặc mô tả trống) — chỉ xét các dòng kết quả."""
+    keep = np.ones(len(rows), dtype=bool)
+    if "price" in catalog.columns:
+        keep &= catalog.column("price")[rows] > 0
+    if "description" in catalog.columns:
+        keep &= pd.notnull(catalog.column("description")[rows])
+    return rows[keep], scores[keep]
+
+
+def top_n_rows(user_id, model, catalog, ratings, n=5):
+    """
+    Top-n sản phẩm user chưa đánh giá theo điểm dự đoán SVD.
+    ratings: InteractionIndex (nên dùng) hoặc DataFrame đánh giá.
+    Trả về (dòng trong catalog, điểm dự đoán) giảm dần, đã loại sản phẩm không hợp lệ.
+    """
+    # Các sản phẩm mà user đã đánh giá
+    with metrics.timer("collaborative.rated_filter"):
+        rated = rated_products(ratings, user_id)
+
+    # Chấm điểm toàn bộ sản phẩm (mỗi mã một lần) trong một lần (vector hóa)
+    scorer = get_svd_scorer(model)
+    with metrics.timer("collaborative.score"):
+        candidates = catalog.unique_rows
+        rated_rows = catalog.rows(rated)
+        excluded = np.searchsorted(candidates, rated_rows[rated_rows >= 0])
+        top, scores = scorer.top_n_positions(user_id, _catalog_inner_ids(scorer, catalog), n=n, exclude=excluded)
+    return _displayable(catalog, candidates[top], scores)
+
+
+def usable_user_topn(table, model, catalog):
+    """
+    Gọi khi nạp bảng: trả về table nếu nó được tính từ đúng mô hình SVD và danh mục đang phục vụ,
+    ngược lại None (mô hình / danh mục đã đổi sau lần chạy build_user_recommendations.py) để mọi user
+    được chấm điểm trực tiếp bằng top_n_rows thay vì nhận gợi ý của mô hình cũ.
+    """
+    if table is None:
+        return None
+    if not table.matches(model, catalog):
+        metrics.count("user_topn_stale_total")
+        return None
+    return table
+
+
+def precomputed_rows(user_id, table, catalog, n=5, ratings=None):
+    """
+    Gợi ý tính sẵn của user từ UserTopNTable (không chấm điểm lại): (dòng trong catalog, điểm) hoặc
+    None nếu user chưa có trong bảng để nơi gọi dùng top_n_rows thay thế.
+    ratings: InteractionIndex hiện tại — loại các sản phẩm user đã đánh giá sau lần tính bảng;
+    nếu sau khi loại không còn đủ n gợi ý trong khi bảng có thể đã cắt bớt ứng viên, cũng trả về None.
+    """
+    found = table.lookup(user_id) if table is not None else None
+    if found is None:
+        metrics.count("cache_misses_total", cache="user_topn")
+        return None
+    top_ids, top_scores = found
+    truncated = len(top_ids) == table.top_ids.shape[1]
+    if ratings is not None:
+        keep = ~np.isin(top_ids, rated_products(ratings, user_id))
+        top_ids, top_scores = top_ids[keep], np.asarray(top_scores)[keep]
+    rows = catalog.rows(top_ids)
+    known = rows >= 0
+    rows, scores = _displayable(catalog, rows[known], np.asarray(top_scores)[known])
+    if len(rows) < n and truncated:
+        metrics.count("cache_misses_total", cache="user_topn")
+        return None
+    metrics.count("cache_hits_total", cache="user_topn")
+    return rows[:n], scores[:n]
+
+
+def _format_recommendations(catalog, rows, scores):
+    """Bảng hiển thị (nhãn tiếng Việt, giữ cả ảnh) cho các dòng kết quả."""
+    return to_display(catalog.take(rows, prediction=scores))
+
+
 def get_top_n_recommendations(user_id, model, product_df, ratings_df, n=5):
     """
     Trả về top-n sản phẩm được gợi ý cho user_id sử dụng collaborative filtering (Surprise).
+    product_df: Catalog (nên dựng một lần) hoặc DataFrame sản phẩm.
+    ratings_df: InteractionIndex (nên dùng) hoặc DataFrame đánh giá.
+    """
+    catalog = as_catalog(product_df)
+    rows, scores = top_n_rows(user_id, model, catalog, ratings_df, n=n)
+    with metrics.timer("collaborative.format"):
+        return _format_recommendations(catalog, rows, scores)
+
+
+def get_precomputed_recommendations(user_id, table, product_df, n=5, ratings_df=None):
+    """
+    Đọc gợi ý tính sẵn của user từ UserTopNTable (không chấm điểm lại).
+    ratings_df: InteractionIndex hiện tại, để loại sản phẩm user đã đánh giá sau lần tính bảng.
+    Trả về None nếu user chưa có trong bảng để trang gọi get_top_n_recommendations thay thế.
     """
-    # Lọc các sản phẩm mà user đã đánh giá
-    rated_products = ratings_df[ratings_df['user_id'] == int(user_id)]['product_id'].unique()
-    unrated_products = product_df[~product_df['product_id'].isin(rated_products)].copy()
-
-    # Dự đoán rating cho từng sản phẩm chưa đánh giá
-    predictions = []
-    for pid in unrated_products['product_id']:
-        try:
-            pred = model.predict(str(user_id), str(pid))
-            predictions.append((pid, pred.est))
-        except:
-            continue
-
-    # Sắp xếp theo rating dự đoán giảm dần
-    top_predictions = sorted(predictions, key=lambda x: x[1], reverse=True)[:n]
-    top_ids = [pid for pid, _ in top_predictions]
-    score_dict = dict(top_predictions)
-
-    # Lấy thông tin sản phẩm tương ứng và giữ cả ảnh
-    result_df = product_df[product_df['product_id'].isin(top_ids)].copy()
-    result_df['Dự đoán'] = result_df['product_id'].map(score_dict)
-
-    # Chuyển đổi cột thành tiếng Việt nếu chưa có
-    rename_cols = {
-        'product_id': 'Mã SP',
-        'product_name': 'Tên sản phẩm',
-        'sub_category': 'Loại sản phẩm',
-        'price': 'Giá',
-        'rating': 'Đánh giá',
-        'description': 'Mô tả',
-        'image': 'image'  # giữ nguyên không đổi tên
-    }
-    result_df.rename(columns={k: v for k, v in rename_cols.items() if k in result_df.columns}, inplace=True)
-
-    # Loại bỏ sản phẩm không hợp lệ (giá = 0 hoặc mô tả trống)
-    result_df = result_df[(result_df['Giá'] > 0) & (result_df['Mô tả'].notnull())]
-
-    # Chỉ giữ các cột cần thiết
-    final_cols = ['Mã SP', 'Tên sản phẩm', 'Loại sản phẩm', 'Giá', 'Đánh giá', 'Mô tả', 'image', 'Dự đoán']
-    result_df = result_df[[col for col in final_cols if col in result_df.columns]]
-
-    return result_df.reset_index(drop=True)
\ No newline at end of file
+    catalog = as_catalog(product_df)
+    found = precomputed_rows(user_id, table, catalog, n=n, ratings=ratings_df)
+    if found is None:
+        return None
+    with metrics.timer("collaborative.format"):
+        return _format_recommendations(catalog, *found)
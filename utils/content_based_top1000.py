@@ -1,80 +1,277 @@
-# utils/content_based_top1000.py
-import pandas as pd
-from sklearn.metrics.pairwise import cosine_similarity
+import numpy as np
+from scipy import sparse
+from sklearn.preprocessing import normalize
 
-def search_and_recommend_top10(model_dict, keyword, top_k=10):
-    product_df = model_dict["product_df"]
-    vectorizer = model_dict["tfidf_vectorizer"]
-    cosine_sim = model_dict["cosine_similarity"]
-
-    # Vector hóa từ khóa và tính similarity
-    keyword_vector = vectorizer.transform([keyword])
-    similarities = cosine_similarity(keyword_vector, vectorizer.transform(product_df['combined_text'])).flatten()
-
-    # Lấy top-k sản phẩm có similarity cao nhất
-    top_indices = similarities.argsort()[::-1][:top_k * 5]
-    top_similarities = similarities[top_indices]
-
-    result = product_df.iloc[top_indices].copy()
-    result['similarity'] = top_similarities
-    result = result[result['similarity'] > 0]
-
-    if "possibly_female" in result.columns:
-        result = result[result["possibly_female"] == False]
-
-    # Xử lý mô tả ngắn an toàn
-    result["short_description"] = result["description"].fillna("").astype(str).str.slice(0, 200)
-
-    # Đổi tên cột để hiển thị tiếng Việt
-    rename_cols = {
-        "product_id": "Mã SP",
-        "product_name": "Tên sản phẩm",
-        "sub_category": "Loại sản phẩm",
-        "price": "Giá",
-        "rating": "Đánh giá",
-        "short_description": "Mô tả",
-        "similarity": "Độ tương đồng"
+from utils import metrics
+from utils.ann_index import IVFIndex
+from utils.catalog import Catalog, to_display
+from utils.model_store import load_arrays, load_meta, save_arrays, save_meta
+
+BACKENDS = ("exact", "ann")
+NEIGHBOR_CHUNK_CELLS = 50_000_000  # Số ô tối đa của một khối similarity (chunk x N) trong bộ nhớ
+
+
+def _get_tfidf_matrix(model_dict):
+    """
+    Ma trận TF-IDF của sản phẩm (CSR, mỗi dòng đã chuẩn hóa L2).
+    Dùng bản lưu sẵn trong mô hình; mô hình cũ thì vector hóa một lần rồi giữ trong bộ nhớ.
+    """
+    if "tfidf_matrix" not in model_dict:
+        metrics.count("cache_misses_total", cache="tfidf_matrix")
+        with metrics.timer("content.build_tfidf_matrix"):
+            vectorizer = model_dict["tfidf_vectorizer"]
+            matrix = vectorizer.transform(model_dict["product_df"]["combined_text"])
+            model_dict["tfidf_matrix"] = normalize(matrix, norm="l2", copy=False).tocsr()
+    else:
+        metrics.count("cache_hits_total", cache="tfidf_matrix")
+    return model_dict["tfidf_matrix"]
+
+
+def save_model_dir(model_dict, version_dir):
+    """
+    Lưu mô hình dạng thư mục phiên bản: các mảng lớn (láng giềng, bộ đệm CSR của TF-IDF)
+    thành file .npy mở được bằng mmap; DataFrame và vectorizer vào meta.pkl.
+    """
+    matrix = _get_tfidf_matrix(model_dict).tocsr()
+    matrix.sort_indices()
+    arrays = {
+        "tfidf_data": matrix.data,
+        "tfidf_indices": matrix.indices,
+        "tfidf_indptr": matrix.indptr,
+        "tfidf_shape": np.array(matrix.shape, dtype=np.int64),
+    }
+    for key in ("neighbor_indices", "neighbor_scores", "exclude_mask"):
+        if key in model_dict:
+            arrays[key] = model_dict[key]
+    meta = {
+        "product_df": model_dict["product_df"],
+        "tfidf_vectorizer": model_dict["tfidf_vectorizer"],
     }
-    result.rename(columns=rename_cols, inplace=True)
+    for key in ("exclude_keywords", "exclude_columns"):
+        if key in model_dict:
+            meta[key] = model_dict[key]
+    if "ann_index" in model_dict:
+        arrays.update(model_dict["ann_index"].arrays("ann"))
+        meta["ann_n_probe"] = model_dict["ann_index"].n_probe
+        meta["ann_rerank_factor"] = model_dict["ann_index"].rerank_factor
+        meta["ann_recall_at_10"] = model_dict.get("ann_recall_at_10")
+    save_arrays(version_dir, arrays)
+    save_meta(version_dir, meta)
 
-    return result[["Mã SP", "Tên sản phẩm", "Loại sản phẩm", "Giá", "Đánh giá", "Mô tả", "Độ tương đồng"]].head(top_k)
 
+def load_model_dir(version_dir, mmap_mode="r"):
+    """Mở mô hình từ thư mục phiên bản; các mảng lớn được mmap (chỉ đọc, dùng chung giữa các worker)."""
+    arrays = load_arrays(version_dir, mmap_mode=mmap_mode)
+    model_dict = dict(load_meta(version_dir))
 
-def recommend_by_product_id_top10(model_dict, product_id, top_k=10):
-    product_df = model_dict["product_df"]
-    cosine_sim = model_dict["cosine_similarity"]
+    matrix = sparse.csr_matrix(
+        (arrays["tfidf_data"], arrays["tfidf_indices"], arrays["tfidf_indptr"]),
+        shape=tuple(int(x) for x in arrays["tfidf_shape"]),
+        copy=False,
+    )
+    matrix.has_sorted_indices = True  # đã sắp lúc lưu; tránh scipy sắp lại tại chỗ trên mảng chỉ đọc
+    model_dict["tfidf_matrix"] = matrix
+    for key in ("neighbor_indices", "neighbor_scores", "exclude_mask"):
+        if key in arrays:
+            model_dict[key] = arrays[key]
+    if "ann_vectors" in arrays:
+        model_dict["ann_index"] = IVFIndex.from_arrays(
+            arrays, "ann",
+            n_probe=model_dict.pop("ann_n_probe", 8),
+            rerank_factor=model_dict.pop("ann_rerank_factor", 10),
+        )
+    return model_dict
 
-    if product_id not in product_df['product_id'].values:
-        raise ValueError("❌ Mã sản phẩm không tồn tại trong dữ liệu.")
 
-    index = product_df[product_df['product_id'] == product_id].index.values[0]
+def _get_exclude_mask(model_dict):
+    """
+    Mảng bool (một phần tử / sản phẩm): True = không được gợi ý.
+    Mô hình cũ không có mask thì suy ra từ cột possibly_female (nếu có) một lần rồi giữ lại.
+    """
+    if "exclude_mask" not in model_dict:
+        product_df = model_dict["product_df"]
+        if "possibly_female" in product_df.columns:
+            model_dict["exclude_mask"] = product_df["possibly_female"].fillna(False).to_numpy(dtype=bool)
+        else:
+            model_dict["exclude_mask"] = np.zeros(len(product_df), dtype=bool)
+    return model_dict["exclude_mask"]
 
-    if index >= cosine_sim.shape[0]:
-        raise ValueError("❌ Index vượt quá phạm vi của ma trận cosine_similarity.")
 
-    scores = list(enumerate(cosine_sim[index]))
-    scores = sorted(scores, key=lambda x: x[1], reverse=True)
-    top_indexes = [i[0] for i in scores if i[0] != index][:top_k * 5]
+def apply_keyword_filter(model_dict, keyword_filter):
+    """Tính lại exclude_mask của mô hình theo luật từ khóa mới (không cần vector hóa / tính láng giềng lại)."""
+    model_dict["exclude_mask"] = keyword_filter.mask(model_dict["product_df"])
+    model_dict["exclude_keywords"] = keyword_filter.keywords
+    model_dict["exclude_columns"] = keyword_filter.columns
+    return model_dict["exclude_mask"]
 
-    result = product_df.iloc[top_indexes].copy()
-    result["similarity"] = [scores[i][1] for i in range(1, len(top_indexes)+1)]
 
-    result = result[result["similarity"] > 0]
+def compute_top_k_neighbors(tfidf_matrix, k, chunk_cells=NEIGHBOR_CHUNK_CELLS, exclude_mask=None):
+    """
+    Tính top-k láng giềng (cosine) của từng sản phẩm theo từng khối dòng,
+    không bao giờ tạo ma trận N x N đầy đủ.
+    exclude_mask: sản phẩm bị loại không được làm láng giềng của sản phẩm nào (điểm -inf),
+    để mỗi dòng vẫn đủ k ứng viên hợp lệ; nếu không đủ thì các ô cuối có điểm -inf.
+    Trả về (indices int32, scores float32) kích thước N x k, đã sắp xếp giảm dần.
+    """
+    n = tfidf_matrix.shape[0]
+    k = min(k, n - 1)
+    indices = np.zeros((n, max(k, 0)), dtype=np.int32)
+    scores = np.zeros((n, max(k, 0)), dtype=np.float32)
+    if k <= 0:
+        return indices, scores
+    excluded = np.flatnonzero(exclude_mask) if exclude_mask is not None else np.empty(0, dtype=np.int64)
 
-    if "possibly_female" in result.columns:
-        result = result[result["possibly_female"] == False]
+    # Các dòng TF-IDF đã được chuẩn hóa L2 nên tích vô hướng = cosine similarity
+    matrix_t = tfidf_matrix.T.tocsc()
+    chunk_size = max(1, chunk_cells // n)
+    for start in range(0, n, chunk_size):
+        end = min(start + chunk_size, n)
+        block = (tfidf_matrix[start:end] @ matrix_t).toarray().astype(np.float32, copy=False)
+        rows = np.arange(end - start)
+        block[rows, rows + start] = -np.inf  # loại chính sản phẩm đó
+        block[:, excluded] = -np.inf
 
-    result["short_description"] = result["description"].fillna("").astype(str).str.slice(0, 200)
+        top = np.argpartition(block, -k, axis=1)[:, -k:]
+        top_scores = np.take_along_axis(block, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind="stable")
+        indices[start:end] = np.take_along_axis(top, order, axis=1)
+        scores[start:end] = np.take_along_axis(top_scores, order, axis=1)
+
+    return indices, scores
+
+
+def recompute_neighbors(model_dict, chunk_cells=NEIGHBOR_CHUNK_CELLS):
+    """Tính lại bảng láng giềng (giữ nguyên k) theo exclude_mask hiện tại của mô hình, không vector hóa lại."""
+    k = model_dict["neighbor_indices"].shape[1]
+    model_dict["neighbor_indices"], model_dict["neighbor_scores"] = compute_top_k_neighbors(
+        _get_tfidf_matrix(model_dict), k, chunk_cells=chunk_cells, exclude_mask=_get_exclude_mask(model_dict))
+    return model_dict["neighbor_indices"], model_dict["neighbor_scores"]
+
+
+def _top_k_indices(scores, k):
+    """Chỉ số của k điểm cao nhất (giảm dần) bằng argpartition thay vì sort toàn bộ."""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    top = np.argpartition(scores, len(scores) - k)[len(scores) - k:]
+    return top[np.argsort(-scores[top], kind="stable")]
+
+
+def _get_ann_index(model_dict, backend):
+    if backend not in BACKENDS:
+        raise ValueError(f"❌ backend phải là một trong {BACKENDS}.")
+    if backend == "ann":
+        if "ann_index" not in model_dict:
+            raise ValueError("❌ Mô hình chưa có chỉ mục ANN (build lại với BUILD_ANN = True).")
+        return model_dict["ann_index"]
+    return None
+
+
+def get_catalog(model_dict):
+    """Catalog (cột hiển thị + chỉ mục id -> dòng) của product_df, dựng một lần rồi giữ trong mô hình."""
+    if "catalog" not in model_dict:
+        model_dict["catalog"] = Catalog.from_df(model_dict["product_df"])
+    return model_dict["catalog"]
+
+
+def _select(top_indices, top_similarities, top_k, exclude_mask):
+    """Giữ ứng viên có similarity > 0 và không nằm trong exclude_mask, tối đa top_k (chỉ thao tác trên mảng)."""
+    top_indices = np.asarray(top_indices, dtype=np.int64)
+    top_similarities = np.asarray(top_similarities)
+    keep = (top_similarities > 0) & ~exclude_mask[top_indices]
+    return top_indices[keep][:top_k], top_similarities[keep][:top_k]
+
+
+def _format_results(model_dict, rows, similarities):
+    """Bảng hiển thị (nhãn tiếng Việt, mô tả ngắn) cho các dòng kết quả."""
+    result = get_catalog(model_dict).take(
+        rows, columns=["product_id", "product_name", "sub_category", "price", "rating", "description"],
+        similarity=similarities,
+    )
+    return to_display(result, short_description=True)
+
+
+def search_rows(model_dict, keyword, top_k=10, backend="exact"):
+    """Tìm sản phẩm theo từ khóa. Trả về (dòng trong product_df, similarity) giảm dần, tối đa top_k."""
+    vectorizer = model_dict["tfidf_vectorizer"]
+    ann_index = _get_ann_index(model_dict, backend)
+    exclude_mask = _get_exclude_mask(model_dict)
+
+    # Vector hóa từ khóa (chuẩn hóa L2)
+    with metrics.timer("content.vectorize"):
+        keyword_vector = normalize(vectorizer.transform([keyword]), norm="l2")
+
+    if ann_index is not None:
+        # Xấp xỉ: chỉ quét các cụm IVF gần truy vấn nhất
+        if keyword_vector.nnz == 0:
+            top_indices, top_similarities = np.empty(0, dtype=np.int64), np.empty(0)
+        else:
+            tfidf_matrix = _get_tfidf_matrix(model_dict)
+            with metrics.timer("content.ann_search"):
+                top_indices, top_similarities = ann_index.search(
+                    ann_index.transform(keyword_vector), top_k * 5, exclude_mask=exclude_mask,
+                    tfidf_matrix=tfidf_matrix, tfidf_query=keyword_vector,
+                )
+    else:
+        # Chính xác: similarity với toàn bộ sản phẩm bằng một phép nhân thưa
+        tfidf_matrix = _get_tfidf_matrix(model_dict)
+        with metrics.timer("content.similarity"):
+            similarities = (tfidf_matrix @ keyword_vector.T).toarray().ravel()
+            similarities[exclude_mask] = 0  # sản phẩm bị loại không chiếm chỗ trong top-k
+        with metrics.timer("content.sort"):
+            top_indices = _top_k_indices(similarities, top_k * 5)
+            top_similarities = similarities[top_indices]
+
+    return _select(top_indices, top_similarities, top_k, exclude_mask)
+
+
+def similar_rows(model_dict, product_id, top_k=10, backend="exact"):
+    """Sản phẩm tương tự product_id. Trả về (dòng trong product_df, similarity) giảm dần, tối đa top_k."""
+    ann_index = _get_ann_index(model_dict, backend)
+    exclude_mask = _get_exclude_mask(model_dict)
+
+    index = get_catalog(model_dict).row(product_id)
+    # Sản phẩm bị loại không được gợi ý, cũng không dùng làm sản phẩm gốc (như khi nó không có trong mô hình)
+    if index < 0 or exclude_mask[index]:
+        raise ValueError("❌ Mã sản phẩm không tồn tại trong dữ liệu.")
+
+    with metrics.timer("content.neighbors"):
+        if ann_index is not None:
+            # Xấp xỉ: tìm trên chỉ mục IVF bằng vector giảm chiều của chính sản phẩm
+            tfidf_matrix = _get_tfidf_matrix(model_dict)
+            top_indexes, top_scores = ann_index.search(
+                ann_index.vectors[index], top_k * 5, exclude=index, exclude_mask=exclude_mask,
+                tfidf_matrix=tfidf_matrix, tfidf_query=tfidf_matrix[index],
+            )
+        elif "neighbor_indices" in model_dict:
+            # Mô hình mới: đọc thẳng top-K láng giềng đã tính sẵn lúc build
+            neighbor_indices = model_dict["neighbor_indices"]
+            if index >= neighbor_indices.shape[0]:
+                raise ValueError("❌ Index vượt quá phạm vi của bảng láng giềng.")
+            top_indexes = neighbor_indices[index][:top_k * 5]
+            top_scores = model_dict["neighbor_scores"][index][:top_k * 5]
+        else:
+            # Mô hình cũ: ma trận cosine_similarity đầy đủ, chọn ứng viên bằng argpartition
+            cosine_sim = model_dict["cosine_similarity"]
+            if index >= cosine_sim.shape[0]:
+                raise ValueError("❌ Index vượt quá phạm vi của ma trận cosine_similarity.")
+
+            scores = np.asarray(cosine_sim[index], dtype=np.float64).ravel().copy()
+            scores[index] = -np.inf  # loại chính sản phẩm đang xét
+            scores[exclude_mask] = -np.inf
+            top_indexes = _top_k_indices(scores, min(top_k * 5, len(scores) - 1))
+            top_scores = scores[top_indexes]
+
+    return _select(top_indexes, top_scores, top_k, exclude_mask)
+
+
+def search_and_recommend_top10(model_dict, keyword, top_k=10, backend="exact"):
+    rows, similarities = search_rows(model_dict, keyword, top_k=top_k, backend=backend)
+    with metrics.timer("content.format"):
+        return _format_results(model_dict, rows, similarities)
 
-    rename_cols = {
-        "product_id": "Mã SP",
-        "product_name": "Tên sản phẩm",
-        "sub_category": "Loại sản phẩm",
-        "price": "Giá",
-        "rating": "Đánh giá",
-        "short_description": "Mô tả",
-        "similarity": "Độ tương đồng"
-    }
-    result.rename(columns=rename_cols, inplace=True)
 
-    return result[["Mã SP", "Tên sản phẩm", "Loại sản phẩm", "Giá", "Đánh giá", "Mô tả", "Độ tương đồng"]].head(top_k)
\ No newline at end of file
+def recommend_by_product_id_top10(model_dict, product_id, top_k=10, backend="exact"):
+    rows, similarities = similar_rows(model_dict, product_id, top_k=top_k, backend=backend)
+    with metrics.timer("content.format"):
+        return _format_results(model_dict, rows, similarities)
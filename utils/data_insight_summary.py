@@ -0,0 +1,143 @@
+# utils/data_insight_summary.py
+import hashlib
+import os
+
+import joblib
+import numpy as np
+
+from utils.data_store import (
+    PRODUCTS_CSV, RATINGS_CSV, PRODUCTS_PARQUET, RATINGS_PARQUET,
+    PRODUCT_INSIGHT_COLUMNS, RATING_COLUMNS, read_products, read_ratings,
+)
+from utils.interactions import InteractionIndex
+
+SUMMARY_PATH = "models/data_insight_summary.pkl"
+SAMPLE_PER_CATEGORY = 2000  # Số dòng mẫu tối đa mỗi nhóm cho violin/scatter
+
+
+def dataset_fingerprint():
+    """Dấu vân tay của dữ liệu nguồn (đường dẫn, kích thước, thời điểm sửa) để nhận biết dữ liệu đã đổi."""
+    h = hashlib.sha1()
+    for path in (PRODUCTS_PARQUET, RATINGS_PARQUET, PRODUCTS_CSV, RATINGS_CSV):
+        if os.path.exists(path):
+            stat = os.stat(path)
+            h.update(f"{path}:{stat.st_size}:{int(stat.st_mtime)};".encode())
+    return h.hexdigest()[:16]
+
+
+def _box_stats(values):
+    """Thống kê boxplot (giống matplotlib: râu 1.5 IQR) để vẽ bằng ax.bxp mà không cần dữ liệu gốc."""
+    values = values.dropna().to_numpy(dtype=np.float64)
+    if len(values) == 0:
+        return None
+    q1, med, q3 = np.percentile(values, [25, 50, 75])
+    iqr = q3 - q1
+    low = values[values >= q1 - 1.5 * iqr]
+    high = values[values <= q3 + 1.5 * iqr]
+    return {
+        "q1": q1, "med": med, "q3": q3,
+        "whislo": low.min() if len(low) else q1,
+        "whishi": high.max() if len(high) else q3,
+        "fliers": [],
+    }
+
+
+def _top_counts(series, name, n=10):
+    top = series.value_counts().head(n).reset_index()
+    top.columns = [name, "count"]
+    return top
+
+
+def compute_summary(products_clean, rating_clean, interactions=None):
+    """
+    Tính sẵn toàn bộ số liệu mà trang Khám phá dữ liệu hiển thị.
+    interactions: InteractionIndex của bảng đánh giá (số đánh giá theo user / sản phẩm lấy từ bậc trong chỉ mục).
+    """
+    if interactions is None:
+        interactions = InteractionIndex.from_ratings(rating_clean)
+    summary = {
+        "products_head": products_clean.head(10),
+        "ratings_head": rating_clean.head(10),
+        "num_products": products_clean['product_id'].nunique(),
+        "num_users": interactions.n_users,
+        "num_ratings": rating_clean.shape[0],
+    }
+
+    # User đánh giá nhiều nhất
+    reviewer_counts = interactions.user_degree()
+    summary["top_reviewer"] = interactions.user_ids[reviewer_counts.argmax()].item()
+    summary["top_reviewer_count"] = int(reviewer_counts.max())
+
+    # User chi tiêu nhiều nhất
+    price_by_product = products_clean.drop_duplicates('product_id').set_index('product_id')['price']
+    user_spend = rating_clean['product_id'].map(price_by_product).groupby(rating_clean['user_id']).sum()
+    summary["top_spender"] = user_spend.idxmax()
+    summary["top_spend_amount"] = user_spend.max()
+
+    # User rating 5 sao nhiều nhất
+    five_star_users = rating_clean[rating_clean['rating'] == 5]['user_id'].value_counts()
+    summary["top_five_star_user"] = five_star_users.idxmax()
+    summary["top_five_star_count"] = five_star_users.max()
+
+    # Sản phẩm nhiều / ít đánh giá nhất
+    name_by_product = products_clean.drop_duplicates('product_id').set_index('product_id')['product_name']
+    product_counts = interactions.item_degree()
+    summary["top_product_name"] = str(name_by_product.get(interactions.item_ids[product_counts.argmax()].item(), ""))
+    summary["least_product_name"] = str(name_by_product.get(interactions.item_ids[product_counts.argmin()].item(), ""))
+
+    # Các bảng tổng hợp cho biểu đồ
+    summary["top_subcat"] = products_clean['sub_category'].value_counts().head(10)
+    summary["top_names"] = products_clean['product_name'].value_counts().head(20)
+    summary["avg_price"] = products_clean.groupby('sub_category', observed=True)['price'].mean().sort_values()
+    summary["avg_rating"] = products_clean.groupby('sub_category', observed=True)['rating'].mean().sort_values()
+    summary["rating_counts"] = rating_clean['rating'].value_counts()
+    summary["corr"] = products_clean[['price', 'rating', 'desc_len']].corr()
+
+    # Boxplot rating theo nhóm: chỉ lưu thống kê
+    summary["rating_box_stats"] = {
+        str(cat): stats
+        for cat, group in products_clean.groupby('sub_category', observed=True)['rating']
+        if (stats := _box_stats(group)) is not None
+    }
+
+    # Histogram độ dài mô tả
+    counts, edges = np.histogram(products_clean['desc_len'].dropna(), bins=50)
+    summary["desc_len_hist"] = (counts, edges)
+
+    # Mẫu phân tầng theo nhóm cho violin plot và scatter plot
+    summary["price_rating_sample"] = (
+        products_clean[['sub_category', 'price', 'rating']]
+        .sample(frac=1, random_state=42)
+        .groupby('sub_category', observed=True)
+        .head(SAMPLE_PER_CATEGORY)
+        .reset_index(drop=True)
+    )
+
+    # Sản phẩm / nhóm nhận nhiều đánh giá 5 sao và 1 sao
+    five_star = rating_clean[rating_clean['rating'] == 5]['product_id']
+    one_star = rating_clean[rating_clean['rating'] == 1]['product_id']
+    subcat_by_product = products_clean.drop_duplicates('product_id').set_index('product_id')['sub_category']
+    summary["top_five_star_products"] = _top_counts(five_star.map(name_by_product), 'product_name')
+    summary["top_five_star_subcats"] = _top_counts(five_star.map(subcat_by_product).dropna().astype(str), 'sub_category')
+    summary["top_one_star_products"] = _top_counts(one_star.map(name_by_product), 'product_name')
+
+    return summary
+
+
+def build_summary():
+    fingerprint = dataset_fingerprint()
+    # Chỉ mục dựng từ đúng bảng đánh giá vừa đọc (không dùng chỉ mục đã công bố, có thể là phiên bản khác)
+    summary = compute_summary(read_products(PRODUCT_INSIGHT_COLUMNS), read_ratings(RATING_COLUMNS))
+    summary["fingerprint"] = fingerprint
+    return summary
+
+
+def load_summary():
+    """
+    Đọc bản tổng hợp đã tính sẵn; nếu chưa có hoặc dữ liệu nguồn đã đổi thì tính lại từ dữ liệu.
+    """
+    if os.path.exists(SUMMARY_PATH):
+        summary = joblib.load(SUMMARY_PATH)
+        if summary.get("fingerprint") == dataset_fingerprint():
+            return summary
+    return build_summary()
@@ -0,0 +1,212 @@
+# utils/data_store.py
+import hashlib
+import io
+import os
+
+import numpy as np
+import pandas as pd
+
+from utils import metrics
+
+# ===== Đường dẫn dữ liệu =====
+PRODUCTS_CSV = "data/Products_ThoiTrangNam_clean.csv"
+RATINGS_CSV = "data/Products_ThoiTrangNam_rating_clean.csv"
+PRODUCTS_PARQUET = "data/products.parquet"
+RATINGS_PARQUET = "data/ratings.parquet"
+
+# ===== Nhóm cột theo từng nơi sử dụng =====
+PRODUCT_DISPLAY_COLUMNS = ["product_id", "product_name", "sub_category", "price", "rating", "description", "image"]
+PRODUCT_INSIGHT_COLUMNS = ["product_id", "product_name", "sub_category", "price", "rating", "desc_len"]
+PRODUCT_MODEL_COLUMNS = PRODUCT_DISPLAY_COLUMNS + ["clean_description"]
+RATING_COLUMNS = ["product_id", "user_id", "user", "rating"]
+RATING_TRAIN_COLUMNS = ["user_id", "product_id", "rating"]
+
+
+def _to_int_id(series):
+    """Ép cột id về số nguyên nhỏ nhất đủ chứa (int32 nếu vừa, ngược lại int64)."""
+    values = pd.to_numeric(series, errors="coerce").astype("int64")
+    if len(values) and values.min() >= np.iinfo(np.int32).min and values.max() <= np.iinfo(np.int32).max:
+        return values.astype("int32")
+    return values
+
+
+def type_products(df):
+    """Chuẩn hóa kiểu dữ liệu bảng sản phẩm: id nguyên, sub_category category, giá/rating float32."""
+    df = df.copy()
+    if "product_id" in df.columns:
+        df = df[pd.to_numeric(df["product_id"], errors="coerce").notnull()]
+        df["product_id"] = _to_int_id(df["product_id"])
+    for col in ("category", "sub_category"):
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+    for col in ("price", "rating"):
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype("float32")
+    if "desc_len" in df.columns:
+        df["desc_len"] = pd.to_numeric(df["desc_len"], errors="coerce").fillna(0).astype("int32")
+    return df.reset_index(drop=True)
+
+
+def type_ratings(df):
+    """Chuẩn hóa kiểu dữ liệu bảng đánh giá: id nguyên, rating float32."""
+    df = df.copy()
+    for col in ("product_id", "user_id"):
+        if col in df.columns:
+            df = df[pd.to_numeric(df[col], errors="coerce").notnull()]
+            df[col] = _to_int_id(df[col])
+    if "rating" in df.columns:
+        df["rating"] = pd.to_numeric(df["rating"], errors="coerce").astype("float32")
+    return df.reset_index(drop=True)
+
+
+@metrics.timed("data.read_products")
+def read_products(columns=None):
+    """
+    Đọc bảng sản phẩm, chỉ lấy các cột cần thiết.
+    Ưu tiên file Parquet (đã có kiểu dữ liệu), nếu chưa chuyển đổi thì đọc CSV.
+    """
+    if os.path.exists(PRODUCTS_PARQUET):
+        return pd.read_parquet(PRODUCTS_PARQUET, columns=columns)
+    return type_products(pd.read_csv(PRODUCTS_CSV, usecols=columns))
+
+
+@metrics.timed("data.read_ratings")
+def read_ratings(columns=None):
+    """
+    Đọc bảng đánh giá, chỉ lấy các cột cần thiết.
+    Ưu tiên file Parquet (đã có kiểu dữ liệu), nếu chưa chuyển đổi thì đọc CSV (tab).
+    """
+    if os.path.exists(RATINGS_PARQUET):
+        return pd.read_parquet(RATINGS_PARQUET, columns=columns)
+    return type_ratings(pd.read_csv(RATINGS_CSV, sep="\t", usecols=columns))
+
+
+def iter_products(columns=None, chunksize=50_000):
+    """
+    Đọc bảng sản phẩm theo từng khối chunksize dòng (đúng thứ tự trong file), mỗi khối đã chuẩn hóa kiểu.
+    Dùng khi build mô hình trên toàn bộ danh mục mà không giữ cả file trong bộ nhớ.
+    """
+    if os.path.exists(PRODUCTS_PARQUET):
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(PRODUCTS_PARQUET).iter_batches(batch_size=chunksize, columns=columns):
+            yield batch.to_pandas()
+        return
+    for chunk in pd.read_csv(PRODUCTS_CSV, usecols=columns, chunksize=chunksize):
+        yield type_products(chunk)
+
+
+# ===== Đọc tăng dần: chỉ phần được nối thêm vào file đánh giá =====
+# Vị trí trong file đánh giá: số byte (CSV, luôn ở đầu một dòng) hoặc số dòng (Parquet).
+# Vị trí 0 = dòng dữ liệu đầu tiên (bỏ qua header của CSV).
+TAIL_BLOCK = 1 << 16
+DIGEST_WINDOW_BYTES = 1 << 20  # Cửa sổ kiểm tra "file chỉ được nối thêm" (CSV)
+DIGEST_WINDOW_ROWS = 50_000  # Như trên, với Parquet
+
+
+def ratings_source():
+    """Đường dẫn file đánh giá đang dùng: Parquet nếu đã chuyển đổi, ngược lại CSV."""
+    return RATINGS_PARQUET if os.path.exists(RATINGS_PARQUET) else RATINGS_CSV
+
+
+def _csv_header_end(f):
+    f.seek(0)
+    f.readline()
+    return f.tell()
+
+
+def _csv_last_line_end(f, size):
+    """Vị trí ngay sau ký tự xuống dòng cuối cùng (bỏ dòng cuối đang được ghi dở)."""
+    end = size
+    while end > 0:
+        start = max(0, end - TAIL_BLOCK)
+        f.seek(start)
+        pos = f.read(end - start).rfind(b"\n")
+        if pos >= 0:
+            return start + pos + 1
+        end = start
+    return 0
+
+
+def ratings_end():
+    """Vị trí cuối hiện tại của file đánh giá (byte sau dòng hoàn chỉnh cuối cùng với CSV, số dòng với Parquet)."""
+    path = ratings_source()
+    if path == RATINGS_PARQUET:
+        import pyarrow.parquet as pq
+
+        return pq.ParquetFile(path).metadata.num_rows
+    with open(path, "rb") as f:
+        return max(_csv_last_line_end(f, os.fstat(f.fileno()).st_size), _csv_header_end(f))
+
+
+class _ByteRange(io.RawIOBase):
+    """Đọc file nhị phân từ vị trí hiện tại tới end (pandas đọc CSV từ đây như từ một file bình thường)."""
+
+    def __init__(self, f, end):
+        self._f = f
+        self._end = end
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        n = min(len(buffer), self._end - self._f.tell())
+        if n <= 0:
+            return 0
+        data = self._f.read(n)
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def _iter_parquet_rows(start, end, columns, chunksize):
+    """Các khối dòng [start, end) của Parquet, bỏ qua nguyên các row group nằm trước start."""
+    import pyarrow.parquet as pq
+
+    parquet = pq.ParquetFile(RATINGS_PARQUET)
+    offset = 0
+    for group in range(parquet.metadata.num_row_groups):
+        n_rows = parquet.metadata.row_group(group).num_rows
+        if offset + n_rows > start and offset < end:
+            table = parquet.read_row_group(group, columns=columns)
+            table = table.slice(max(start - offset, 0), min(end, offset + n_rows) - max(start, offset))
+            for batch in table.to_batches(max_chunksize=chunksize):
+                yield batch.to_pandas()
+        offset += n_rows
+
+
+def iter_ratings_range(start, end, columns=None, chunksize=1_000_000):
+    """
+    Đọc các dòng đánh giá trong [start, end) (vị trí như ratings_end) theo khối, mỗi khối đã chuẩn hóa kiểu.
+    Dùng để chỉ đọc phần mới được nối thêm kể từ lần build trước.
+    """
+    if ratings_source() == RATINGS_PARQUET:
+        yield from _iter_parquet_rows(start, end, columns, chunksize)
+        return
+    with open(RATINGS_CSV, "rb") as f:
+        header_end = _csv_header_end(f)
+        f.seek(0)
+        names = f.readline().decode("utf-8-sig").rstrip("\r\n").split("\t")
+        f.seek(max(start, header_end))
+        if f.tell() >= end:
+            return
+        reader = io.BufferedReader(_ByteRange(f, end))
+        for chunk in pd.read_csv(reader, sep="\t", header=None, names=names, usecols=columns, chunksize=chunksize):
+            yield type_ratings(chunk)
+
+
+def ratings_digest(end):
+    """
+    sha1 của cửa sổ cuối cùng trước vị trí end (DIGEST_WINDOW_BYTES byte thô với CSV,
+    giá trị các cột huấn luyện của DIGEST_WINDOW_ROWS dòng với Parquet): đủ rẻ để kiểm tra lại
+    mỗi lần build thay vì băm cả phần đầu file.
+    """
+    h = hashlib.sha1()
+    if ratings_source() == RATINGS_PARQUET:
+        for chunk in _iter_parquet_rows(max(0, end - DIGEST_WINDOW_ROWS), end, RATING_TRAIN_COLUMNS, DIGEST_WINDOW_ROWS):
+            for col in RATING_TRAIN_COLUMNS:
+                h.update(np.ascontiguousarray(chunk[col].to_numpy()).tobytes())
+        return h.hexdigest()
+    with open(RATINGS_CSV, "rb") as f:
+        f.seek(max(0, end - DIGEST_WINDOW_BYTES))
+        h.update(f.read(end - f.tell()))
+    return h.hexdigest()
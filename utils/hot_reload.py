@@ -0,0 +1,115 @@
+# utils/hot_reload.py
+import itertools
+import threading
+import traceback
+
+from utils import metrics
+from utils.model_loader import model_versions
+
+RELOAD_INTERVAL = 10  # Số giây giữa hai lần đọc con trỏ CURRENT / phiên bản artifact trên đĩa
+
+# Số thứ tự snapshot, tăng dần trong cả tiến trình (kể cả khi HotReloader được tạo lại):
+# ResultCache dùng nó để phân biệt request còn dở trên snapshot cũ với một lần quay lại phiên bản cũ
+_generations = itertools.count(1)
+
+
+def unchanged(previous, versions, *names):
+    """True nếu snapshot trước đã nạp đúng phiên bản của mọi artifact names (dùng lại, không nạp lại)."""
+    return previous is not None and all(previous["versions"].get(name) == versions.get(name) for name in names)
+
+
+def warm_models(snapshot):
+    """
+    Chạy thử một truy vấn trên mô hình của snapshot mới (ở thread nền, trước khi đổi):
+    trang mmap của ma trận TF-IDF / nhân tố SVD và các bộ đệm dựng lười (Catalog, SVDScorer)
+    đã sẵn sàng nên request đầu tiên sau khi đổi không phải chờ.
+    """
+    from utils.collaborative import get_svd_scorer
+    from utils.content_based_top1000 import get_catalog, search_rows
+
+    catalog = get_catalog(snapshot["cb_model"])
+    search_rows(snapshot["cb_model"], "áo", top_k=10)
+    scorer = get_svd_scorer(snapshot["cf_model"])
+    if len(scorer.user_ids):
+        scorer.score(scorer.user_ids[0], scorer.inner_item_ids(catalog.product_ids))
+
+
+class HotReloader:
+    """
+    Giữ snapshot đang phục vụ (dict có khóa "versions") và một thread nền theo dõi phiên bản artifact trên đĩa.
+
+    Khi phiên bản đổi, load(versions, previous) nạp snapshot mới ngay trong thread nền (dùng lại phần
+    không đổi của previous), warm(snapshot) chạy thử, rồi current được gán sang snapshot mới. Phép gán là
+    nguyên tử nên mỗi request đọc current một lần sẽ thấy trọn bản cũ hoặc trọn bản mới, không bao giờ chờ nạp;
+    bản cũ được giải phóng khi request cuối cùng dùng nó kết thúc.
+    Nạp lỗi: giữ bản cũ và không thử lại đúng bộ phiên bản đó cho tới khi trên đĩa có phiên bản khác.
+    Mỗi snapshot được gán snapshot["generation"], lớn hơn mọi snapshot nạp trước nó.
+    """
+
+    def __init__(self, load, warm=None, versions=model_versions, interval=RELOAD_INTERVAL, name="models"):
+        self._load = load
+        self._warm = warm
+        self._versions = versions
+        self.interval = interval
+        self.name = name
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._failed_versions = None
+        self.last_error = None
+        # Lần nạp đầu tiên chạy đồng bộ: chưa có gì để phục vụ
+        self.current = self._build(self._versions(), None)
+
+    def _build(self, versions, previous):
+        with metrics.timer(f"reload.{self.name}"):
+            snapshot = self._load(versions, previous)
+            snapshot["generation"] = next(_generations)
+            if self._warm is not None:
+                self._warm(snapshot)
+        return snapshot
+
+    def check(self):
+        """Một lần kiểm tra phiên bản; nạp và đổi snapshot nếu có phiên bản mới. Trả về True nếu đã đổi."""
+        with self._lock:
+            versions = self._versions()
+            if versions == self.current["versions"]:
+                # Con trỏ đã quay về đúng bản đang phục vụ (vd. sau khi gỡ bản lỗi): không còn lỗi
+                self._failed_versions = None
+                self.last_error = None
+                return False
+            if versions == self._failed_versions:
+                return False
+            try:
+                snapshot = self._build(versions, self.current)
+            except Exception as e:
+                self._failed_versions = versions
+                self.last_error = f"{type(e).__name__}: {e}"
+                metrics.count("model_reload_failures_total", target=self.name)
+                traceback.print_exc()
+                return False
+            self.current = snapshot
+            self._failed_versions = None
+            self.last_error = None
+            metrics.count("model_reloads_total", target=self.name)
+            return True
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception:
+                # Lỗi đọc thư mục mô hình...: thread theo dõi không được chết, thử lại ở lần sau
+                traceback.print_exc()
+
+    def start(self):
+        """Bắt đầu thread theo dõi (interval <= 0: tắt, chỉ phục vụ snapshot ban đầu)."""
+        if self._thread is None and self.interval > 0:
+            self._thread = threading.Thread(target=self._run, name=f"hot-reload-{self.name}", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,104 @@
+# utils/hybrid.py
+import numpy as np
+
+from utils import metrics
+from utils.catalog import to_display
+from utils.collaborative import get_svd_scorer
+from utils.content_based_top1000 import _get_exclude_mask, _get_tfidf_matrix, get_catalog
+from utils.interactions import InteractionIndex
+
+CB_WEIGHT = 0.3  # Trọng số mặc định của điểm nội dung; điểm SVD nhận 1 - CB_WEIGHT
+
+
+class HybridRecommender:
+    """
+    Gợi ý kết hợp cho một user: điểm SVD và độ tương đồng nội dung với các sản phẩm user đã đánh giá,
+    cả hai là vector dày trên cùng một chỉ mục sản phẩm (thứ tự dòng của mô hình content-based).
+
+    Các ánh xạ được dựng một lần khi khởi tạo:
+      - product_id <-> dòng (Catalog của mô hình content-based),
+      - dòng -> inner id của SVD (-1 nếu mô hình SVD chưa biết sản phẩm),
+      - sản phẩm trong InteractionIndex -> dòng (đánh giá của user là một lát cắt CSR của chỉ mục),
+    nên mỗi request chỉ còn vài phép toán vector, không join DataFrame.
+    """
+
+    def __init__(self, cb_model, cf_model, ratings, cb_weight=CB_WEIGHT):
+        self.catalog = get_catalog(cb_model)
+        self.tfidf_matrix = _get_tfidf_matrix(cb_model)
+        self.exclude_mask = _get_exclude_mask(cb_model)
+        self.scorer = get_svd_scorer(cf_model)
+        self.cb_weight = float(cb_weight)
+
+        self.svd_rows = self.scorer.inner_item_ids(self.catalog.product_ids)
+
+        # ratings: InteractionIndex dùng chung (nên dùng) hoặc DataFrame đánh giá (dựng chỉ mục tạm)
+        if not isinstance(ratings, InteractionIndex):
+            ratings = InteractionIndex.from_ratings(ratings)
+        self.interactions = ratings
+        # chỉ số sản phẩm của chỉ mục -> dòng (-1 nếu mô hình content-based không có sản phẩm)
+        self.item_rows = self.catalog.rows(ratings.item_ids)
+
+    def rated(self, user_id):
+        """(dòng sản phẩm, rating) mà user đã đánh giá; rỗng nếu user chưa có đánh giá nào."""
+        index = self.interactions
+        u = index.user_index.get(user_id)
+        if u < 0:
+            return self.item_rows[:0], index.user_ratings[:0]
+        start, end = index.user_indptr[u], index.user_indptr[u + 1]
+        rows = self.item_rows[index.user_items[start:end]]
+        known = rows >= 0
+        return rows[known], index.user_ratings[start:end][known]
+
+    def collaborative_scores(self, user_id):
+        """Rating dự đoán của SVD cho mọi dòng (user/sản phẩm chưa biết: dự đoán mặc định của SVD)."""
+        return self.scorer.score(user_id, self.svd_rows)
+
+    def content_scores(self, rated_rows, rated_values):
+        """
+        Cosine giữa từng sản phẩm và hồ sơ nội dung của user
+        (tổng TF-IDF các sản phẩm đã đánh giá, trọng số = rating). User chưa đánh giá gì -> toàn 0.
+        """
+        if len(rated_rows) == 0:
+            return np.zeros(self.tfidf_matrix.shape[0], dtype=np.float32)
+        profile = self.tfidf_matrix[rated_rows].T @ rated_values
+        norm = np.linalg.norm(profile)
+        if norm == 0:
+            return np.zeros(self.tfidf_matrix.shape[0], dtype=np.float32)
+        return self.tfidf_matrix @ (profile / norm).astype(np.float32)
+
+    def recommend(self, user_id, n=10, cb_weight=None):
+        """
+        Top-n dòng sản phẩm theo điểm kết hợp (1 - w) * SVD chuẩn hóa về [0, 1] + w * cosine nội dung.
+        Bỏ qua sản phẩm user đã đánh giá và sản phẩm trong exclude_mask.
+        Trả về (rows, điểm kết hợp, rating dự đoán SVD, độ tương đồng nội dung), giảm dần theo điểm kết hợp.
+        """
+        w = self.cb_weight if cb_weight is None else float(cb_weight)
+        if not 0 <= w <= 1:
+            raise ValueError("❌ cb_weight phải nằm trong [0, 1].")
+        rated_rows, rated_values = self.rated(user_id)
+
+        with metrics.timer("hybrid.collaborative"):
+            cf = self.collaborative_scores(user_id)
+        with metrics.timer("hybrid.content"):
+            cb = self.content_scores(rated_rows, rated_values)
+
+        with metrics.timer("hybrid.blend"):
+            low, high = self.scorer.rating_scale
+            blended = (1 - w) * (cf - low) / (high - low) + w * cb
+            blended[self.exclude_mask] = -np.inf
+            blended[rated_rows] = -np.inf
+            n = min(n, int(np.isfinite(blended).sum()))
+            if n <= 0:
+                empty = np.empty(0)
+                return empty.astype(np.int64), empty, empty, empty
+            top = np.argpartition(blended, len(blended) - n)[len(blended) - n:]
+            top = top[np.lexsort((top, -blended[top]))]
+        return top, blended[top], cf[top], cb[top]
+
+
+def get_hybrid_recommendations(user_id, hybrid, n=10, cb_weight=None):
+    """Top-n gợi ý kết hợp của user_id dưới dạng bảng hiển thị (cùng tên cột với các chế độ khác)."""
+    rows, scores, cf_scores, cb_scores = hybrid.recommend(user_id, n=n, cb_weight=cb_weight)
+    with metrics.timer("hybrid.format"):
+        return to_display(hybrid.catalog.take(rows, hybrid_score=scores, prediction=cf_scores,
+                                              similarity=cb_scores))
@@ -0,0 +1,103 @@
+# utils/id_index.py
+import numpy as np
+
+
+def normalize_ids(ids):
+    """Id số (kể cả chuỗi số như '123') -> mảng int64; không phải số thì giữ dạng str."""
+    ids = np.asarray(ids)
+    if ids.dtype.kind in "iu":
+        return ids.astype(np.int64)
+    try:
+        as_int = ids.astype(np.int64)
+        if np.array_equal(as_int.astype(str), ids.astype(str)):
+            return as_int
+    except (TypeError, ValueError):
+        pass
+    return ids.astype(str)
+
+
+def _integral(raw):
+    """raw dưới dạng int nếu là một số nguyên (12, 12.0, '12', '12.0', np.int64...), ngược lại None (12.5, 'abc', True)."""
+    if isinstance(raw, (bool, np.bool_)):
+        return None
+    if not isinstance(raw, (float, np.floating)):
+        try:
+            return int(raw)
+        except (TypeError, ValueError):
+            pass
+    try:
+        value = float(raw)
+    except (TypeError, ValueError):
+        return None
+    return int(value) if value.is_integer() else None
+
+
+class IdIndex:
+    """
+    Ánh xạ raw id -> vị trí (0..n-1), giữ lần xuất hiện đầu tiên nếu trùng id.
+    Id số nguyên: tra bằng searchsorted trên mảng đã sắp xếp (có thể mmap, không tạo dict riêng mỗi tiến trình).
+    Id kiểu khác: dùng dict với key chuẩn hóa về str.
+    """
+
+    def __init__(self, ids, sorted_ids=None, order=None):
+        self.ids = np.asarray(ids)
+        self._dict = None
+        if self.ids.dtype.kind in "iu":
+            if sorted_ids is None or order is None:
+                order = np.argsort(self.ids, kind="stable")
+                sorted_ids = self.ids[order]
+            self.sorted_ids = sorted_ids
+            self.order = order
+        else:
+            self._dict = {}
+            for pos, raw in enumerate(self.ids.tolist()):
+                self._dict.setdefault(str(raw), pos)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, raw):
+        return self.get(raw) >= 0
+
+    def get(self, raw, default=-1):
+        if self._dict is not None:
+            return self._dict.get(str(raw), default)
+        # Chỉ nhận giá trị nguyên: int(12.7) cắt thành 12 và trả về nhầm sản phẩm / user khác
+        key = _integral(raw)
+        if key is None:
+            return default
+        pos = np.searchsorted(self.sorted_ids, key)
+        if pos < len(self.sorted_ids) and self.sorted_ids[pos] == key:
+            return int(self.order[pos])
+        return default
+
+    def get_many(self, raws):
+        """Vị trí của nhiều id cùng lúc (mảng int64, -1 nếu không có)."""
+        raws = np.asarray(raws)
+        if self._dict is not None:
+            return np.fromiter((self._dict.get(str(r), -1) for r in raws.tolist()),
+                               dtype=np.int64, count=len(raws))
+        if raws.dtype.kind not in "iu":
+            return np.fromiter((self.get(r) for r in raws.tolist()), dtype=np.int64, count=len(raws))
+        if len(self.sorted_ids) == 0:
+            return np.full(len(raws), -1, dtype=np.int64)
+        pos = np.searchsorted(self.sorted_ids, raws)
+        pos_clipped = np.minimum(pos, len(self.sorted_ids) - 1)
+        found = self.sorted_ids[pos_clipped] == raws
+        return np.where(found, self.order[pos_clipped], -1).astype(np.int64)
+
+    def arrays(self, prefix):
+        """Các mảng cần lưu (dạng .npy) để mở lại index mà không phải sắp xếp lại."""
+        out = {f"{prefix}_ids": self.ids}
+        if self._dict is None:
+            out[f"{prefix}_sorted_ids"] = self.sorted_ids
+            out[f"{prefix}_order"] = self.order
+        return out
+
+    @classmethod
+    def from_arrays(cls, arrays, prefix):
+        return cls(
+            arrays[f"{prefix}_ids"],
+            sorted_ids=arrays.get(f"{prefix}_sorted_ids"),
+            order=arrays.get(f"{prefix}_order"),
+        )
@@ -0,0 +1,156 @@
+# utils/interactions.py
+import numpy as np
+from scipy import sparse
+
+from utils.id_index import IdIndex, normalize_ids
+from utils.model_store import load_arrays, save_arrays
+
+INTERACTIONS_NAME = "interactions"
+
+
+class InteractionIndex:
+    """
+    Chỉ mục đánh giá hai chiều, dựng một lần từ file đánh giá:
+      - user_id / product_id -> chỉ số dày 0..n-1 (IdIndex, id đã sắp xếp),
+      - CSR user -> (sản phẩm, rating) và CSR sản phẩm -> (user, rating).
+    "Sản phẩm user đã đánh giá" và "user đã đánh giá sản phẩm" là một lát cắt O(bậc),
+    không phải quét cả bảng. Các mảng lưu thành .npy (mở bằng mmap, dùng chung giữa các tiến trình).
+    """
+
+    def __init__(self, user_ids, item_ids, user_indptr, user_items, user_ratings,
+                 item_indptr, item_users, item_ratings, user_index=None, item_index=None):
+        self.user_ids = np.asarray(user_ids)
+        self.item_ids = np.asarray(item_ids)
+        self.user_indptr = np.asarray(user_indptr)
+        self.user_items = np.asarray(user_items)
+        self.user_ratings = np.asarray(user_ratings)
+        self.item_indptr = np.asarray(item_indptr)
+        self.item_users = np.asarray(item_users)
+        self.item_ratings = np.asarray(item_ratings)
+        # id đã sắp xếp tăng dần nên sorted_ids = ids, order = 0..n-1 (không phải sắp lại khi mở)
+        if user_index is None:
+            user_index = IdIndex(self.user_ids, self.user_ids, np.arange(len(self.user_ids)))
+        if item_index is None:
+            item_index = IdIndex(self.item_ids, self.item_ids, np.arange(len(self.item_ids)))
+        self.user_index = user_index
+        self.item_index = item_index
+
+    @classmethod
+    def from_arrays(cls, user_raw, item_raw, ratings):
+        """Dựng từ 3 mảng cùng độ dài (mỗi đánh giá một phần tử, thứ tự bất kỳ)."""
+        user_ids, u = np.unique(normalize_ids(user_raw), return_inverse=True)
+        item_ids, i = np.unique(normalize_ids(item_raw), return_inverse=True)
+        ratings = np.asarray(ratings, dtype=np.float32)
+        u = u.astype(np.int32)
+        i = i.astype(np.int32)
+
+        by_user = np.lexsort((i, u))
+        by_item = np.lexsort((u, i))
+        return cls(
+            user_ids, item_ids,
+            user_indptr=np.concatenate([[0], np.cumsum(np.bincount(u, minlength=len(user_ids)))]),
+            user_items=i[by_user], user_ratings=ratings[by_user],
+            item_indptr=np.concatenate([[0], np.cumsum(np.bincount(i, minlength=len(item_ids)))]),
+            item_users=u[by_item], item_ratings=ratings[by_item],
+        )
+
+    @classmethod
+    def from_ratings(cls, ratings_df):
+        ratings_df = ratings_df.dropna(subset=["user_id", "product_id", "rating"])
+        return cls.from_arrays(ratings_df["user_id"].to_numpy(), ratings_df["product_id"].to_numpy(),
+                               ratings_df["rating"].to_numpy())
+
+    def extend(self, user_raw, item_raw, ratings):
+        """
+        Chỉ mục mới = chỉ mục này + các đánh giá được nối thêm (giống hệt from_arrays trên toàn bộ lịch sử).
+        Chỉ np.unique phần mới; phần cũ chỉ đổi chỉ số rồi trộn với phần mới (các đoạn cũ đã sắp xếp
+        nên sắp xếp ổn định gần như tuyến tính), không phải đọc lại file đánh giá.
+        """
+        user_raw, item_raw = normalize_ids(user_raw), normalize_ids(item_raw)
+        user_ids = np.union1d(self.user_ids, user_raw)
+        item_ids = np.union1d(self.item_ids, item_raw)
+        # id đã sắp xếp nên ánh xạ cũ -> mới giữ nguyên thứ tự
+        user_map = np.searchsorted(user_ids, self.user_ids).astype(np.int32)
+        item_map = np.searchsorted(item_ids, self.item_ids).astype(np.int32)
+        u = np.searchsorted(user_ids, user_raw).astype(np.int32)
+        i = np.searchsorted(item_ids, item_raw).astype(np.int32)
+        ratings = np.asarray(ratings, dtype=np.float32)
+
+        user_indptr, user_items, user_ratings = _merge_csr(
+            self.user_indptr, self.user_items, self.user_ratings, user_map, item_map, u, i, ratings, len(user_ids), len(item_ids))
+        item_indptr, item_users, item_ratings = _merge_csr(
+            self.item_indptr, self.item_users, self.item_ratings, item_map, user_map, i, u, ratings, len(item_ids), len(user_ids))
+        return InteractionIndex(user_ids, item_ids, user_indptr, user_items, user_ratings,
+                                item_indptr, item_users, item_ratings)
+
+    def __len__(self):
+        return len(self.user_items)
+
+    @property
+    def n_users(self):
+        return len(self.user_ids)
+
+    @property
+    def n_items(self):
+        return len(self.item_ids)
+
+    def user_degree(self):
+        """Số đánh giá của từng user (theo thứ tự user_ids)."""
+        return np.diff(self.user_indptr)
+
+    def item_degree(self):
+        """Số đánh giá của từng sản phẩm (theo thứ tự item_ids)."""
+        return np.diff(self.item_indptr)
+
+    def items_of(self, user_id):
+        """(product_ids, ratings) user đã đánh giá, sắp theo product_id; rỗng nếu không có user."""
+        u = self.user_index.get(user_id)
+        if u < 0:
+            return self.item_ids[:0], self.user_ratings[:0]
+        start, end = self.user_indptr[u], self.user_indptr[u + 1]
+        return self.item_ids[self.user_items[start:end]], self.user_ratings[start:end]
+
+    def users_of(self, product_id):
+        """(user_ids, ratings) đã đánh giá sản phẩm, sắp theo user_id; rỗng nếu không có sản phẩm."""
+        i = self.item_index.get(product_id)
+        if i < 0:
+            return self.user_ids[:0], self.item_ratings[:0]
+        start, end = self.item_indptr[i], self.item_indptr[i + 1]
+        return self.user_ids[self.item_users[start:end]], self.item_ratings[start:end]
+
+    def user_item_matrix(self):
+        """Ma trận thưa user x sản phẩm (giá trị = rating) dùng chung bộ đệm CSR, không sao chép."""
+        return sparse.csr_matrix((self.user_ratings, self.user_items, self.user_indptr),
+                                 shape=(self.n_users, self.n_items), copy=False)
+
+    def save(self, version_dir):
+        save_arrays(version_dir, {
+            "user_ids": self.user_ids, "item_ids": self.item_ids,
+            "user_indptr": self.user_indptr, "user_items": self.user_items, "user_ratings": self.user_ratings,
+            "item_indptr": self.item_indptr, "item_users": self.item_users, "item_ratings": self.item_ratings,
+        })
+
+    @classmethod
+    def load(cls, version_dir, mmap_mode="r"):
+        arrays = load_arrays(version_dir, mmap_mode=mmap_mode)
+        return cls(**{key: arrays[key] for key in (
+            "user_ids", "item_ids", "user_indptr", "user_items", "user_ratings",
+            "item_indptr", "item_users", "item_ratings",
+        )})
+
+
+def _merge_csr(indptr, cols, values, row_map, col_map, new_rows, new_cols, new_values, n_rows, n_cols):
+    """CSR cũ (đổi chỉ số qua row_map / col_map) + các phần tử mới, sắp theo (dòng, cột), phần cũ đứng trước khi trùng."""
+    rows = np.concatenate([np.repeat(row_map, np.diff(indptr)), new_rows])
+    cols = np.concatenate([col_map[cols], new_cols])
+    values = np.concatenate([np.asarray(values, dtype=np.float32), new_values])
+    order = np.argsort(rows.astype(np.int64) * n_cols + cols, kind="stable")
+    indptr = np.concatenate([[0], np.cumsum(np.bincount(rows, minlength=n_rows))])
+    return indptr, cols[order], values[order]
+
+
+def rated_products(ratings, user_id):
+    """Các product_id user đã đánh giá, từ InteractionIndex (lát cắt O(bậc)) hoặc DataFrame đánh giá (quét cả bảng)."""
+    if isinstance(ratings, InteractionIndex):
+        return np.unique(ratings.items_of(user_id)[0])
+    return ratings[ratings['user_id'] == int(user_id)]['product_id'].unique()
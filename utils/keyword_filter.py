@@ -0,0 +1,46 @@
+# utils/keyword_filter.py
+import re
+
+import numpy as np
+import pandas as pd
+
+# Từ khóa mặc định đánh dấu sản phẩm nghi ngờ là đồ nữ (so khớp chuỗi con, không phân biệt hoa thường)
+FEMALE_KEYWORDS = (
+    "nữ", "croptop", "váy", "đầm", "áo dây", "baby doll",
+    "đồ bộ nữ", "xinh", "dễ thương", "form rộng", "áo đôi", "cặp đôi",
+)
+
+
+class KeywordFilter:
+    """
+    Đánh dấu các dòng có chứa ít nhất một từ khóa trong các cột cho trước.
+    Toàn bộ từ khóa được biên dịch một lần thành một regex dạng a|b|c và chạy
+    vector hóa trên cả cột, thay vì vòng lặp any(word in text) cho từng dòng.
+    """
+
+    def __init__(self, keywords=FEMALE_KEYWORDS, columns=("product_name",)):
+        self.keywords = tuple(dict.fromkeys(str(k).lower() for k in keywords if str(k).strip()))
+        self.columns = tuple(columns)
+        # Từ khóa dài trước để khi có nhiều từ khóa cùng tiền tố, regex thử từ dài nhất trước
+        alternation = "|".join(re.escape(k) for k in sorted(self.keywords, key=len, reverse=True))
+        self.pattern = re.compile(alternation) if self.keywords else None
+
+    def __repr__(self):
+        return f"KeywordFilter({len(self.keywords)} từ khóa, columns={self.columns})"
+
+    def matches(self, text):
+        """Kiểm tra một chuỗi (cùng kết quả với mask nhưng cho một giá trị)."""
+        return self.pattern is not None and self.pattern.search(str(text).lower()) is not None
+
+    def mask(self, df):
+        """Mảng bool (một phần tử / dòng của df): True nếu dòng chứa từ khóa ở bất kỳ cột nào."""
+        result = np.zeros(len(df), dtype=bool)
+        if self.pattern is None:
+            return result
+        for column in self.columns:
+            texts = df[column].astype("string").str.lower()
+            result |= texts.str.contains(self.pattern, regex=True).fillna(False).to_numpy(dtype=bool)
+        return result
+
+    def series(self, df):
+        return pd.Series(self.mask(df), index=df.index)
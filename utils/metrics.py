@@ -0,0 +1,172 @@
+# utils/metrics.py
+import bisect
+import functools
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+import numpy as np
+
+# Tắt toàn bộ đo đạc bằng RECSYS_METRICS=0
+ENABLED = os.environ.get("RECSYS_METRICS", "1") != "0"
+RING_SIZE = 2048  # Số lần đo gần nhất giữ lại cho mỗi stage (để vẽ histogram / tính percentile)
+# Biên bucket (giây) cho histogram Prometheus: cộng dồn từ lúc khởi động, không bị ring buffer cắt
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_lock = threading.Lock()
+_samples = defaultdict(lambda: deque(maxlen=RING_SIZE))  # stage -> deque[giây]
+_histograms = {}  # stage -> [đếm theo bucket..., +Inf], tổng giây, số lần
+_counters = defaultdict(int)  # (tên, (nhãn...)) -> giá trị
+_started = time.time()
+
+
+def record(stage, seconds):
+    """Ghi một lần đo thời gian của stage."""
+    if not ENABLED:
+        return
+    with _lock:
+        _samples[stage].append(seconds)
+        hist = _histograms.get(stage)
+        if hist is None:
+            hist = _histograms[stage] = [[0] * (len(BUCKETS) + 1), 0.0, 0]
+        hist[0][bisect.bisect_left(BUCKETS, seconds)] += 1
+        hist[1] += seconds
+        hist[2] += 1
+
+
+def count(name, value=1, **labels):
+    """Cộng dồn một bộ đếm, vd. count("cache_hits_total", cache="cb_model")."""
+    if not ENABLED:
+        return
+    with _lock:
+        _counters[(name, tuple(sorted(labels.items())))] += value
+
+
+@contextmanager
+def timer(stage):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - start)
+
+
+def timed(stage):
+    """Decorator đo thời gian mỗi lần gọi hàm."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with timer(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def cached(cache_decorator, name):
+    """
+    Bọc một decorator cache (vd. st.cache_resource) để đếm hit/miss và đo thời gian nạp khi miss:
+
+        @metrics.cached(st.cache_resource, "cb_model")
+        def load_cb_model(): ...
+    """
+    def decorate(fn):
+        state = threading.local()
+
+        @functools.wraps(fn)
+        def on_miss(*args, **kwargs):
+            state.miss = True
+            with timer(f"load.{name}"):
+                return fn(*args, **kwargs)
+
+        cached_fn = cache_decorator(on_miss)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            state.miss = False
+            result = cached_fn(*args, **kwargs)
+            count("cache_misses_total" if state.miss else "cache_hits_total", cache=name)
+            return result
+
+        wrapper.clear = getattr(cached_fn, "clear", None)
+        return wrapper
+    return decorate
+
+
+def reset():
+    global _started
+    with _lock:
+        _samples.clear()
+        _histograms.clear()
+        _counters.clear()
+        _started = time.time()
+
+
+def samples(stage):
+    """Thời gian (giây) của các lần đo gần nhất của stage, cũ -> mới."""
+    with _lock:
+        return np.array(_samples.get(stage, ()), dtype=np.float64)
+
+
+def summary():
+    """Mỗi stage một dòng: số lần (từ lúc khởi động), p50/p95/p99/max (ms, trên ring buffer), tổng giây."""
+    with _lock:
+        stages = {stage: np.array(ring) for stage, ring in _samples.items()}
+        totals = {stage: (hist[2], hist[1]) for stage, hist in _histograms.items()}
+    rows = []
+    for stage in sorted(stages):
+        ms = stages[stage] * 1000
+        p50, p95, p99 = np.percentile(ms, [50, 95, 99]) if len(ms) else (np.nan,) * 3
+        rows.append({
+            "stage": stage,
+            "count": totals[stage][0],
+            "p50_ms": float(p50), "p95_ms": float(p95), "p99_ms": float(p99),
+            "max_ms": float(ms.max()) if len(ms) else np.nan,
+            "total_s": totals[stage][1],
+        })
+    return rows
+
+
+def counters():
+    """[(tên, {nhãn}, giá trị)] của tất cả bộ đếm."""
+    with _lock:
+        items = list(_counters.items())
+    return [(name, dict(labels), value) for (name, labels), value in sorted(items)]
+
+
+def uptime():
+    return time.time() - _started
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{str(v)}"' for k, v in labels) + "}"
+
+
+def to_prometheus(prefix="recsys"):
+    """Xuất toàn bộ số liệu theo định dạng text của Prometheus (exposition format 0.0.4)."""
+    with _lock:
+        histograms = {stage: ([*hist[0]], hist[1], hist[2]) for stage, hist in _histograms.items()}
+        counter_items = sorted(_counters.items())
+
+    lines = [
+        f"# HELP {prefix}_stage_seconds Thời gian từng stage xử lý.",
+        f"# TYPE {prefix}_stage_seconds histogram",
+    ]
+    for stage in sorted(histograms):
+        buckets, total, n = histograms[stage]
+        cumulative = np.cumsum(buckets)
+        for le, c in zip([*map(str, BUCKETS), "+Inf"], cumulative):
+            lines.append(f'{prefix}_stage_seconds_bucket{{stage="{stage}",le="{le}"}} {int(c)}')
+        lines.append(f'{prefix}_stage_seconds_sum{{stage="{stage}"}} {total:.6f}')
+        lines.append(f'{prefix}_stage_seconds_count{{stage="{stage}"}} {n}')
+
+    seen = set()
+    for (name, labels), value in counter_items:
+        if name not in seen:
+            lines.append(f"# TYPE {prefix}_{name} counter")
+            seen.add(name)
+        lines.append(f"{prefix}_{name}{_labels(labels)} {value}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,118 @@
+# utils/model_loader.py
+import os
+
+import joblib
+
+from utils import metrics
+from utils.interactions import INTERACTIONS_NAME
+from utils.model_store import current_version, latest_version_dir, verify_version, version_root
+
+CB_MODEL_NAME = "content_based"
+CF_MODEL_NAME = "collaborative_svd"
+USER_TOPN_NAME = "user_topn"
+PRODUCTS_NAME = "products"
+CB_PICKLE_PATH = "models/content_based_model_top1000.pkl"
+CF_PICKLE_PATH = "models/collaborative_model_svd.joblib"
+USER_TOPN_PATH = "models/user_topn_recommendations.npz"
+
+
+def _file_version(*paths):
+    """Phiên bản của artifact dạng một file: thời điểm sửa của file đầu tiên tồn tại (None nếu không có)."""
+    for path in paths:
+        if os.path.exists(path):
+            return f"file-{os.stat(path).st_mtime_ns}"
+    return None
+
+
+def artifact_version(name, *fallback_paths):
+    """Phiên bản đang được công bố của name (con trỏ CURRENT), nếu chưa có thì phiên bản của file dự phòng."""
+    version = current_version(name)
+    return version if version is not None else _file_version(*fallback_paths)
+
+
+def model_versions():
+    """
+    Phiên bản đang được công bố trên đĩa của từng artifact mà trang / API phục vụ
+    (chỉ đọc con trỏ CURRENT + stat, rất rẻ nên có thể kiểm tra định kỳ).
+    Dùng làm một phần khóa cache kết quả, để nạp đúng phiên bản đó và để phát hiện phiên bản mới.
+    """
+    from utils.data_store import PRODUCTS_CSV, PRODUCTS_PARQUET, RATINGS_CSV, RATINGS_PARQUET
+
+    return {
+        CB_MODEL_NAME: artifact_version(CB_MODEL_NAME, CB_PICKLE_PATH),
+        CF_MODEL_NAME: artifact_version(CF_MODEL_NAME, CF_PICKLE_PATH),
+        INTERACTIONS_NAME: artifact_version(INTERACTIONS_NAME, RATINGS_PARQUET, RATINGS_CSV),
+        USER_TOPN_NAME: _file_version(USER_TOPN_PATH),
+        PRODUCTS_NAME: _file_version(PRODUCTS_PARQUET, PRODUCTS_CSV),
+    }
+
+
+def _version_dir(name, version=None):
+    """
+    Thư mục của phiên bản version (nếu còn), mặc định / không còn thì phiên bản đang được công bố.
+    Kiểm tra file theo manifest trước khi trả về, để không nạp một phiên bản thiếu file.
+    """
+    if version is not None and os.path.isdir(os.path.join(version_root(name), version)):
+        version_dir = os.path.join(version_root(name), version)
+    else:
+        version_dir = latest_version_dir(name)
+    if version_dir is not None:
+        verify_version(version_dir)
+    return version_dir
+
+
+@metrics.timed("load.content_model")
+def load_content_model(version=None):
+    """
+    Mô hình content-based: ưu tiên thư mục phiên bản (version, mặc định mới nhất; mảng .npy mở bằng mmap),
+    nếu chưa có thì đọc file .pkl cũ.
+    """
+    from utils.content_based_top1000 import load_model_dir
+
+    version_dir = _version_dir(CB_MODEL_NAME, version)
+    if version_dir is not None:
+        return load_model_dir(version_dir)
+    if os.path.exists(CB_PICKLE_PATH):
+        return joblib.load(CB_PICKLE_PATH)
+    raise FileNotFoundError("❌ Không tìm thấy mô hình content-based (models/content_based/ hoặc content_based_model_top1000.pkl)")
+
+
+@metrics.timed("load.interactions")
+def load_interaction_index(version=None):
+    """
+    Chỉ mục đánh giá user <-> sản phẩm: ưu tiên phiên bản đã build (build_interaction_index.py, mở bằng mmap),
+    nếu chưa có thì dựng trong bộ nhớ từ file đánh giá.
+    """
+    from utils.data_store import RATING_TRAIN_COLUMNS, read_ratings
+    from utils.interactions import InteractionIndex
+
+    version_dir = _version_dir(INTERACTIONS_NAME, version)
+    if version_dir is not None:
+        return InteractionIndex.load(version_dir)
+    return InteractionIndex.from_ratings(read_ratings(RATING_TRAIN_COLUMNS))
+
+
+@metrics.timed("load.collaborative_model")
+def load_collaborative_model(version=None):
+    """
+    Mô hình collaborative: ưu tiên SVDScorer từ thư mục phiên bản (version, mặc định mới nhất;
+    ma trận nhân tố mở bằng mmap), nếu chưa có thì đọc mô hình Surprise đã joblib.
+    """
+    from utils.collaborative import SVDScorer
+
+    version_dir = _version_dir(CF_MODEL_NAME, version)
+    if version_dir is not None:
+        return SVDScorer.load(version_dir)
+    if os.path.exists(CF_PICKLE_PATH):
+        return joblib.load(CF_PICKLE_PATH)
+    raise FileNotFoundError("❌ Không tìm thấy mô hình collaborative (models/collaborative_svd/ hoặc collaborative_model_svd.joblib)")
+
+
+@metrics.timed("load.user_topn")
+def load_user_topn():
+    """Bảng top-N tính sẵn (build_user_recommendations.py); None nếu chưa có (chấm điểm trực tiếp)."""
+    from utils.collaborative import UserTopNTable
+
+    if not os.path.exists(USER_TOPN_PATH):
+        return None
+    return UserTopNTable.load(USER_TOPN_PATH)
@@ -0,0 +1,178 @@
+# utils/model_store.py
+import json
+import os
+import shutil
+import time
+
+import joblib
+import numpy as np
+
+MODELS_DIR = "models"
+META_FILE = "meta.pkl"
+MANIFEST_FILE = "manifest.json"
+CURRENT_FILE = "CURRENT"  # models/<name>/CURRENT: tên phiên bản đang được công bố
+KEEP_VERSIONS = 5  # Số phiên bản mới nhất giữ lại sau mỗi lần ghi (đủ để quay lại vài bản trước), None = giữ tất cả
+
+
+def version_root(name, base_dir=MODELS_DIR):
+    return os.path.join(base_dir, name)
+
+
+def list_versions(name, base_dir=MODELS_DIR):
+    """Các phiên bản đã ghi xong của mô hình, cũ -> mới (bỏ qua thư mục tạm bắt đầu bằng '.')."""
+    root = version_root(name, base_dir)
+    if not os.path.isdir(root):
+        return []
+    return sorted(
+        entry for entry in os.listdir(root)
+        if not entry.startswith(".") and os.path.isdir(os.path.join(root, entry))
+    )
+
+
+def current_version(name, base_dir=MODELS_DIR):
+    """
+    Tên phiên bản đang được công bố: theo con trỏ CURRENT nếu có (và thư mục còn tồn tại),
+    nếu chưa có con trỏ (mô hình build trước khi có CURRENT) thì phiên bản mới nhất.
+    """
+    root = version_root(name, base_dir)
+    try:
+        with open(os.path.join(root, CURRENT_FILE), encoding="utf-8") as f:
+            version = f.read().strip()
+        if version and os.path.isdir(os.path.join(root, version)):
+            return version
+    except OSError:
+        pass
+    versions = list_versions(name, base_dir)
+    return versions[-1] if versions else None
+
+
+def latest_version_dir(name, base_dir=MODELS_DIR):
+    """Thư mục của phiên bản đang được công bố (xem current_version), None nếu chưa có."""
+    version = current_version(name, base_dir)
+    return os.path.join(version_root(name, base_dir), version) if version else None
+
+
+def publish(name, version, base_dir=MODELS_DIR):
+    """
+    Trỏ CURRENT sang version (vd. để quay lại phiên bản cũ). Ghi file tạm rồi os.replace,
+    nên tiến trình đang theo dõi con trỏ chỉ thấy tên cũ hoặc tên mới, không bao giờ thấy nửa chừng.
+    """
+    root = version_root(name, base_dir)
+    if not os.path.isdir(os.path.join(root, version)):
+        raise FileNotFoundError(f"❌ Không có phiên bản {version} của {name}")
+    tmp_path = os.path.join(root, f".{CURRENT_FILE}.{os.getpid()}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(version + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, os.path.join(root, CURRENT_FILE))
+
+
+def write_manifest(version_dir, name, version):
+    """manifest.json: tên, phiên bản, thời điểm ghi và kích thước từng file của phiên bản."""
+    files = {
+        filename: os.path.getsize(os.path.join(version_dir, filename))
+        for filename in sorted(os.listdir(version_dir)) if filename != MANIFEST_FILE
+    }
+    manifest = {"name": name, "version": version, "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "files": files}
+    with open(os.path.join(version_dir, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+
+def read_manifest(version_dir):
+    """manifest.json của phiên bản (None với phiên bản ghi trước khi có manifest)."""
+    path = os.path.join(version_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def verify_version(version_dir):
+    """Kiểm tra mọi file trong manifest còn đủ và đúng kích thước (phiên bản không có manifest: bỏ qua)."""
+    manifest = read_manifest(version_dir)
+    if manifest is None:
+        return
+    for filename, size in manifest["files"].items():
+        path = os.path.join(version_dir, filename)
+        if not os.path.exists(path) or os.path.getsize(path) != size:
+            raise ValueError(f"❌ Phiên bản {version_dir} không khớp manifest: {filename}")
+
+
+def prune_versions(name, keep=KEEP_VERSIONS, base_dir=MODELS_DIR):
+    """
+    Xóa các phiên bản cũ, giữ keep phiên bản mới nhất và luôn giữ phiên bản CURRENT trỏ tới
+    (kể cả khi đã quay lại một bản cũ hơn). Tiến trình đang mmap phiên bản bị xóa vẫn đọc được
+    (file chỉ thực sự mất khi không còn ai mở). Trả về danh sách phiên bản đã xóa.
+    """
+    if keep is None:
+        return []
+    versions = list_versions(name, base_dir)
+    protected = set(versions[-keep:]) if keep > 0 else set()
+    current = current_version(name, base_dir)
+    if current is not None:
+        protected.add(current)
+    removed = []
+    for version in versions:
+        if version not in protected:
+            shutil.rmtree(os.path.join(version_root(name, base_dir), version), ignore_errors=True)
+            removed.append(version)
+    return removed
+
+
+def write_version(name, writer, base_dir=MODELS_DIR, publish_version=True, keep=KEEP_VERSIONS):
+    """
+    Ghi một phiên bản mới: writer(tmp_dir) ghi file vào thư mục tạm kèm manifest.json,
+    sau đó đổi tên thành models/<name>/<version> để loader không bao giờ thấy phiên bản ghi dở,
+    rồi trỏ CURRENT sang phiên bản này (publish_version=False: chỉ ghi, công bố sau bằng publish()).
+    Sau cùng chỉ giữ keep phiên bản mới nhất cùng phiên bản CURRENT (xem prune_versions).
+    """
+    root = version_root(name, base_dir)
+    os.makedirs(root, exist_ok=True)
+    version = time.strftime("%Y%m%d-%H%M%S")
+    while os.path.exists(os.path.join(root, version)):
+        version += "_1"
+
+    tmp_dir = os.path.join(root, f".tmp-{version}")
+    os.makedirs(tmp_dir)
+    try:
+        writer(tmp_dir)
+        write_manifest(tmp_dir, name, version)
+        final_dir = os.path.join(root, version)
+        os.rename(tmp_dir, final_dir)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    if publish_version:
+        publish(name, version, base_dir)
+    if keep is not None:
+        prune_versions(name, max(keep, 1), base_dir)  # Phiên bản vừa ghi là bản mới nhất: luôn được giữ
+    return final_dir
+
+
+def save_arrays(version_dir, arrays):
+    """Lưu mỗi mảng numpy thành một file .npy thô (mở lại được bằng mmap)."""
+    for key, arr in arrays.items():
+        np.save(os.path.join(version_dir, f"{key}.npy"), np.ascontiguousarray(arr), allow_pickle=False)
+
+
+def load_arrays(version_dir, mmap_mode="r"):
+    """
+    Mở toàn bộ file .npy trong thư mục phiên bản. Với mmap_mode='r' các tiến trình worker
+    dùng chung trang nhớ qua page cache của hệ điều hành thay vì mỗi tiến trình một bản sao.
+    """
+    arrays = {}
+    for filename in os.listdir(version_dir):
+        if filename.endswith(".npy"):
+            path = os.path.join(version_dir, filename)
+            arrays[filename[:-len(".npy")]] = np.load(path, mmap_mode=mmap_mode, allow_pickle=False)
+    return arrays
+
+
+def save_meta(version_dir, meta):
+    """Phần nhỏ, không phải mảng số (DataFrame hiển thị, vectorizer, tham số) lưu bằng joblib."""
+    joblib.dump(meta, os.path.join(version_dir, META_FILE))
+
+
+def load_meta(version_dir):
+    return joblib.load(os.path.join(version_dir, META_FILE))
@@ -0,0 +1,48 @@
+# utils/product_search.py
+import numpy as np
+import pandas as pd
+
+from utils.text_index import NgramIndex
+
+MAX_SUGGESTIONS = 20
+
+
+class ProductSearch:
+    """
+    Gợi ý khi gõ cho ô chọn sản phẩm: tìm theo mã (tiền tố) và theo tên (tiền tố / chuỗi con),
+    dựng một lần trên một Catalog. Trả về dòng trong catalog, tối đa limit kết quả.
+    """
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        # Tên trống (NaN / None) thành "": nếu không, str() biến chúng thành "nan" / "none" và khớp với truy vấn "na"...
+        names = pd.Series(catalog.column("product_name")[catalog.unique_rows]).fillna("")
+        self.name_index = NgramIndex(names.tolist())
+        # Mã sản phẩm dạng chuỗi, đã sắp xếp, để tìm theo tiền tố mã bằng searchsorted
+        id_strings = catalog.product_ids[catalog.unique_rows].astype(str).astype(object)
+        self.id_order = np.argsort(id_strings, kind="stable")
+        self.sorted_ids = id_strings[self.id_order]
+
+    def _id_prefix(self, query, limit):
+        start = np.searchsorted(self.sorted_ids, query, side="left")
+        end = np.searchsorted(self.sorted_ids, query + "\U0010ffff", side="left")
+        # Thứ tự chữ cái nên mã đúng bằng query (nếu có) luôn đứng đầu
+        return self.id_order[start:min(end, start + limit)]
+
+    def search(self, query, limit=MAX_SUGGESTIONS):
+        """Dòng catalog của các sản phẩm khớp query: khớp mã trước (nếu query là số), rồi khớp tên."""
+        query = str(query).strip()
+        if not query:
+            return self.catalog.unique_rows[:limit]
+        positions = np.empty(0, dtype=np.int64)
+        if query.isdigit():
+            positions = self._id_prefix(query, limit)
+        if len(positions) < limit:
+            by_name = self.name_index.search(query, limit=limit)
+            positions = np.concatenate([positions, by_name[~np.isin(by_name, positions)]])[:limit]
+        return self.catalog.unique_rows[positions]
+
+    def suggestions(self, query, limit=MAX_SUGGESTIONS):
+        """[(product_id, tên)] cho ô gợi ý."""
+        rows = self.search(query, limit)
+        return list(zip(self.catalog.product_ids[rows].tolist(), self.catalog.column("product_name")[rows].tolist()))
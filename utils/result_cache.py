@@ -0,0 +1,218 @@
+# utils/result_cache.py
+import hashlib
+import os
+import pickle
+import shutil
+import threading
+import time
+from collections import OrderedDict
+
+from utils import metrics
+
+MAX_ENTRIES = 10_000
+TTL_SECONDS = 3600
+# Tầng lưu trên đĩa (giữ kết quả qua các lần khởi động lại), bật bằng vd. RECSYS_RESULT_CACHE_DIR=models/result_cache
+DISK_DIR = os.environ.get("RECSYS_RESULT_CACHE_DIR") or None
+
+_MISSING = object()
+
+
+def _digest(value):
+    return hashlib.sha1(repr(value).encode()).hexdigest()
+
+
+class ResultCache:
+    """
+    Cache kết quả gợi ý dùng chung cho mọi phiên trong một tiến trình.
+    Khóa (phiên bản mô hình, chế độ, truy vấn, k); LRU tối đa max_entries mục, mỗi mục hết hạn sau ttl giây.
+    disk_dir (tùy chọn): tầng thứ hai trên đĩa, <disk_dir>/<chế độ>/<phiên bản>/<khóa>.pkl.
+
+    Mỗi chế độ chỉ giữ kết quả của phiên bản mô hình đang phục vụ: khi gặp phiên bản khác
+    (build script đã ghi mô hình mới và tiến trình đã nạp nó), kết quả của phiên bản cũ bị xóa
+    khỏi bộ nhớ và khỏi đĩa. generation (tùy chọn): số thứ tự tăng dần của snapshot mô hình mà request
+    đang dùng (HotReloader gán). Request của snapshot cũ hơn snapshot đã kích hoạt chế độ chỉ tính trực tiếp,
+    không đổi ngược phiên bản; quay lại một phiên bản cũ (rollback) là snapshot mới nên vẫn được cache.
+    Không có generation: phiên bản khác luôn được kích hoạt. Kết quả trả về dùng chung giữa các phiên —
+    không được sửa tại chỗ.
+    """
+
+    def __init__(self, max_entries=MAX_ENTRIES, ttl=TTL_SECONDS, disk_dir=DISK_DIR):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.disk_dir = disk_dir
+        self._entries = OrderedDict()  # khóa -> (hết hạn lúc, kết quả)
+        self._versions = {}  # chế độ -> (phiên bản đang phục vụ, generation đã thấy lớn nhất)
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _disk_path(self, key):
+        version, mode = key[0], key[1]
+        return os.path.join(self.disk_dir, mode, _digest(version)[:16], _digest(key) + ".pkl")
+
+    def _activate(self, mode, version, generation):
+        """
+        Gọi khi đang giữ khóa. Phiên bản mới của mode: bỏ kết quả của các phiên bản khác.
+        Trả về (True nếu được đọc / ghi cache cho version, các thư mục cần xóa sau khi nhả khóa).
+        """
+        current = self._versions.get(mode)
+        if current is not None:
+            current_version, current_generation = current
+            newer = generation is not None and (current_generation is None or generation > current_generation)
+            if current_version == version:
+                if newer:
+                    self._versions[mode] = (version, generation)
+                return True, []
+            if generation is not None and current_generation is not None and not newer:
+                # Request còn dở trên snapshot cũ: không xóa kết quả của phiên bản đang phục vụ
+                return False, []
+        self._versions[mode] = (version, generation)
+        for key in [k for k in self._entries if k[1] == mode and k[0] != version]:
+            del self._entries[key]
+        return True, self._detach_stale_dirs(mode, version)
+
+    def _detach_stale_dirs(self, mode, version):
+        """
+        Gọi khi đang giữ khóa: đổi tên thư mục của các phiên bản khác sang <disk_dir>/.trash (O(1) mỗi thư mục)
+        để ghi mới không rơi vào thư mục sắp xóa; rmtree chạy sau khi nhả khóa.
+        """
+        if self.disk_dir is None:
+            return []
+        mode_dir = os.path.join(self.disk_dir, mode)
+        keep = _digest(version)[:16]
+        if not os.path.isdir(mode_dir):
+            return []
+        detached = []
+        trash_dir = os.path.join(self.disk_dir, ".trash")
+        for entry in os.listdir(mode_dir):
+            if entry == keep:
+                continue
+            target = os.path.join(trash_dir, f"{os.getpid()}.{threading.get_ident()}.{time.time_ns()}.{entry}")
+            try:
+                os.makedirs(trash_dir, exist_ok=True)
+                os.replace(os.path.join(mode_dir, entry), target)
+            except OSError:
+                # Tiến trình khác vừa dọn thư mục này
+                continue
+            detached.append(target)
+        return detached
+
+    @staticmethod
+    def _remove_dirs(paths):
+        for path in paths:
+            shutil.rmtree(path, ignore_errors=True)
+
+    def _read_disk(self, key, now):
+        path = self._disk_path(key)
+        try:
+            with open(path, "rb") as f:
+                expires, value = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            # Chưa có trên đĩa, hoặc file hỏng: coi như miss
+            return _MISSING
+        if expires <= now:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return _MISSING
+        return expires, value
+
+    def _write_disk(self, key, expires, value):
+        path = self._disk_path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, "wb") as f:
+                pickle.dump((expires, value), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)  # Tiến trình khác không bao giờ đọc phải file ghi dở
+        except OSError:
+            # Đĩa đầy / không có quyền ghi: chỉ mất tầng đĩa, không làm hỏng request
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+    def _store(self, key, expires, value):
+        """Gọi khi đang giữ khóa."""
+        self._entries[key] = (expires, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+            metrics.count("result_cache_evictions_total")
+
+    def get(self, version, mode, query, k, generation=None):
+        """Kết quả đã lưu, hoặc None nếu chưa có / đã hết hạn."""
+        key = (version, mode, query, k)
+        now = time.time()
+        with self._lock:
+            active, stale_dirs = self._activate(mode, version, generation)
+            item = self._entries.get(key) if active else None
+            if item is not None and item[0] <= now:
+                del self._entries[key]
+                item = None
+            if item is not None:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+            elif not active:
+                self._stats["misses"] += 1
+        self._remove_dirs(stale_dirs)
+        if item is not None:
+            metrics.count("cache_hits_total", cache=f"result.{mode}")
+            return item[1]
+        if not active:
+            metrics.count("cache_misses_total", cache=f"result.{mode}")
+            return None
+
+        item = self._read_disk(key, now) if self.disk_dir is not None else _MISSING
+        with self._lock:
+            if item is not _MISSING and self._versions.get(mode, (None,))[0] == version:
+                self._store(key, *item)
+                self._stats["hits"] += 1
+                self._stats["disk_hits"] += 1
+                metrics.count("cache_hits_total", cache=f"result.{mode}")
+                metrics.count("result_cache_disk_hits_total", mode=mode)
+                return item[1]
+            self._stats["misses"] += 1
+        metrics.count("cache_misses_total", cache=f"result.{mode}")
+        return None
+
+    def put(self, version, mode, query, k, value, generation=None):
+        key = (version, mode, query, k)
+        expires = time.time() + self.ttl
+        with self._lock:
+            active, stale_dirs = self._activate(mode, version, generation)
+            if active:
+                self._store(key, expires, value)
+        self._remove_dirs(stale_dirs)
+        if active and self.disk_dir is not None:
+            self._write_disk(key, expires, value)
+
+    def get_or_compute(self, version, mode, query, k, compute, generation=None):
+        """
+        Trả về kết quả đã lưu hoặc gọi compute() rồi lưu lại. Lỗi của compute() không được lưu.
+        Hai phiên cùng hỏi một khóa chưa có có thể cùng tính (không chặn nhau).
+        """
+        value = self.get(version, mode, query, k, generation)
+        if value is None:
+            value = compute()
+            self.put(version, mode, query, k, value, generation)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+        if self.disk_dir is not None:
+            shutil.rmtree(self.disk_dir, ignore_errors=True)
+
+    def stats(self):
+        """Số lần hit (kể cả từ đĩa) / miss, số mục đang giữ và tỉ lệ hit."""
+        with self._lock:
+            stats = dict(self._stats, entries=len(self._entries))
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
@@ -0,0 +1,139 @@
+# utils/svd_evaluation.py
+import itertools
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from utils.svd_training import LR, fit_surprise
+
+RELEVANT_RATING = 4.0  # Đánh giá >= ngưỡng này được coi là "thích" khi tính precision@k / recall@k
+
+
+def make_folds(n_ratings, n_folds=5, seed=0):
+    """Gán ngẫu nhiên mỗi đánh giá vào một fold (0..n_folds-1), giống KFold(shuffle=True) của Surprise."""
+    rng = np.random.default_rng(seed)
+    folds = np.empty(n_ratings, dtype=np.int8)
+    folds[rng.permutation(n_ratings)] = np.arange(n_ratings) % n_folds
+    return folds
+
+
+def grid_configs(factors, epochs, regs):
+    return [
+        {"n_factors": f, "n_epochs": e, "reg": r}
+        for f, e, r in itertools.product(factors, epochs, regs)
+    ]
+
+
+def random_configs(factors, epochs, regs, n_iter, seed=0):
+    """Random search: số nhân tố / epoch lấy nguyên đều trong [min, max], reg lấy log-đều trong [min, max]."""
+    rng = np.random.default_rng(seed)
+    return [
+        {
+            "n_factors": int(rng.integers(min(factors), max(factors) + 1)),
+            "n_epochs": int(rng.integers(min(epochs), max(epochs) + 1)),
+            "reg": float(np.exp(rng.uniform(np.log(min(regs)), np.log(max(regs))))),
+        }
+        for _ in range(n_iter)
+    ]
+
+
+def precision_recall_at_k(u, est, true, k=10, threshold=RELEVANT_RATING):
+    """
+    Precision@k / recall@k trung bình theo user trên tập test (định nghĩa như FAQ của Surprise):
+    xếp các sản phẩm test của mỗi user theo điểm dự đoán, lấy k đầu.
+    """
+    df = pd.DataFrame({"u": u, "est": est, "rel": true >= threshold})
+    df = df.sort_values(["u", "est"], ascending=[True, False], kind="stable")
+    df["rec"] = (df.groupby("u").cumcount() < k) & (df["est"] >= threshold)
+    df["hit"] = df["rec"] & df["rel"]
+    per_user = df.groupby("u")[["rec", "rel", "hit"]].sum()
+    precision = np.where(per_user["rec"] > 0, per_user["hit"] / per_user["rec"].clip(lower=1), 0.0)
+    recall = np.where(per_user["rel"] > 0, per_user["hit"] / per_user["rel"].clip(lower=1), 0.0)
+    return float(precision.mean()), float(recall.mean())
+
+
+# ===== Phần chạy trong tiến trình con =====
+_worker = {}
+
+
+def _init_worker(u, i, r, folds, rating_scale, k):
+    _worker.update(u=u, i=i, r=r, folds=folds, rating_scale=rating_scale, k=k)
+
+
+def _evaluate_fold(task):
+    """
+    Huấn luyện một cấu hình trên các fold còn lại (fit_surprise — cùng đường huấn luyện với build),
+    đo trên một fold.
+    """
+    config_id, config, fold = task
+    w = _worker
+    train = w["folds"] != fold
+    u_tr, i_tr, r_tr = w["u"][train], w["i"][train], w["r"][train]
+    u_te, i_te, r_te = w["u"][~train], w["i"][~train], w["r"][~train]
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    scorer = fit_surprise(u_tr, i_tr, r_tr, n_factors=config["n_factors"], n_epochs=config["n_epochs"],
+                          lr=config.get("lr", LR), reg=config["reg"], rating_scale=w["rating_scale"], seed=fold)
+    fit_seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # User/sản phẩm không có trong tập train: dự đoán bằng global mean + bias đã biết (như Surprise)
+    start = time.perf_counter()
+    est = scorer.score_pairs(scorer.user_index.get_many(u_te), scorer.item_index.get_many(i_te))
+    predict_seconds = time.perf_counter() - start
+
+    precision, recall = precision_recall_at_k(u_te, est, r_te, k=w["k"])
+    return {
+        "config_id": config_id,
+        "fold": fold,
+        "rmse": float(np.sqrt(np.mean((r_te - est) ** 2))),
+        "mae": float(np.mean(np.abs(r_te - est))),
+        f"precision@{w['k']}": precision,
+        f"recall@{w['k']}": recall,
+        "fit_seconds": fit_seconds,
+        "predict_seconds": predict_seconds,
+        "peak_mb": peak / 1024 ** 2,
+    }
+
+
+def cross_validate(u, i, r, configs, n_folds=5, k=10, rating_scale=(1, 5),
+                   workers=None, seed=0):
+    """
+    K-fold cross-validation cho nhiều cấu hình, mỗi cặp (cấu hình, fold) là một task trong process pool.
+    Trả về (bảng theo từng fold, bảng trung bình theo cấu hình).
+    """
+    folds = make_folds(len(r), n_folds, seed)
+    tasks = [(cid, config, fold) for cid, config in enumerate(configs) for fold in range(n_folds)]
+
+    rows = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(u, i, r, folds, rating_scale, k)) as pool:
+        for done, row in enumerate(pool.map(_evaluate_fold, tasks), start=1):
+            rows.append(row)
+            if done % n_folds == 0:
+                print(f"   ... {done}/{len(tasks)} lượt huấn luyện")
+
+    per_fold = pd.DataFrame(rows)
+    metrics = [col for col in per_fold.columns if col not in ("config_id", "fold")]
+    summary = per_fold.groupby("config_id")[metrics].agg(["mean", "std"])
+    summary.columns = [f"{m}_{stat}" if stat == "std" else m for m, stat in summary.columns]
+    summary = pd.DataFrame(configs).join(summary)
+    return per_fold, summary
+
+
+def cheapest_meeting(summary, max_rmse=None, min_precision=None, k=10, cost="fit_seconds"):
+    """Cấu hình rẻ nhất (theo cột cost) đạt ngưỡng chất lượng; None nếu không cấu hình nào đạt."""
+    ok = pd.Series(True, index=summary.index)
+    if max_rmse is not None:
+        ok &= summary["rmse"] <= max_rmse
+    if min_precision is not None:
+        ok &= summary[f"precision@{k}"] >= min_precision
+    passing = summary[ok]
+    if passing.empty:
+        return None
+    return passing.sort_values([cost, "rmse"]).iloc[0]
@@ -0,0 +1,266 @@
+# utils/svd_training.py
+import time
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from utils.collaborative import SVDScorer
+from utils.id_index import normalize_ids
+from utils.data_store import (
+    RATING_TRAIN_COLUMNS, iter_ratings_range, ratings_digest, ratings_end, ratings_source,
+)
+
+# Siêu tham số mặc định giống surprise.SVD()
+N_FACTORS = 100
+N_EPOCHS = 20
+LR = 0.005
+REG = 0.02
+INIT_STD = 0.1
+BATCH_SIZE = 1024  # Số đánh giá mỗi bước SGD vector hóa
+
+
+class RatingLog:
+    """
+    Các dòng đánh giá trong [start, end) của file (vị trí như data_store.ratings_end) dạng 3 mảng gọn
+    (user_id, product_id, rating) theo đúng thứ tự file, đọc theo khối nên không cần giữ DataFrame pandas.
+    start = 0: toàn bộ lịch sử; start = vị trí của lần build trước: chỉ phần được nối thêm.
+    """
+
+    def __init__(self, user_raw, item_raw, ratings, start=0, end=0):
+        self.user_raw = user_raw
+        self.item_raw = item_raw
+        self.ratings = ratings
+        self.start = start
+        self.end = end
+
+    def __len__(self):
+        return len(self.ratings)
+
+    @classmethod
+    def read(cls, chunksize=1_000_000, start=0, end=None):
+        end = ratings_end() if end is None else end
+        users, items, ratings = [], [], []
+        for chunk in iter_ratings_range(start, end, RATING_TRAIN_COLUMNS, chunksize=chunksize):
+            chunk = chunk.dropna(subset=["rating"])
+            users.append(normalize_ids(chunk["user_id"].to_numpy()))
+            items.append(normalize_ids(chunk["product_id"].to_numpy()))
+            ratings.append(chunk["rating"].to_numpy(dtype=np.float32))
+        if not ratings:
+            return cls(np.empty(0, np.int64), np.empty(0, np.int64), np.empty(0, np.float32), start, end)
+        return cls(np.concatenate(users), np.concatenate(items), np.concatenate(ratings), start, end)
+
+
+def train_state(end, interactions_version):
+    """
+    Thông tin lưu cùng mô hình cho lần build tăng dần sau: vị trí đã đọc tới trong file đánh giá,
+    dấu vân tay của cửa sổ cuối trước vị trí đó, và phiên bản InteractionIndex (toàn bộ lịch sử
+    tới vị trí đó) được ghi cùng lần build.
+    """
+    return {"source": ratings_source(), "position": int(end), "digest": ratings_digest(end),
+            "interactions_version": interactions_version}
+
+
+def appended_since(state, end):
+    """
+    True nếu từ lúc lưu state, file đánh giá chỉ được nối thêm: cùng file, không ngắn đi và cửa sổ cuối
+    trước vị trí cũ không đổi. Chỉ kiểm tra một cửa sổ giới hạn (không băm lại cả phần đầu file), nên một
+    thay đổi nằm hẳn trước cửa sổ sẽ không bị phát hiện — khi sửa dữ liệu cũ hãy chạy --full.
+    """
+    position = (state or {}).get("position")
+    return (
+        position is not None
+        and state.get("source") == ratings_source()
+        and position <= end
+        and state.get("digest") == ratings_digest(position)
+    )
+
+
+def keep_rows(user_raw, min_ratings=3):
+    """Vị trí các đánh giá của user có ít nhất min_ratings đánh giá."""
+    _, u = np.unique(user_raw, return_inverse=True)
+    return np.flatnonzero(np.bincount(u)[u] >= min_ratings)
+
+
+def encode(log, min_ratings=3):
+    """
+    Lọc user có ít nhất min_ratings đánh giá và tạo ánh xạ id -> chỉ số (một lần cho cả tập).
+    Trả về (user_ids, item_ids, u, i, r, rows) với rows = vị trí dòng gốc của mỗi đánh giá được giữ.
+    """
+    rows = keep_rows(log.user_raw, min_ratings)
+    user_ids, u = np.unique(log.user_raw[rows], return_inverse=True)
+    item_ids, i = np.unique(log.item_raw[rows], return_inverse=True)
+    return user_ids, item_ids, u.astype(np.int32), i.astype(np.int32), log.ratings[rows], rows
+
+
+def warm_start(previous, user_ids, item_ids, n_factors=N_FACTORS, init_std=INIT_STD, seed=0):
+    """
+    Khởi tạo tham số cho tập id mới: user/sản phẩm đã có trong mô hình trước giữ nguyên nhân tố và bias,
+    id mới khởi tạo ngẫu nhiên như Surprise. Trả về (pu, qi, bu, bi).
+    """
+    rng = np.random.default_rng(seed)
+    if previous is not None:
+        n_factors = previous.pu.shape[1]
+    pu = rng.normal(0, init_std, (len(user_ids), n_factors))
+    qi = rng.normal(0, init_std, (len(item_ids), n_factors))
+    bu = np.zeros(len(user_ids))
+    bi = np.zeros(len(item_ids))
+
+    if previous is not None:
+        prev_u = previous.user_index.get_many(user_ids)
+        prev_i = previous.item_index.get_many(item_ids)
+        known_users, known_items = prev_u >= 0, prev_i >= 0
+        pu[known_users] = previous.pu[prev_u[known_users]]
+        qi[known_items] = previous.qi[prev_i[known_items]]
+        if previous.biased:
+            bu[known_users] = previous.bu[prev_u[known_users]]
+            bi[known_items] = previous.bi[prev_i[known_items]]
+    return pu, qi, bu, bi
+
+
+def _group_matrix(idx):
+    """
+    Ma trận thưa (số id duy nhất x len(idx)) cộng các dòng có cùng id rồi chia căn bậc hai số lần xuất hiện:
+    M @ values. Trả về (id duy nhất, M).
+    """
+    order = np.argsort(idx, kind="stable")
+    sorted_idx = idx[order]
+    starts = np.flatnonzero(np.r_[True, sorted_idx[1:] != sorted_idx[:-1]])
+    indptr = np.r_[starts, len(idx)]
+    counts = np.diff(indptr)
+    weights = np.repeat(1.0 / np.sqrt(counts), counts)
+    return sorted_idx[starts], sparse.csr_matrix((weights, order, indptr), shape=(len(starts), len(idx)))
+
+
+def sgd(pu, qi, bu, bi, global_mean, u, i, r, n_epochs=N_EPOCHS, lr=LR, reg=REG,
+        update_users=None, update_items=None, batch_size=BATCH_SIZE, seed=0):
+    """
+    SGD mini-batch vector hóa cho SVD có bias (cùng hàm mất mát và luật cập nhật với Surprise),
+    sửa trực tiếp pu, qi, bu, bi. Trong một khối, gradient của user/sản phẩm xuất hiện c lần được cộng lại
+    rồi chia sqrt(c) (tránh bước quá lớn với sản phẩm phổ biến); user/sản phẩm ít đánh giá được cập nhật
+    gần giống SGD tuần tự của Surprise.
+    update_users / update_items (mask bool) giới hạn tham số được cập nhật: phần còn lại giữ cố định,
+    chỉ dùng để tính sai số.
+    Chỉ dùng cho vài epoch khởi tạo tiếp (train_incremental); huấn luyện toàn bộ dùng surprise.SVD (train_full).
+    """
+    rng = np.random.default_rng(seed)
+    user_step = lr * (update_users if update_users is not None else np.ones(len(bu)))
+    item_step = lr * (update_items if update_items is not None else np.ones(len(bi)))
+
+    for _ in range(n_epochs):
+        order = rng.permutation(len(r))
+        for start in range(0, len(r), batch_size):
+            batch = order[start:start + batch_size]
+            bu_, bi_ = u[batch], i[batch]
+            p, q = pu[bu_], qi[bi_]
+            err = r[batch] - (global_mean + bu[bu_] + bi[bi_] + np.einsum("ij,ij->i", p, q))
+
+            users, group_u = _group_matrix(bu_)
+            items, group_i = _group_matrix(bi_)
+            su, si = user_step[users], item_step[items]
+            bu[users] += su * (group_u @ err - reg * bu[users])
+            bi[items] += si * (group_i @ err - reg * bi[items])
+            pu[users] += su[:, None] * (group_u @ (err[:, None] * q) - reg * pu[users])
+            qi[items] += si[:, None] * (group_i @ (err[:, None] * p) - reg * qi[items])
+    return pu, qi, bu, bi
+
+
+def rmse(scorer, u, i, r):
+    """RMSE trên các đánh giá (u, i là inner id của scorer)."""
+    est = scorer.global_mean + scorer.bu[u] + scorer.bi[i] + np.einsum("ij,ij->i", scorer.pu[u], scorer.qi[i])
+    est = np.clip(est, *scorer.rating_scale)
+    return float(np.sqrt(np.mean((r - est) ** 2))) if len(r) else float("nan")
+
+
+def fit_surprise(user_raw, item_raw, ratings, n_factors=N_FACTORS, n_epochs=N_EPOCHS, lr=LR, reg=REG,
+                 rating_scale=(1, 5), seed=0):
+    """
+    Huấn luyện surprise.SVD trên các đánh giá (đã lọc) và trả về SVDScorer. Đây là đường huấn luyện toàn bộ
+    duy nhất: build (train_full) và đánh giá cấu hình (utils/svd_evaluation.py) cùng đi qua đây, nên RMSE /
+    thời gian đo được là của đúng mô hình build tạo ra. Vòng lặp biên dịch của Surprise nhanh hơn và cho RMSE
+    tốt hơn SGD mini-batch của module này khi chạy đủ n_epochs.
+    """
+    from surprise import SVD, Dataset, Reader
+
+    df = pd.DataFrame({"user_id": user_raw, "product_id": item_raw, "rating": ratings})
+    trainset = Dataset.load_from_df(df, Reader(rating_scale=rating_scale)).build_full_trainset()
+    model = SVD(n_factors=n_factors, n_epochs=n_epochs, lr_all=lr, reg_all=reg, random_state=seed)
+    model.fit(trainset)
+    return SVDScorer.from_surprise(model)
+
+
+def train_full(log, min_ratings=3, n_factors=N_FACTORS, n_epochs=N_EPOCHS, lr=LR, reg=REG,
+               rating_scale=(1, 5), seed=0):
+    """Huấn luyện lại từ đầu (fit_surprise) trên các đánh giá của user đủ min_ratings. Trả về (scorer, stats)."""
+    start = time.perf_counter()
+    rows = keep_rows(log.user_raw, min_ratings)
+    user_raw, item_raw, ratings = log.user_raw[rows], log.item_raw[rows], log.ratings[rows]
+    scorer = fit_surprise(user_raw, item_raw, ratings, n_factors=n_factors, n_epochs=n_epochs, lr=lr, reg=reg,
+                          rating_scale=rating_scale, seed=seed)
+
+    u = scorer.user_index.get_many(user_raw)
+    i = scorer.item_index.get_many(item_raw)
+    stats = {"mode": "full", "new_rows": len(log), "updated_users": len(scorer.user_ids),
+             "updated_items": len(scorer.item_ids), "sgd_ratings": len(rows),
+             "train_rmse": rmse(scorer, u, i, ratings), "seconds": time.perf_counter() - start}
+    return scorer, stats
+
+
+def _csr_entries(indptr, rows):
+    """Vị trí (trong mảng dữ liệu CSR) của mọi phần tử thuộc các dòng rows."""
+    starts, ends = indptr[rows], indptr[np.asarray(rows) + 1]
+    counts = ends - starts
+    return np.repeat(starts - np.cumsum(np.r_[0, counts[:-1]]), counts) + np.arange(counts.sum())
+
+
+def train_incremental(previous, index, tail, min_ratings=3, incremental_epochs=3, lr=LR, reg=REG, seed=0):
+    """
+    Cập nhật mô hình trước với các dòng mới (tail: RatingLog của phần nối thêm), không đọc lại lịch sử:
+    - index: InteractionIndex của toàn bộ lịch sử đã gồm tail (InteractionIndex.extend) — số đánh giá
+      của user (lọc min_ratings) và các đánh giá cũ của user / sản phẩm bị ảnh hưởng lấy từ đây;
+    - khởi tạo từ nhân tố cũ, chạy incremental_epochs epoch SGD chỉ trên các đánh giá của user có trong tail
+      và của sản phẩm có trong tail hoặc mới xuất hiện, và chỉ cập nhật tham số của các user / sản phẩm đó.
+    Trả về (scorer, stats).
+    """
+    start = time.perf_counter()
+    degree = index.user_degree()
+    tail_user = index.user_index.get_many(tail.user_raw)
+    tail_kept = degree[tail_user] >= min_ratings
+    update_u = np.unique(tail_user[tail_kept])
+    tail_item = index.item_index.get_many(tail.item_raw[tail_kept])
+
+    # Đánh giá của các user cần cập nhật (kể cả phần lịch sử của user vừa đủ min_ratings)
+    pos = _csr_entries(index.user_indptr, update_u)
+    sub_u = np.repeat(update_u, np.diff(index.user_indptr)[update_u])
+    sub_i = np.asarray(index.user_items[pos])
+    sub_r = np.asarray(index.user_ratings[pos])
+
+    # Sản phẩm cần cập nhật: có trong tail hoặc mô hình trước chưa biết
+    new_item = previous.item_index.get_many(index.item_ids[np.unique(sub_i)]) < 0
+    update_i = np.union1d(np.unique(tail_item), np.unique(sub_i)[new_item])
+    pos = _csr_entries(index.item_indptr, update_i)
+    other_u = np.asarray(index.item_users[pos])
+    other_i = np.repeat(update_i, np.diff(index.item_indptr)[update_i])
+    keep = (degree[other_u] >= min_ratings) & ~np.isin(other_u, update_u)
+    sub_u = np.concatenate([sub_u, other_u[keep]])
+    sub_i = np.concatenate([sub_i, other_i[keep]])
+    sub_r = np.concatenate([sub_r, np.asarray(index.item_ratings[pos])[keep]])
+
+    user_ids = np.union1d(previous.user_ids, index.user_ids[update_u])
+    item_ids = np.union1d(previous.item_ids, index.item_ids[update_i])
+    u = np.searchsorted(user_ids, index.user_ids[sub_u]).astype(np.int32)
+    i = np.searchsorted(item_ids, index.item_ids[sub_i]).astype(np.int32)
+    r = sub_r.astype(np.float64)
+    update_users = np.isin(user_ids, index.user_ids[update_u])
+    update_items = np.isin(item_ids, index.item_ids[update_i])
+
+    # Giữ global mean cũ để bias của các user/sản phẩm không cập nhật vẫn khớp
+    pu, qi, bu, bi = warm_start(previous, user_ids, item_ids, seed=seed)
+    sgd(pu, qi, bu, bi, previous.global_mean, u, i, r, n_epochs=incremental_epochs, lr=lr, reg=reg,
+        update_users=update_users, update_items=update_items, seed=seed)
+    scorer = SVDScorer(pu, qi, bu, bi, previous.global_mean, user_ids, item_ids,
+                       rating_scale=previous.rating_scale, biased=previous.biased)
+    stats = {"mode": "incremental", "new_rows": len(tail), "updated_users": int(update_users.sum()),
+             "updated_items": int(update_items.sum()), "sgd_ratings": len(r),
+             "train_rmse": rmse(scorer, u, i, r), "seconds": time.perf_counter() - start}
+    return scorer, stats
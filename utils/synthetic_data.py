@@ -0,0 +1,89 @@
+# utils/synthetic_data.py
+import os
+
+import numpy as np
+import pandas as pd
+
+from utils.data_store import PRODUCTS_CSV, RATINGS_CSV
+
+# Từ vựng gần giống dữ liệu thật (thời trang nam) để TF-IDF và bộ lọc từ khóa có việc để làm
+SUB_CATEGORIES = [
+    "Áo", "Áo Khoác", "Quần Jeans", "Quần Dài/Quần Âu", "Quần Short", "Áo Vest và Blazer",
+    "Đồ Ngủ", "Đồ Lót", "Trang Phục Truyền Thống", "Vớ/Tất", "Đồ Bộ", "Đồ Hóa Trang",
+]
+WORDS = (
+    "áo thun quần jean khoác kaki short sơ mi polo hoodie nỉ len cotton lụa đen trắng xanh đỏ xám be "
+    "nam basic form rộng ôm slimfit oversize cổ tròn tay dài tay ngắn túi hộp co giãn thoáng mát "
+    "chất đẹp cao cấp giá rẻ hàn quốc unisex thể thao công sở dạo phố mùa hè mùa đông size to "
+    "xinh dễ thương cặp đôi áo đôi"
+).split()
+RARE_WORDS = 5000  # Số từ hiếm (sp0, sp1, ...) để từ điển TF-IDF có kích thước thực tế
+
+
+def _texts(rng, n, min_words, max_words):
+    """Sinh n câu ngẫu nhiên: phần lớn từ phổ biến, một phần từ hiếm."""
+    vocab = np.array(WORDS + [f"sp{i}" for i in range(RARE_WORDS)])
+    lengths = rng.integers(min_words, max_words + 1, n)
+    common = rng.integers(0, len(WORDS), lengths.sum())
+    rare = rng.integers(len(WORDS), len(vocab), lengths.sum())
+    tokens = vocab[np.where(rng.random(lengths.sum()) < 0.8, common, rare)]
+    return [" ".join(chunk) for chunk in np.split(tokens, np.cumsum(lengths)[:-1])]
+
+
+def make_products(n_products, seed=0):
+    """Bảng sản phẩm cùng schema với Products_ThoiTrangNam_clean.csv."""
+    rng = np.random.default_rng(seed)
+    product_ids = np.arange(1, n_products + 1) * 7 + 100  # id thưa, không liên tục như dữ liệu thật
+    sub_category = rng.choice(SUB_CATEGORIES, n_products)
+    names = [f"{sc} {text}" for sc, text in zip(sub_category, _texts(rng, n_products, 4, 12))]
+    descriptions = _texts(rng, n_products, 20, 80)
+    price = np.round(rng.lognormal(12, 0.8, n_products), -3)
+    price[rng.random(n_products) < 0.02] = 0  # một ít sản phẩm giá 0 như dữ liệu thật
+    return pd.DataFrame({
+        "product_id": product_ids,
+        "product_name": names,
+        "category": "Thời Trang Nam",
+        "sub_category": sub_category,
+        "link": [f"https://shopee.vn/product/{pid}" for pid in product_ids],
+        "image": [f"https://cf.shopee.vn/file/{pid:x}" for pid in product_ids],
+        "price": price,
+        "rating": np.round(rng.uniform(0, 5, n_products), 1),
+        "description": descriptions,
+        "clean_description": descriptions,
+        "desc_len": [len(d) for d in descriptions],
+    })
+
+
+def make_ratings(product_ids, n_ratings, n_users=None, seed=0):
+    """
+    Bảng đánh giá cùng schema với Products_ThoiTrangNam_rating_clean.csv.
+    Sản phẩm và user được chọn theo phân phối lệch (vài sản phẩm / user rất nhiều đánh giá).
+    """
+    rng = np.random.default_rng(seed + 1)
+    product_ids = np.asarray(product_ids)
+    n_users = n_users or max(1, n_ratings // 8)
+    user_pos = np.minimum(rng.zipf(1.5, n_ratings) - 1, n_users - 1)
+    user_pos = rng.permutation(n_users)[user_pos]
+    item_pos = np.minimum((rng.pareto(1.2, n_ratings) * len(product_ids) / 50).astype(np.int64),
+                          len(product_ids) - 1)
+    item_pos = rng.permutation(len(product_ids))[item_pos]
+    user_ids = user_pos + 1
+    return pd.DataFrame({
+        "product_id": product_ids[item_pos],
+        "user_id": user_ids,
+        "user": [f"user_{uid}" for uid in user_ids],
+        "rating": rng.choice([1, 2, 3, 4, 5], n_ratings, p=[0.05, 0.03, 0.07, 0.15, 0.70]),
+    })
+
+
+def write_dataset(root_dir, n_products, n_ratings, seed=0):
+    """Ghi hai file CSV (sản phẩm: dấu phẩy, đánh giá: tab) vào root_dir/data/ với tên giống dữ liệu gốc."""
+    products_path = os.path.join(root_dir, PRODUCTS_CSV)
+    ratings_path = os.path.join(root_dir, RATINGS_CSV)
+    os.makedirs(os.path.dirname(products_path), exist_ok=True)
+
+    products = make_products(n_products, seed)
+    products.to_csv(products_path, index=False)
+    ratings = make_ratings(products["product_id"].to_numpy(), n_ratings, seed=seed)
+    ratings.to_csv(ratings_path, sep="\t", index=False)
+    return products, ratings
@@ -0,0 +1,107 @@
+# utils/text_index.py
+import unicodedata
+
+import numpy as np
+
+
+def normalize_text(text):
+    """Chuẩn hóa để so khớp: NFC, chữ thường, gộp khoảng trắng (giữ dấu tiếng Việt)."""
+    return " ".join(unicodedata.normalize("NFC", str(text)).lower().split())
+
+
+class NgramIndex:
+    """
+    Chỉ mục tìm chuỗi con / tiền tố trên một danh sách văn bản, dựng một lần rồi dùng cho mọi truy vấn.
+
+    - Chuỗi con: mỗi n-gram (mặc định 3 ký tự) có một danh sách văn bản chứa nó (dạng CSR).
+      Truy vấn dài >= n lấy giao các danh sách của n-gram trong truy vấn, rồi kiểm tra lại trên ứng viên.
+    - Tiền tố: văn bản đã sắp xếp + searchsorted, dùng cho truy vấn ngắn hơn n và để xếp hạng.
+
+    search() trả về vị trí (theo thứ tự danh sách gốc): khớp tiền tố trước (theo thứ tự chữ cái),
+    sau đó các văn bản chỉ chứa chuỗi con (theo thứ tự gốc).
+    """
+
+    def __init__(self, texts, n=3):
+        self.n = n
+        self.texts = np.array([normalize_text(t) for t in texts], dtype=object)
+
+        gram_ids = {}
+        grams, docs = [], []
+        for doc, text in enumerate(self.texts.tolist()):
+            for gram in {text[i:i + n] for i in range(len(text) - n + 1)}:
+                grams.append(gram_ids.setdefault(gram, len(gram_ids)))
+                docs.append(doc)
+        grams = np.asarray(grams, dtype=np.int64)
+        docs = np.asarray(docs, dtype=np.int32)
+        order = np.lexsort((docs, grams))
+        self.gram_ids = gram_ids
+        self.postings = docs[order]
+        self.indptr = np.searchsorted(grams[order], np.arange(len(gram_ids) + 1)).astype(np.int64)
+
+        self.sorted_order = np.argsort(self.texts, kind="stable")
+        self.sorted_texts = self.texts[self.sorted_order]
+
+    def __len__(self):
+        return len(self.texts)
+
+    def _posting(self, gram):
+        gid = self.gram_ids.get(gram)
+        if gid is None:
+            return self.postings[:0]
+        return self.postings[self.indptr[gid]:self.indptr[gid + 1]]
+
+    def prefix(self, query):
+        """Vị trí các văn bản bắt đầu bằng query, theo thứ tự chữ cái."""
+        query = normalize_text(query)
+        start = np.searchsorted(self.sorted_texts, query, side="left")
+        # Mọi chuỗi có tiền tố query đều < query + ký tự lớn nhất
+        end = np.searchsorted(self.sorted_texts, query + "\U0010ffff", side="left")
+        return self.sorted_order[start:end]
+
+    def contains(self, query, limit=None):
+        """Vị trí các văn bản chứa query (chuỗi con), theo thứ tự gốc; tối đa limit kết quả nếu có."""
+        query = normalize_text(query)
+        if not query:
+            return np.arange(len(self.texts) if limit is None else min(limit, len(self.texts)))
+        if len(query) < self.n:
+            # Quá ngắn để dùng n-gram: kiểm tra tuần tự mọi văn bản (chỉ với truy vấn 1-2 ký tự)
+            base, others = np.arange(len(self.texts)), []
+        else:
+            postings = sorted((self._posting(query[i:i + self.n]) for i in range(len(query) - self.n + 1)), key=len)
+            base, others = postings[0], postings[1:]
+            if not others:
+                # Truy vấn đúng bằng một n-gram: danh sách đã là kết quả chính xác
+                return base[:limit].astype(np.int64)
+
+        # Duyệt danh sách ngắn nhất theo khối: giữ phần tử có trong mọi danh sách khác (searchsorted),
+        # kiểm tra lại chuỗi con (đủ n-gram chưa chắc đúng thứ tự) và dừng ngay khi đủ limit
+        found = []
+        step = len(base) if limit is None else max(4 * limit, 256)
+        for start in range(0, len(base), max(step, 1)):
+            chunk = base[start:start + step]
+            for posting in others:
+                pos = np.minimum(np.searchsorted(posting, chunk), len(posting) - 1)
+                chunk = chunk[posting[pos] == chunk] if len(posting) else chunk[:0]
+            for doc, text in zip(chunk.tolist(), self.texts[chunk].tolist()):
+                if query in text:
+                    found.append(doc)
+                    if limit is not None and len(found) >= limit:
+                        return np.asarray(found, dtype=np.int64)
+        return np.asarray(found, dtype=np.int64)
+
+    def search(self, query, limit=None):
+        """
+        Khớp tiền tố trước, rồi khớp chuỗi con; query rỗng trả về tất cả theo thứ tự chữ cái.
+        Với limit (vd. gợi ý khi gõ), dừng ngay khi đã đủ số kết quả.
+        """
+        query = normalize_text(query)
+        if not query:
+            return self.sorted_order[:limit].astype(np.int64)
+        by_prefix = self.prefix(query)[:limit].astype(np.int64)
+        if limit is not None and len(by_prefix) >= limit:
+            return by_prefix
+        # Lấy dư len(by_prefix) vì các kết quả tiền tố cũng nằm trong kết quả chuỗi con
+        more = None if limit is None else limit + len(by_prefix)
+        by_substring = self.contains(query, limit=more)
+        result = np.concatenate([by_prefix, by_substring[~np.isin(by_substring, by_prefix)]])
+        return result[:limit]
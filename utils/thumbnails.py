@@ -0,0 +1,115 @@
+# utils/thumbnails.py
+import hashlib
+import os
+import threading
+
+from PIL import Image
+
+from utils import metrics
+
+PRODUCT_IMAGE_DIR = "images/products"
+THUMB_DIR = "images/thumbs"
+NO_IMAGE = "images/no_image.jpg"
+THUMB_SIZE = 120
+MAX_CACHE_BYTES = 200 * 1024 ** 2  # Giới hạn dung lượng cache thumbnail (LRU)
+
+_digest_memo = {}  # (đường dẫn, mtime, size) -> sha1 nội dung ảnh gốc
+_lock = threading.Lock()
+_bytes_since_trim = 0
+
+
+def source_image_path(product_id):
+    return os.path.join(PRODUCT_IMAGE_DIR, f"{product_id}.jpeg")
+
+
+def _content_digest(path):
+    stat = os.stat(path)
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    digest = _digest_memo.get(key)
+    if digest is None:
+        h = hashlib.sha1()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+        digest = h.hexdigest()
+        _digest_memo[key] = digest
+    return digest
+
+
+def thumbnail_path(digest, size=THUMB_SIZE, cache_dir=THUMB_DIR):
+    # Đặt tên theo nội dung: cùng một ảnh gốc luôn dùng chung một thumbnail
+    return os.path.join(cache_dir, digest[:2], f"{digest}_{size}.jpeg")
+
+
+def make_thumbnail(src_path, dst_path, size=THUMB_SIZE):
+    """Thu nhỏ ảnh gốc về khung vuông size x size (giữ tỉ lệ, nền trắng) và ghi ra JPEG."""
+    with Image.open(src_path) as img:
+        img = img.convert("RGB")
+        img.thumbnail((size, size))
+        canvas = Image.new("RGB", (size, size), (255, 255, 255))
+        canvas.paste(img, ((size - img.width) // 2, (size - img.height) // 2))
+
+    os.makedirs(os.path.dirname(dst_path), exist_ok=True)
+    tmp_path = f"{dst_path}.{threading.get_ident()}.tmp"
+    canvas.save(tmp_path, "JPEG", quality=85)
+    os.replace(tmp_path, dst_path)
+    return os.path.getsize(dst_path)
+
+
+def trim_cache(max_bytes=MAX_CACHE_BYTES, cache_dir=THUMB_DIR):
+    """Xóa các thumbnail lâu không dùng nhất (theo mtime) cho đến khi cache nhỏ hơn max_bytes."""
+    files = []
+    for root, _, names in os.walk(cache_dir):
+        for name in names:
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in files)
+    for _, size, path in sorted(files):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except FileNotFoundError:
+            pass
+    return total
+
+
+def get_thumbnail(product_id, size=THUMB_SIZE, cache_dir=THUMB_DIR, max_bytes=MAX_CACHE_BYTES):
+    """
+    Đường dẫn thumbnail trên đĩa của sản phẩm, tạo từ ảnh đã tải về nếu chưa có trong cache.
+    Không bao giờ gọi mạng: không có ảnh gốc hoặc ảnh lỗi thì trả về ảnh mặc định.
+    """
+    global _bytes_since_trim
+
+    src_path = source_image_path(product_id)
+    if not os.path.exists(src_path):
+        metrics.count("thumbnail_missing_total")
+        return NO_IMAGE
+
+    try:
+        dst_path = thumbnail_path(_content_digest(src_path), size, cache_dir)
+        if os.path.exists(dst_path):
+            os.utime(dst_path)  # đánh dấu vừa dùng cho LRU
+            metrics.count("cache_hits_total", cache="thumbnail")
+            return dst_path
+        metrics.count("cache_misses_total", cache="thumbnail")
+        with metrics.timer("render.make_thumbnail"):
+            written = make_thumbnail(src_path, dst_path, size)
+    except (OSError, ValueError):
+        return NO_IMAGE
+
+    # Chỉ quét thư mục cache khi đã ghi thêm đủ nhiều, tránh quét ở mỗi lần render
+    with _lock:
+        _bytes_since_trim += written
+        need_trim = _bytes_since_trim >= max_bytes // 20
+        if need_trim:
+            _bytes_since_trim = 0
+    if need_trim:
+        trim_cache(max_bytes, cache_dir)
+    return dst_path
@@ -0,0 +1,74 @@
+# utils/user_directory.py
+import numpy as np
+import pandas as pd
+
+from utils.id_index import IdIndex
+from utils.text_index import NgramIndex, normalize_text
+
+PAGE_SIZE = 50
+MAX_RESULTS = 20 * PAGE_SIZE  # Số kết quả tối đa của một lần tìm: mỗi lần gõ phím không phải duyệt hết user
+
+
+class UserDirectory:
+    """
+    Danh bạ user (id, tên, số đánh giá) dựng một lần từ bảng đánh giá, kèm chỉ mục tìm kiếm
+    theo tiền tố / chuỗi con trên "id tên". Trang chỉ nhận từng trang kết quả, không nhận cả danh sách.
+    """
+
+    def __init__(self, user_ids, names, n_ratings):
+        self.user_ids = np.asarray(user_ids)
+        self.names = np.asarray(names, dtype=object)
+        self.n_ratings = np.asarray(n_ratings)
+        self.index = IdIndex(self.user_ids)
+        self.text_index = NgramIndex(f"{uid} {name}" for uid, name in zip(self.user_ids.tolist(), self.names.tolist()))
+
+    @classmethod
+    def from_ratings(cls, ratings_df):
+        """Mỗi user một dòng (tên đầu tiên gặp), sắp theo user_id."""
+        grouped = ratings_df.groupby("user_id", sort=True)
+        return cls(
+            user_ids=grouped.size().index.to_numpy(),
+            names=grouped["user"].first().fillna("").to_numpy(),
+            n_ratings=grouped.size().to_numpy(),
+        )
+
+    def __len__(self):
+        return len(self.user_ids)
+
+    def __contains__(self, user_id):
+        return user_id in self.index
+
+    def name(self, user_id, default="Không xác định"):
+        pos = self.index.get(user_id)
+        return self.names[pos] if pos >= 0 else default
+
+    def search(self, query, limit=MAX_RESULTS):
+        """
+        Vị trí các user khớp query, tối đa limit kết quả (None = tất cả). User có id đúng bằng query lên đầu,
+        rồi khớp tiền tố "id tên", rồi khớp chuỗi con. Query rỗng: các user đầu tiên theo thứ tự id.
+        Query 1-2 ký tự (ngắn hơn n-gram) chỉ khớp tiền tố: tra trên danh sách đã sắp xếp thay vì duyệt mọi user.
+        """
+        query = str(query).strip()
+        if not query:
+            return np.arange(len(self.user_ids) if limit is None else min(limit, len(self.user_ids)))
+        if len(normalize_text(query)) < self.text_index.n:
+            matches = self.text_index.prefix(query)[:limit].astype(np.int64)
+        else:
+            matches = self.text_index.search(query, limit=limit)
+        exact = self.index.get(query) if query.isdigit() else -1
+        if exact >= 0:
+            matches = np.concatenate([[exact], matches[matches != exact]])[:limit]
+        return matches
+
+    def page(self, positions, page=1, page_size=PAGE_SIZE):
+        """Bảng một trang kết quả (page bắt đầu từ 1)."""
+        chosen = positions[(page - 1) * page_size: page * page_size]
+        return pd.DataFrame({
+            "user_id": self.user_ids[chosen],
+            "user": self.names[chosen],
+            "n_ratings": self.n_ratings[chosen],
+        })
+
+
+def n_pages(n_results, page_size=PAGE_SIZE):
+    return max(1, -(-n_results // page_size))